@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Per-run output directories and a content-addressed artifact store.
+Every run writes into its own directory keyed by run ID, so concurrent and historical
+runs for the same target never share files. When a run finishes, each artifact is
+hashed into the object store and the run's file is replaced by a hardlink to that
+object: outputs that did not change between runs share one copy on disk. The run's
+manifest.json lists its artifacts, and lookup() is how a later run reuses one.
+
+Layout:
+  output/runs/<username>/<run_id>/        working files (+ .idx record indexes), checkpoint.json, manifest.json
+  output/objects/<sha256[:2]>/<sha256>    deduplicated artifact contents (read-only)
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+from records import ensure_index
+
+RUNS_DIR = "runs"
+OBJECTS_DIR = "objects"
+MANIFEST = "manifest.json"
+CHECKPOINT = "checkpoint.json"
+HASH_CHUNK = 1 << 20
+RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+def new_run_id():
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+
+
+def runs_root(output_dir, username):
+    return os.path.join(output_dir, RUNS_DIR, username.lower())
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Run:
+    def __init__(self, output_dir, username, run_id, resumed=False):
+        self.output_dir = output_dir
+        self.username = username
+        self.id = run_id
+        self.dir = os.path.join(runs_root(output_dir, username), run_id)
+        self.resumed = resumed
+
+    @property
+    def checkpoint_path(self):
+        return os.path.join(self.dir, CHECKPOINT)
+
+    @property
+    def manifest(self):
+        """The finished run's manifest, or None while it is still running"""
+        return _read_json(os.path.join(self.dir, MANIFEST))
+
+    def artifacts(self):
+        """Absolute artifact paths from the manifest, keyed like main's files dict"""
+        manifest = self.manifest or {}
+        return {key: os.path.join(self.dir, entry["path"]) for key, entry in manifest.get("artifacts", {}).items()}
+
+
+def _run_dirs(output_dir, username):
+    root = runs_root(output_dir, username)
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(root, n) for n in names if os.path.isdir(os.path.join(root, n))]
+
+
+def finished_runs(output_dir, username):
+    """(manifest, run_dir) pairs for username's finished runs, newest first"""
+    found = []
+    for d in _run_dirs(output_dir, username):
+        manifest = _read_json(os.path.join(d, MANIFEST))
+        if manifest:
+            found.append((manifest, d))
+    found.sort(key=lambda item: item[0].get("finished_at", 0), reverse=True)
+    return found
+
+
+def open_run(output_dir, username, run_id=None, resume=False):
+    """Create (or with resume, reopen) the directory for this run.
+
+    resume without run_id continues the most recently active unfinished run.
+    Raises ValueError for a malformed run_id.
+    """
+    if run_id is not None and not RUN_ID_PATTERN.match(run_id):
+        raise ValueError(f"invalid run ID: {run_id!r}")
+    if run_id is None and resume:
+        unfinished = [d for d in _run_dirs(output_dir, username)
+                      if not os.path.exists(os.path.join(d, MANIFEST)) and os.path.exists(os.path.join(d, CHECKPOINT))]
+        if unfinished:
+            run_id = os.path.basename(max(unfinished, key=lambda d: os.path.getmtime(os.path.join(d, CHECKPOINT))))
+    run = Run(output_dir, username, run_id or new_run_id())
+    run.resumed = resume and os.path.isdir(run.dir)
+    os.makedirs(run.dir, exist_ok=True)
+    return run
+
+
+# --- Cross-run reuse ---
+def lookup(output_dir, username, key):
+    """Path of key's artifact from username's newest finished run that has a non-empty one"""
+    for manifest, d in finished_runs(output_dir, username):
+        entry = manifest.get("artifacts", {}).get(key)
+        if entry and entry.get("size"):
+            path = os.path.join(d, entry["path"])
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def reuse(run, targets):
+    """Copy artifacts from an earlier run into this one; targets maps artifact key → dest path.
+
+    The source is the newest finished run with a non-empty artifact for the first key,
+    and every other listed key comes from that same run. Copies rather than links: this
+    run may still rewrite them, and commit() links them again if they come out unchanged.
+    Returns the source run directory, or None when no earlier run has the first artifact.
+    """
+    keys = list(targets)
+    source = lookup(run.output_dir, run.username, keys[0])
+    if not source:
+        return None
+    source_dir = os.path.dirname(source)
+    artifacts = (_read_json(os.path.join(source_dir, MANIFEST)) or {}).get("artifacts", {})
+    for key, dest in targets.items():
+        entry = artifacts.get(key)
+        if entry and os.path.exists(os.path.join(source_dir, entry["path"])):
+            shutil.copyfile(os.path.join(source_dir, entry["path"]), dest)
+    return source_dir
+
+
+# --- Content-addressed store ---
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _store(objects, path, digest):
+    """Make path a hardlink to the object for digest; returns True if the object already existed"""
+    obj = os.path.join(objects, digest[:2], digest)
+    if os.path.exists(obj):
+        tmp = path + ".link"
+        os.link(obj, tmp)
+        os.replace(tmp, path)
+        return True
+    os.makedirs(os.path.dirname(obj), exist_ok=True)
+    os.link(path, obj)
+    # Shared by every run that produced these bytes, so nothing may write to it in place
+    os.chmod(obj, 0o444)
+    return False
+
+
+def commit(run, files):
+    """Store the run's artifacts by content and write its manifest; returns the manifest.
+
+    Only files inside the run directory are stored. Where hardlinks are unavailable
+    (another filesystem), a file simply stays a private copy.
+    """
+    objects = os.path.join(run.output_dir, OBJECTS_DIR)
+    run_dir = os.path.abspath(run.dir)
+    artifacts = {}
+    reused = saved = 0
+    for key, path in files.items():
+        if not path or not os.path.isfile(path) or os.path.dirname(os.path.abspath(path)) != run_dir:
+            continue
+        # Record artifacts get their page index now if their writer did not build one
+        if path.endswith((".json", ".ndjson", ".txt")) and not ensure_index(path):
+            print(f"⚠️ {os.path.basename(path)} has no record index; it can only be read whole")
+        digest = file_digest(path)
+        size = os.path.getsize(path)
+        try:
+            if _store(objects, path, digest):
+                reused += 1
+                saved += size
+        except OSError as e:
+            print(f"⚠️ Keeping a private copy of {path}: {e}")
+        artifacts[key] = {"path": os.path.basename(path), "sha256": digest, "size": size}
+
+    manifest = {
+        "run_id": run.id,
+        "username": run.username,
+        "finished_at": time.time(),
+        "artifacts": artifacts,
+    }
+    tmp = os.path.join(run.dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(run.dir, MANIFEST))
+    print(f"💾 Stored {len(artifacts)} artifacts for run {run.id}"
+          + (f" ({reused} unchanged from earlier runs, {saved / 1048576:.1f} MB deduplicated)" if reused else ""))
+    return manifest
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+asyncio scraping engine for main.py --async.
+Runs every stage on one event loop over a pooled async HTTP client: each media's
+comment/liker pages, the followers chain and every lead's enrichment are logical
+tasks multiplexed under the client's global concurrency cap and the shared request
+scheduler; enrichments also follow the adaptive (AIMD) limit of the thread engines.
+The profile timeline and the followers list, each one sequential cursor chain, are
+crawled by profile.scrape_profile and followers.scrape_followers on worker threads. Output files match the staged and
+pipeline engines, and leads are capped by engagement the same way: the first ones
+to arrive are enriched early and reused when they make the cut.
+"""
+
+import os
+import asyncio
+from async_http import AsyncClient, DEFAULT_CONCURRENCY
+from concurrency import AsyncLimiter
+from getMediaId import decode_media_ids, parse_media_entry
+from paginator import Budget
+from retry import get_breaker
+from leadstore import EarlyLeads, aggregate_leads, iter_lines
+from records import RecordWriter, is_ndjson, artifact_path, has_lines
+import profile as profile_scraper
+import comments as comments_scraper
+import likes as likes_scraper
+import followers as followers_scraper
+import leads_data
+import events
+
+MAX_ITEMS = 50  # per-collector limit, same MVP caps as the synchronous collectors
+_DONE = None
+
+
+async def crawl_chains(chains, fetch, parse, handle, budget):
+    """Async Paginator: one task per (key, cursor) chain, pages in order within a chain.
+
+    Outstanding chains are cancelled as soon as the budget is spent.
+    """
+    tasks = set()
+
+    async def crawl(key, cursor):
+        while not budget.exhausted.is_set():
+            page = await fetch(key, cursor)
+            if get_breaker().tripped:
+                current = asyncio.current_task()
+                for task in tasks:
+                    if task is not current:
+                        task.cancel()
+                return
+            if not page:
+                return
+            try:
+                items, next_cursor = parse(key, page)
+            except Exception as e:
+                print(f"[!] Parse error for {key}: {e}")
+                return
+            if budget.exhausted.is_set() and items:
+                return
+            more = handle(key, items, next_cursor)
+            if budget.exhausted.is_set():
+                current = asyncio.current_task()
+                for task in tasks:
+                    if task is not current:
+                        task.cancel()
+                return
+            if not more or not next_cursor:
+                return
+            cursor = next_cursor
+
+    async for key, cursor in chains:
+        if budget.exhausted.is_set() or get_breaker().tripped:
+            break
+        tasks.add(asyncio.ensure_future(crawl(key, cursor)))
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _queue_chains(q):
+    """(media_id, None) chains from a queue of 'shortcode:media_id' records"""
+    while True:
+        entry = await q.get()
+        if entry is _DONE:
+            return
+        parts = parse_media_entry(entry)
+        if parts:
+            yield parts[1], None
+
+
+def open_records(path, indent=None):
+    """RecordWriter over a new file, NDJSON or JSON array by extension"""
+    ndjson = is_ndjson(path)
+    return RecordWriter(open(path, "w", encoding="utf-8"), ndjson, indent=None if ndjson else indent, index=True)
+
+
+def close_records(writer):
+    writer.close()
+    writer.f.close()
+
+
+class AsyncLeads(EarlyLeads):
+    """Dedupes usernames from every collector and enriches the first max_leads early, as tasks"""
+
+    def __init__(self, client, max_leads):
+        super().__init__(max_leads)
+        self.client = client
+        self.mode = os.environ.get("ENRICH_MODE", "single").strip() or "single"
+        self.limiter = AsyncLimiter()
+        self._tasks = []
+        self.profiles = {}  # lowercase username -> profile enriched by this run
+
+    def offer(self, username):
+        if get_breaker().tripped:
+            return
+        uname = self.accept(username)
+        if uname:
+            self._tasks.append(asyncio.ensure_future(self._fetch(uname.lower())))
+
+    async def _fetch(self, username):
+        """Profile for username, reusing one enriched earlier in the run; None if it failed"""
+        info = self.profiles.get(username)
+        if info:
+            return info
+        try:
+            info = await leads_data.enrich_username_async(self.client, username, self.mode, limiter=self.limiter)
+        except Exception as e:
+            print(f"⚠️ Enrichment failed for {username}: {e}")
+            return None
+        if not info:
+            print(f"⚠️ Skipped {username}")
+            return None
+        self.profiles[username] = info
+        return info
+
+    async def close(self):
+        """Wait for the early enrichments"""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    @events.stage("enrichment")
+    async def enrich_to_file(self, usernames, output_file, on_profile=None):
+        """Enrich the final leads into a record file as tasks; returns the number written"""
+        out = open_records(output_file, indent=2)
+
+        async def enrich(username):
+            if get_breaker().tripped:
+                return
+            info = await self._fetch(username.lower())
+            if info:
+                out.write(info)
+                events.record("leads_data", info)
+                if on_profile:
+                    on_profile(info)
+
+        try:
+            await asyncio.gather(*(enrich(uname) for uname in usernames))
+        finally:
+            close_records(out)
+        return out.count
+
+
+async def produce_media(username, paths, queues, refresh=False):
+    """Publish shortcode:media_id records from existing files or a live timeline crawl.
+
+    With refresh, existing post IDs are first updated with new posts only.
+    """
+    loop = asyncio.get_running_loop()
+
+    def publish(record):
+        for q in queues:
+            q.put_nowait(record)
+
+    try:
+        if refresh and has_lines(paths["postid"]):
+            try:
+                await asyncio.to_thread(
+                    profile_scraper.refresh_profile, username, paths["postid"],
+                    media_ids_file=paths["media_ids"] if has_lines(paths["media_ids"]) else None)
+            except Exception as e:
+                print(f"⚠️ Profile refresh failed, using existing post IDs: {e}")
+        if has_lines(paths["media_ids"]):
+            with open(paths["media_ids"], "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        publish(line.strip())
+        elif has_lines(paths["postid"]):
+            decode_media_ids(paths["postid"], paths["media_ids"], on_record=publish)
+        else:
+            # The timeline is a single sequential cursor chain, so the regular crawler
+            # runs on a worker thread and hands each record back to the loop
+            await asyncio.to_thread(
+                profile_scraper.scrape_profile, username, media_ids_file=paths["media_ids"],
+                on_media=lambda record: loop.call_soon_threadsafe(publish, record), output_file=paths["postid"])
+    except Exception as e:
+        print(f"⚠️ Profile stage failed: {e}")
+    finally:
+        # The crawl's publish callbacks were queued on the loop before to_thread returned
+        for q in queues:
+            q.put_nowait(_DONE)
+
+
+@events.stage("comments")
+async def collect_comments(client, q, path, offer):
+    budget = Budget(MAX_ITEMS)
+    out = open_records(path)
+
+    def handle(media_id, comments, after):
+        granted = budget.take(len(comments))
+        for comment in comments[:granted]:
+            out.write(comment)
+            events.record("comments", comment)
+            offer(comment.get("username"))
+        return granted == len(comments)
+
+    async def fetch(media_id, after):
+        return await comments_scraper.fetch_comments_async(client, media_id, after)
+
+    try:
+        await crawl_chains(_queue_chains(q), fetch, comments_scraper.parse_comments_page, handle, budget)
+    finally:
+        close_records(out)
+    print(f"✅ Saved {out.count} comments → {path}")
+    return out.count
+
+
+@events.stage("likes")
+async def collect_likes(client, q, path, offer):
+    budget = Budget(MAX_ITEMS)
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        def handle(media_id, usernames, next_max_id):
+            nonlocal count
+            granted = budget.take(len(usernames))
+            for uname in usernames[:granted]:
+                f.write(uname + "\n")
+                events.record("likes", uname)
+                offer(uname)
+            count += granted
+            return granted == len(usernames)
+
+        async def fetch(media_id, next_max_id):
+            return await likes_scraper.fetch_likers_async(client, media_id, next_max_id)
+
+        await crawl_chains(_queue_chains(q), fetch, likes_scraper.parse_likers_page, handle, budget)
+    print(f"✅ Saved {count} likers → {path}")
+    return count
+
+
+async def collect_followers(username, path, offer, delta=False):
+    """Followers are one sequential cursor chain too, so the regular crawler (with its
+    snapshots and delta mode) runs on a worker thread and hands each username to the loop"""
+    loop = asyncio.get_running_loop()
+    return await asyncio.to_thread(
+        followers_scraper.scrape_followers, username, delta=delta, output_file=path,
+        on_username=lambda uname: loop.call_soon_threadsafe(offer, uname))
+
+
+async def run_async(username, output_dir, max_leads=50, on_profile=None, concurrency=None,
+                    refresh=False, followers_delta=False):
+    """Run all stages on one event loop; returns the generated file paths like run_pipeline().
+
+    refresh and followers_delta work as in run_pipeline(); there are no checkpoints.
+    """
+    paths = {
+        "postid": os.path.join(output_dir, f"{username}_postid.txt"),
+        "media_ids": os.path.join(output_dir, f"{username}_media_ids.txt"),
+        "comments": artifact_path(output_dir, f"{username}_comments"),
+        "likes": os.path.join(output_dir, f"{username}_likers.txt"),
+        "followers": os.path.join(output_dir, f"{username}_followers.txt"),
+        "leads": os.path.join(output_dir, f"{username}_leads.txt"),
+        "leads_db": os.path.join(output_dir, f"{username}_leads.db"),
+        "leads_data": artifact_path(output_dir, f"{username}_leads_data"),
+    }
+    print("\n[async] Profile → comments/likes/followers → enrichment on one event loop")
+    print("-" * 60)
+
+    async with AsyncClient(concurrency or DEFAULT_CONCURRENCY) as client:
+        leads = AsyncLeads(client, max_leads)
+        comments_q, likes_q = asyncio.Queue(), asyncio.Queue()
+        results = await asyncio.gather(
+            produce_media(username, paths, (comments_q, likes_q), refresh),
+            collect_comments(client, comments_q, paths["comments"], leads.offer),
+            collect_likes(client, likes_q, paths["likes"], leads.offer),
+            collect_followers(username, paths["followers"], leads.offer, followers_delta),
+            return_exceptions=True,
+        )
+        for name, result in zip(("profile", "comments", "likes", "followers"), results):
+            if isinstance(result, Exception):
+                print(f"⚠️ {name} task failed: {result}")
+        await leads.close()
+        early = set(leads.profiles)
+
+        # The final leads are the most engaged ones, exactly as in the other engines
+        await asyncio.to_thread(aggregate_leads, paths["leads"], paths["likes"], paths["followers"],
+                                paths["comments"], max_leads, store_path=paths["leads_db"])
+        final = list(iter_lines(paths["leads"])) if os.path.exists(paths["leads"]) else []
+        enriched = await leads.enrich_to_file(final, paths["leads_data"], on_profile)
+        limits = leads.limiter.snapshot()
+        if limits["samples"]:
+            print(f"[*] Enrichment concurrency ended at {limits['limit']}/{limits['ceiling']} "
+                  f"(peak {limits['peak']}, {limits['increases']} increases, {limits['decreases']} decreases)")
+
+    stats = leads_data.get_enrichment_stats()
+    reused = sum(1 for uname in final if uname.lower() in early)
+    print(f"\n✅ Async engine done: {len(final)} leads by engagement from {leads.offered} collected usernames, "
+          f"{enriched} enriched ({reused} of {len(early)} early profiles kept, "
+          f"{stats['graphql_fallbacks']} GraphQL fallbacks)")
+    for key in ("media_ids", "likes", "followers"):
+        if not has_lines(paths[key]):
+            paths[key] = None
+    if not os.path.exists(paths["leads_db"]):
+        paths["leads_db"] = None
+    return paths
+
+
+def run_async_engine(username, output_dir, max_leads=50, on_profile=None, concurrency=None,
+                     refresh=False, followers_delta=False):
+    """Synchronous entry point for main.py"""
+    return asyncio.run(run_async(username, output_dir, max_leads, on_profile, concurrency,
+                                 refresh=refresh, followers_delta=followers_delta))
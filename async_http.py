@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Pooled asyncio HTTP client for the async engine (main.py --async).
+Mirrors http_client: same endpoint headers/timeouts, response cache and shared request
+scheduler, plus a global cap on in-flight requests. Responses are returned as
+requests.Response objects so the scrapers' page parsers work unchanged.
+
+Requires aiohttp (optional; only imported when the async engine is used).
+"""
+
+import os
+import asyncio
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from cookies_headers import COOKIES, HEADERS
+import http_client
+import scheduler
+import retry
+
+# --- Configuration ---
+# ASYNC_CONCURRENCY caps in-flight HTTP requests; any number of logical tasks may wait on it
+DEFAULT_CONCURRENCY = int(os.environ.get("ASYNC_CONCURRENCY", "16") or 16)
+
+
+def _import_aiohttp():
+    try:
+        import aiohttp
+    except ImportError:
+        raise RuntimeError("The async engine needs aiohttp: pip install aiohttp") from None
+    return aiohttp
+
+
+class AsyncClient:
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, pool_size=http_client.POOL_SIZE):
+        self.concurrency = concurrency
+        self.pool_size = pool_size
+        self._sessions = {}
+        self._slots = None
+        self._aiohttp = None
+
+    async def __aenter__(self):
+        aiohttp = self._aiohttp = _import_aiohttp()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        for key in ("auth", "anonymous"):
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            if key == "auth":
+                self._sessions[key] = aiohttp.ClientSession(connector=connector, headers=HEADERS, cookies=COOKIES)
+            else:
+                self._sessions[key] = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def __aexit__(self, *exc):
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions = {}
+
+    async def request(self, method, url, endpoint=None, headers=None, timeout=None, fresh=False,
+                      params=None, data=None, allow_redirects=True):
+        """Async counterpart of http_client.request"""
+        spec, merged, timeout = http_client.prepare(endpoint, headers, timeout)
+        cache, key, cached = http_client.cached_response(spec, method, url, endpoint, fresh, params, data)
+        if cached is not None:
+            return cached
+        session = self._sessions["anonymous" if spec.get("anonymous") else "auth"]
+        sched = scheduler.get_scheduler()
+        policy = retry.get_policy()
+        breaker = retry.get_breaker()
+        attempt = 0
+        while True:
+            breaker.check()
+            try:
+                status, resp_headers, final_url, body = await self._send(
+                    session, sched, method, url, endpoint, merged, timeout, params, data, allow_redirects)
+            except (self._aiohttp.ClientError, asyncio.TimeoutError) as e:
+                delay = policy.retry_delay(attempt, method, spec, error=e,
+                                           connect=isinstance(e, self._aiohttp.ClientConnectorError))
+                if delay is None:
+                    raise
+            else:
+                sched.observe(endpoint, status, resp_headers)
+                delay = policy.retry_delay(attempt, method, spec, status=status, headers=resp_headers)
+                if delay is None:
+                    break
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        result = requests.models.Response()
+        result.status_code = status
+        result.headers = resp_headers
+        result.url = final_url
+        result.encoding = get_encoding_from_headers(resp_headers) or "utf-8"
+        result._content = body
+        retry.check_session(result, spec)
+        http_client.store_response(cache, key, endpoint, result)
+        return result
+
+    async def _send(self, session, sched, method, url, endpoint, headers, timeout, params, data, allow_redirects):
+        """One attempt under the concurrency cap; returns (status, headers, final url, body)"""
+        async with self._slots:
+            wait = sched.reserve(endpoint)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with session.request(method, url, headers=headers or None, params=params, data=data,
+                                       allow_redirects=allow_redirects,
+                                       timeout=self._aiohttp.ClientTimeout(total=timeout)) as resp:
+                return resp.status, CaseInsensitiveDict(resp.headers), str(resp.url), await resp.read()
+
+    async def get(self, url, endpoint=None, **kwargs):
+        return await self.request("GET", url, endpoint=endpoint, **kwargs)
+
+    async def post(self, url, endpoint=None, **kwargs):
+        return await self.request("POST", url, endpoint=endpoint, **kwargs)
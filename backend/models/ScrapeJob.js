@@ -0,0 +1,45 @@
+const mongoose = require('mongoose');
+
+// One execution of the scrapers for a target; several ScrapeResults can share it
+const scrapeJobSchema = new mongoose.Schema({
+  target: {
+    type: String,
+    required: true
+  },
+  username: {
+    type: String,
+    required: true
+  },
+  args: [String],
+  runId: String,
+  status: {
+    type: String,
+    enum: ['queued', 'running', 'completed', 'failed'],
+    default: 'queued'
+  },
+  files: {
+    postid: String,
+    mediaIds: String,
+    comments: String,
+    likes: String,
+    followers: String,
+    leads: String,
+    leadsData: String,
+    leadsRanked: String
+  },
+  eventCount: {
+    type: Number,
+    default: 0
+  },
+  exitCode: Number,
+  startTime: Date,
+  endTime: Date,
+  error: String
+}, {
+  timestamps: true
+});
+
+// Index for finding in-flight jobs on restart
+scrapeJobSchema.index({ status: 1, createdAt: 1 });
+
+module.exports = mongoose.model('ScrapeJob', scrapeJobSchema);
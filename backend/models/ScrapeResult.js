@@ -10,6 +10,11 @@ const scrapeResultSchema = new mongoose.Schema({
     type: String,
     required: true
   },
+  job: {
+    type: mongoose.Schema.Types.ObjectId,
+    ref: 'ScrapeJob'
+  },
+  runId: String,
   status: {
     type: String,
     enum: ['pending', 'running', 'completed', 'failed'],
@@ -40,6 +45,7 @@ const scrapeResultSchema = new mongoose.Schema({
 
 // Index for faster queries
 scrapeResultSchema.index({ user: 1, createdAt: -1 });
+scrapeResultSchema.index({ job: 1 });
 
 module.exports = mongoose.model('ScrapeResult', scrapeResultSchema);
 
@@ -1,8 +1,8 @@
 const express = require('express');
 const fs = require('fs');
-const path = require('path');
 const ScrapeResult = require('../models/ScrapeResult');
 const { protect } = require('../middleware/auth');
+const { streamFile, sendBody, readPage, pageParams } = require('../services/artifacts');
 
 const router = express.Router();
 
@@ -30,7 +30,8 @@ router.get('/', protect, async (req, res) => {
 });
 
 // @route   GET /api/results/:id/file/:fileKey
-// @desc    Get file content for a scrape result
+// @desc    Get file content for a scrape result: ?offset=&limit= returns a page of records,
+//          otherwise the file is streamed (Range requests and gzip/br are supported)
 // @access  Private
 router.get('/:id/file/:fileKey', protect, async (req, res) => {
   try {
@@ -53,17 +54,28 @@ router.get('/:id/file/:fileKey', protect, async (req, res) => {
 
     const fileKey = req.params.fileKey;
     const filePath = result.files?.[fileKey];
+    const stat = filePath ? await fs.promises.stat(filePath).catch(() => null) : null;
 
-    if (!filePath || !fs.existsSync(filePath)) {
+    if (!stat || !stat.isFile()) {
       return res.status(404).json({ 
         success: false, 
         message: 'File not found' 
       });
     }
 
-    // Read and send file content
-    const fileContent = fs.readFileSync(filePath, 'utf8');
-    res.send(fileContent);
+    if (req.query.offset !== undefined || req.query.limit !== undefined) {
+      const { offset, limit } = pageParams(req.query);
+      const page = await readPage(filePath, stat, offset, limit);
+      if (!page) {
+        return res.status(501).json({
+          success: false,
+          message: 'This file has no record index; request it without offset/limit'
+        });
+      }
+      return sendBody(req, res, page, 'application/json; charset=utf-8');
+    }
+
+    streamFile(req, res, filePath, stat);
   } catch (error) {
     console.error('Get file error:', error);
     res.status(500).json({ 
@@ -1,386 +1,180 @@
 const express = require('express');
-const { spawn } = require('child_process');
-const path = require('path');
-const fs = require('fs');
+const ScrapeJob = require('../models/ScrapeJob');
 const ScrapeResult = require('../models/ScrapeResult');
 const { protect } = require('../middleware/auth');
+const { FILE_KEYS, enqueue, attachResult, subscribe } = require('../services/jobQueue');
 
 const router = express.Router();
 
-// @route   POST /api/scrape/start
-// @desc    Start scraping and stream results
-// @access  Private
-router.post('/start', protect, (req, res) => {
-  const { username } = req.body;
+// --pipeline streams records between stages so leads start arriving early;
+// --ndjson writes record artifacts one JSON object per line.
+const SCRAPE_ARGS = ['--pipeline', '--ndjson'];
 
-  if (!username) {
-    return res.status(400).json({ 
-      success: false, 
-      message: 'Instagram username is required' 
-    });
+// Turn one job event into the message the frontend renders (null: not forwarded)
+function toMessage(event) {
+  switch (event.type) {
+    case 'record': {
+      const fileKey = FILE_KEYS[event.artifact];
+      return fileKey ? { type: 'data', file: fileKey, data: event.data, seq: event.seq } : null;
+    }
+    case 'artifact':
+      // Stored on the ScrapeResult by the job queue
+      return null;
+    case 'error':
+      return { type: 'error', message: event.message, code: event.code, seq: event.seq };
+    default:
+      // log, stage, counters and complete events are passed through unchanged
+      return event;
   }
+}
 
-  // Set up Server-Sent Events
+function openStream(res) {
   res.setHeader('Content-Type', 'text/event-stream');
   res.setHeader('Cache-Control', 'no-cache');
   res.setHeader('Connection', 'keep-alive');
   res.setHeader('Access-Control-Allow-Origin', '*');
   res.setHeader('Access-Control-Allow-Credentials', 'true');
-
-  // Send initial connection message
-  res.write(`data: ${JSON.stringify({ type: 'connected', message: 'Streaming started' })}\n\n`);
-
-  // Create scrape result record
-  ScrapeResult.create({
-    user: req.user._id,
-    username: username,
-    status: 'running',
-    metadata: { startTime: new Date() }
-  }).then(scrapeResult => {
-    // Path to main.py
-    const mainScriptPath = path.join(__dirname, '../../main.py');
-    const outputDir = path.join(__dirname, '../../output');
-
-    // Ensure output directory exists
-    if (!fs.existsSync(outputDir)) {
-      fs.mkdirSync(outputDir, { recursive: true });
+}
+
+// Stream a job's events from offset `from` until it completes or the client leaves.
+// Leaving only detaches this client: the job keeps running for its other subscribers.
+function streamJob(req, res, jobId, from) {
+  let unsubscribe = null;
+  let closed = false;
+
+  const send = (event) => {
+    if (closed) return;
+    const message = toMessage(event);
+    if (message) {
+      res.write(`id: ${event.seq}\ndata: ${JSON.stringify(message)}\n\n`);
     }
+    if (event.type === 'complete') {
+      closed = true;
+      res.end();
+      if (unsubscribe) unsubscribe();
+    }
+  };
 
-    // Stream data from Python script
-    // Pass username as stdin to avoid interactive input
-    const pythonProcess = spawn('python3', [mainScriptPath], {
-      cwd: path.join(__dirname, '../..'),
-      env: { ...process.env, PYTHONUNBUFFERED: '1' },
-      stdio: ['pipe', 'pipe', 'pipe']
-    });
-
-    // Send username to Python script stdin
-    pythonProcess.stdin.write(username + '\n');
-    pythonProcess.stdin.end();
+  req.on('close', () => {
+    closed = true;
+    if (unsubscribe) unsubscribe();
+  });
 
-    let stdoutBuffer = '';
-    let stderrBuffer = '';
+  subscribe(jobId, from, send).then(stop => {
+    if (!stop) {
+      // Replay covered a finished job
+      if (!closed) {
+        closed = true;
+        res.end();
+      }
+    } else if (closed) {
+      stop();
+    } else {
+      unsubscribe = stop;
+    }
+  }).catch(error => {
+    console.error('Error replaying job events:', error);
+    res.end();
+  });
+}
 
-    // Handle stdout (Python print statements)
-    pythonProcess.stdout.on('data', (data) => {
-      stdoutBuffer += data.toString();
-      const lines = stdoutBuffer.split('\n');
-      stdoutBuffer = lines.pop() || ''; // Keep incomplete line
+// @route   POST /api/scrape/start
+// @desc    Start scraping (or join the running scrape of the same target) and stream results
+// @access  Private
+router.post('/start', protect, async (req, res) => {
+  const { username } = req.body;
 
-      lines.forEach(line => {
-        if (line.trim()) {
-          res.write(`data: ${JSON.stringify({ 
-            type: 'log', 
-            message: line.trim() 
-          })}\n\n`);
-        }
-      });
+  if (!username || !username.trim()) {
+    return res.status(400).json({
+      success: false,
+      message: 'Instagram username is required'
     });
+  }
 
-    // Handle stderr
-    pythonProcess.stderr.on('data', (data) => {
-      stderrBuffer += data.toString();
-      const lines = stderrBuffer.split('\n');
-      stderrBuffer = lines.pop() || '';
-
-      lines.forEach(line => {
-        if (line.trim()) {
-          res.write(`data: ${JSON.stringify({ 
-            type: 'error', 
-            message: line.trim() 
-          })}\n\n`);
-        }
-      });
+  // Set up Server-Sent Events
+  openStream(res);
+
+  try {
+    const job = await enqueue(username, SCRAPE_ARGS);
+    const scrapeResult = await attachResult(job, {
+      user: req.user._id,
+      username: job.doc.username,
+      metadata: { startTime: new Date() }
     });
 
-    // Monitor output files and stream results
-    const filesToMonitor = [
-      { key: 'postid', file: `${username}_postid.txt` },
-      { key: 'mediaIds', file: `${username}_media_ids.txt` },
-      { key: 'comments', file: `${username}_comments.json` },
-      { key: 'likes', file: `${username}_likers.txt` },
-      { key: 'followers', file: `${username}_followers.txt` },
-      { key: 'leads', file: `${username}_leads.txt` },
-      { key: 'leadsData', file: `${username}_leads_data.json` },
-      { key: 'leadsRanked', file: `${username}_leads_ranked.json` }
-    ];
-
-    const filePositions = new Map(); // Track read position for each file
-    const fileStreams = new Map(); // Track active streams to avoid duplicates
-
-    // Monitor files every 2 seconds
-    const monitorInterval = setInterval(() => {
-      filesToMonitor.forEach(({ key, file }) => {
-        const filePath = path.join(outputDir, file);
-        
-        if (fs.existsSync(filePath)) {
-          const stats = fs.statSync(filePath);
-          const currentSize = stats.size;
-          const lastPosition = filePositions.get(key) || 0;
-          
-          // Only process if file has new content and we're not already streaming it
-          if (currentSize > lastPosition && !fileStreams.has(key)) {
-            // File has new content, stream it
-            streamFileIncremental(filePath, key, lastPosition, res, scrapeResult._id, filePositions, fileStreams);
-          }
-        }
-      });
-    }, 2000); // Check every 2 seconds
-
-    // Stream incremental file content
-    function streamFileIncremental(filePath, fileKey, startPosition, response, resultId, filePositionsMap, fileStreamsMap) {
-      try {
-        if (!fs.existsSync(filePath)) return;
-
-        // Mark that we're streaming this file
-        fileStreamsMap.set(fileKey, true);
-
-        const fileExtension = path.extname(filePath);
-        const stream = fs.createReadStream(filePath, { 
-          encoding: 'utf8',
-          start: startPosition
-        });
-        
-        let buffer = '';
-        let bytesRead = 0;
-
-        stream.on('data', (chunk) => {
-          buffer += chunk;
-          bytesRead += Buffer.byteLength(chunk, 'utf8');
-          
-          if (fileExtension === '.json') {
-            // Parse JSON items from buffer - handle streamed JSON arrays
-            // Look for complete JSON objects (may span multiple lines)
-            let jsonBuffer = buffer;
-            
-            // Try to extract complete JSON objects
-            let braceCount = 0;
-            let objectStart = -1;
-            let inString = false;
-            let escapeNext = false;
-            
-            for (let i = 0; i < jsonBuffer.length; i++) {
-              const char = jsonBuffer[i];
-              
-              if (escapeNext) {
-                escapeNext = false;
-                continue;
-              }
-              
-              if (char === '\\') {
-                escapeNext = true;
-                continue;
-              }
-              
-              if (char === '"' && !escapeNext) {
-                inString = !inString;
-                continue;
-              }
-              
-              if (!inString) {
-                if (char === '{') {
-                  if (braceCount === 0) {
-                    objectStart = i;
-                  }
-                  braceCount++;
-                } else if (char === '}') {
-                  braceCount--;
-                  if (braceCount === 0 && objectStart >= 0) {
-                    // Found complete object
-                    try {
-                      const jsonStr = jsonBuffer.substring(objectStart, i + 1);
-                      const item = JSON.parse(jsonStr);
-                      response.write(`data: ${JSON.stringify({
-                        type: 'data',
-                        file: fileKey,
-                        data: item
-                      })}\n\n`);
-                      
-                      // Remove processed object from buffer
-                      jsonBuffer = jsonBuffer.substring(i + 1);
-                      i = -1; // Reset to start
-                      objectStart = -1;
-                    } catch (e) {
-                      // Invalid JSON, skip
-                    }
-                  }
-                }
-              }
-            }
-            
-            // Keep unprocessed buffer (incomplete objects)
-            buffer = jsonBuffer;
-          } else {
-            // Text file - stream line by line
-            const lines = buffer.split('\n');
-            buffer = lines.pop() || '';
-
-            lines.forEach(line => {
-              if (line.trim()) {
-                response.write(`data: ${JSON.stringify({
-                  type: 'data',
-                  file: fileKey,
-                  data: line.trim()
-                })}\n\n`);
-              }
-            });
-          }
-        });
+    // Send initial connection message; jobId lets the client reattach later
+    res.write(`data: ${JSON.stringify({
+      type: 'connected',
+      message: job.doc.status === 'queued' ? 'Job queued' : 'Streaming started',
+      jobId: job.id,
+      resultId: scrapeResult._id
+    })}\n\n`);
 
-        stream.on('end', () => {
-          // Update position after we've finished reading
-          filePositionsMap.set(fileKey, startPosition + bytesRead);
-          // Remove from active streams
-          fileStreamsMap.delete(fileKey);
-        });
+    streamJob(req, res, job.id, 0);
+  } catch (error) {
+    console.error('Error starting scrape job:', error);
+    res.write(`data: ${JSON.stringify({
+      type: 'error',
+      message: 'Failed to start scraping process'
+    })}\n\n`);
+    res.end();
+  }
+});
 
-        stream.on('error', (error) => {
-          console.error(`Stream error for ${filePath}:`, error);
-          fileStreamsMap.delete(fileKey);
-        });
+// Load a job the current user has a result for
+async function findOwnJob(req, res) {
+  const owned = await ScrapeResult.exists({ user: req.user._id, job: req.params.id });
+  const job = owned ? await ScrapeJob.findById(req.params.id).select('-__v') : null;
+  if (!job) {
+    res.status(404).json({
+      success: false,
+      message: 'Job not found'
+    });
+  }
+  return job;
+}
 
-        // Update scrape result with file path
-        ScrapeResult.findByIdAndUpdate(resultId, {
-          $set: { [`files.${fileKey}`]: filePath }
-        }).exec();
-        
-      } catch (error) {
-        console.error(`Error streaming file ${filePath}:`, error);
-        fileStreamsMap.delete(fileKey);
-      }
+// @route   GET /api/scrape/jobs/:id
+// @desc    Get a scrape job's status
+// @access  Private
+router.get('/jobs/:id', protect, async (req, res) => {
+  try {
+    const job = await findOwnJob(req, res);
+    if (job) {
+      res.json({ success: true, data: job });
     }
-
-    // Handle process completion
-    pythonProcess.on('close', (code) => {
-      // Clean up monitoring interval
-      clearInterval(monitorInterval);
-
-      // Final read of any remaining content - wait a bit for files to finish writing
-      setTimeout(() => {
-        filesToMonitor.forEach(({ key, file }) => {
-          const filePath = path.join(outputDir, file);
-          if (fs.existsSync(filePath)) {
-            const stats = fs.statSync(filePath);
-            const lastPosition = filePositions.get(key) || 0;
-            const currentSize = stats.size;
-            
-            // Read all remaining content
-            if (currentSize > lastPosition) {
-              // Read the entire remaining portion
-              const remainingContent = fs.readFileSync(filePath, 'utf8').slice(lastPosition);
-              
-              if (remainingContent.trim()) {
-                const fileExtension = path.extname(filePath);
-                
-                if (fileExtension === '.json') {
-                  // Parse JSON items - extract complete JSON objects
-                  let braceCount = 0;
-                  let objectStart = -1;
-                  let inString = false;
-                  let escapeNext = false;
-                  
-                  for (let i = 0; i < remainingContent.length; i++) {
-                    const char = remainingContent[i];
-                    
-                    if (escapeNext) {
-                      escapeNext = false;
-                      continue;
-                    }
-                    
-                    if (char === '\\') {
-                      escapeNext = true;
-                      continue;
-                    }
-                    
-                    if (char === '"' && !escapeNext) {
-                      inString = !inString;
-                      continue;
-                    }
-                    
-                    if (!inString) {
-                      if (char === '{') {
-                        if (braceCount === 0) {
-                          objectStart = i;
-                        }
-                        braceCount++;
-                      } else if (char === '}') {
-                        braceCount--;
-                        if (braceCount === 0 && objectStart >= 0) {
-                          // Found complete object
-                          try {
-                            const jsonStr = remainingContent.substring(objectStart, i + 1);
-                            const item = JSON.parse(jsonStr);
-                            res.write(`data: ${JSON.stringify({
-                              type: 'data',
-                              file: key,
-                              data: item
-                            })}\n\n`);
-                          } catch (e) {
-                            // Invalid JSON, skip
-                          }
-                          objectStart = -1;
-                        }
-                      }
-                    }
-                  }
-                } else {
-                  // Text file - send line by line
-                  const lines = remainingContent.split('\n');
-                  lines.forEach(line => {
-                    if (line.trim()) {
-                      res.write(`data: ${JSON.stringify({
-                        type: 'data',
-                        file: key,
-                        data: line.trim()
-                      })}\n\n`);
-                    }
-                  });
-                }
-              }
-              
-              // Update position
-              filePositions.set(key, currentSize);
-            }
-          }
-        });
-        
-        // Send completion message after final read
-        res.write(`data: ${JSON.stringify({ 
-          type: 'complete', 
-          code: code,
-          message: code === 0 ? 'Scraping completed successfully' : 'Scraping failed'
-        })}\n\n`);
-        
-        res.end();
-      }, 3000); // Wait 3 seconds for all files to finish writing
-
-      // Update scrape result (will be updated again after final read)
-      ScrapeResult.findByIdAndUpdate(scrapeResult._id, {
-        status: code === 0 ? 'completed' : 'failed',
-        'metadata.endTime': new Date(),
-        error: code !== 0 ? `Process exited with code ${code}` : undefined
-      }).exec();
+  } catch (error) {
+    console.error('Get job error:', error);
+    res.status(500).json({
+      success: false,
+      message: 'Server error'
     });
+  }
+});
 
-    // Handle client disconnect
-    req.on('close', () => {
-      pythonProcess.kill();
-      clearInterval(monitorInterval);
-      ScrapeResult.findByIdAndUpdate(scrapeResult._id, {
-        status: 'failed',
-        error: 'Client disconnected'
-      }).exec();
+// @route   GET /api/scrape/jobs/:id/events?from=N
+// @desc    Reattach to a job: replay its events from offset N (or Last-Event-ID + 1), then follow it
+// @access  Private
+router.get('/jobs/:id/events', protect, async (req, res) => {
+  try {
+    const job = await findOwnJob(req, res);
+    if (!job) return;
+
+    const lastEventId = parseInt(req.headers['last-event-id'], 10);
+    const from = Number.isInteger(lastEventId)
+      ? lastEventId + 1
+      : Math.max(0, parseInt(req.query.from, 10) || 0);
+
+    openStream(res);
+    res.write(`data: ${JSON.stringify({ type: 'connected', message: 'Reattached', jobId: job.id, from })}\n\n`);
+    streamJob(req, res, job.id, from);
+  } catch (error) {
+    console.error('Reattach error:', error);
+    res.status(500).json({
+      success: false,
+      message: 'Server error'
     });
-
-  }).catch(error => {
-    console.error('Error creating scrape result:', error);
-    res.write(`data: ${JSON.stringify({ 
-      type: 'error', 
-      message: 'Failed to start scraping process' 
-    })}\n\n`);
-    res.end();
-  });
+  }
 });
 
 module.exports = router;
-
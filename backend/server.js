@@ -3,6 +3,7 @@ const mongoose = require('mongoose');
 const cors = require('cors');
 const dotenv = require('dotenv');
 const path = require('path');
+const { recoverJobs } = require('./services/jobQueue');
 
 // Load environment variables
 dotenv.config();
@@ -49,7 +50,11 @@ mongoose.connect(process.env.MONGODB_URI || 'mongodb://localhost:27017/instagram
   useNewUrlParser: true,
   useUnifiedTopology: true,
 })
-.then(() => console.log('✅ MongoDB connected'))
+.then(() => {
+  console.log('✅ MongoDB connected');
+  // Pick up scrape jobs a previous server process did not finish
+  recoverJobs().catch(err => console.error('❌ Job recovery error:', err));
+})
 .catch(err => console.error('❌ MongoDB connection error:', err));
 
 const PORT = process.env.PORT || 5000;
@@ -0,0 +1,218 @@
+const fs = require('fs');
+const zlib = require('zlib');
+const readline = require('readline');
+const { pipeline } = require('stream');
+
+// Record index sidecar written by the scrapers (see records.py): one little-endian
+// uint64 (start, end) byte span per record
+const INDEX_SUFFIX = '.idx';
+const SPAN_SIZE = 16;
+const MAX_PAGE = 1000;
+const DEFAULT_PAGE = 100;
+// Bodies smaller than this are sent uncompressed
+const MIN_COMPRESS = 1024;
+
+const CONTENT_TYPES = {
+  '.ndjson': 'application/x-ndjson; charset=utf-8',
+  '.json': 'application/json; charset=utf-8',
+  '.csv': 'text/csv; charset=utf-8',
+  '.txt': 'text/plain; charset=utf-8'
+};
+
+function contentType(filePath) {
+  const ext = Object.keys(CONTENT_TYPES).find(e => filePath.endsWith(e));
+  return ext ? CONTENT_TYPES[ext] : 'application/octet-stream';
+}
+
+function isLineOriented(filePath) {
+  return filePath.endsWith('.ndjson') || filePath.endsWith('.txt');
+}
+
+// Pick br or gzip from Accept-Encoding (q=0 means refused); null for identity
+function negotiateEncoding(req) {
+  const accepted = {};
+  (req.headers['accept-encoding'] || '').split(',').forEach(part => {
+    const [name, ...params] = part.trim().toLowerCase().split(';');
+    const q = params.map(p => p.trim()).find(p => p.startsWith('q='));
+    accepted[name] = q ? parseFloat(q.slice(2)) : 1;
+  });
+  const wildcard = accepted['*'] || 0;
+  let best = null;
+  let bestQ = 0;
+  for (const encoding of ['br', 'gzip']) {
+    const q = encoding in accepted ? accepted[encoding] : wildcard;
+    if (q > bestQ) {
+      best = encoding;
+      bestQ = q;
+    }
+  }
+  return best;
+}
+
+function compressor(encoding) {
+  return encoding === 'br'
+    ? zlib.createBrotliCompress({ params: { [zlib.constants.BROTLI_PARAM_QUALITY]: 4 } })
+    : zlib.createGzip();
+}
+
+// Parse a single "bytes=a-b" range; null when absent, 'invalid' when unsatisfiable
+function parseRange(header, size) {
+  if (!header) return null;
+  const match = /^bytes=(\d*)-(\d*)$/.exec(header.trim());
+  if (!match || (!match[1] && !match[2])) return 'invalid';
+  let start;
+  let end;
+  if (!match[1]) {
+    // Suffix range: the last N bytes
+    start = Math.max(0, size - Number(match[2]));
+    end = size - 1;
+  } else {
+    start = Number(match[1]);
+    end = match[2] ? Math.min(Number(match[2]), size - 1) : size - 1;
+  }
+  if (start > end || start >= size) return 'invalid';
+  return { start, end };
+}
+
+// Stream a whole artifact, honoring Range (uncompressed) or compressing when accepted
+function streamFile(req, res, filePath, stat) {
+  const etag = `"${stat.size.toString(16)}-${Math.floor(stat.mtimeMs).toString(16)}"`;
+  res.setHeader('Content-Type', contentType(filePath));
+  res.setHeader('Accept-Ranges', 'bytes');
+  res.setHeader('ETag', etag);
+  res.setHeader('Last-Modified', stat.mtime.toUTCString());
+  res.setHeader('Vary', 'Accept-Encoding');
+
+  if (req.headers['if-none-match'] === etag) {
+    return res.status(304).end();
+  }
+
+  const range = parseRange(req.headers.range, stat.size);
+  if (range === 'invalid') {
+    res.setHeader('Content-Range', `bytes */${stat.size}`);
+    return res.status(416).end();
+  }
+
+  let stream;
+  if (range) {
+    res.status(206);
+    res.setHeader('Content-Range', `bytes ${range.start}-${range.end}/${stat.size}`);
+    res.setHeader('Content-Length', range.end - range.start + 1);
+    stream = [fs.createReadStream(filePath, range), res];
+  } else {
+    const encoding = stat.size >= MIN_COMPRESS ? negotiateEncoding(req) : null;
+    if (encoding) {
+      res.setHeader('Content-Encoding', encoding);
+      stream = [fs.createReadStream(filePath), compressor(encoding), res];
+    } else {
+      res.setHeader('Content-Length', stat.size);
+      stream = [fs.createReadStream(filePath), res];
+    }
+  }
+  pipeline(...stream, (err) => {
+    if (err && err.code !== 'ERR_STREAM_PREMATURE_CLOSE') {
+      console.error('File stream error:', err.message);
+    }
+  });
+}
+
+// Send a small in-memory body, compressed when accepted
+function sendBody(req, res, body, type) {
+  const data = Buffer.from(body);
+  res.setHeader('Content-Type', type);
+  res.setHeader('Vary', 'Accept-Encoding');
+  const encoding = data.length >= MIN_COMPRESS ? negotiateEncoding(req) : null;
+  if (!encoding) {
+    return res.send(data);
+  }
+  const done = (err, compressed) => {
+    if (err) return res.send(data);
+    res.setHeader('Content-Encoding', encoding);
+    res.send(compressed);
+  };
+  if (encoding === 'br') {
+    zlib.brotliCompress(data, { params: { [zlib.constants.BROTLI_PARAM_QUALITY]: 4 } }, done);
+  } else {
+    zlib.gzip(data, done);
+  }
+}
+
+// Records [offset, offset + limit) through the index: two positioned reads, no scan
+async function readIndexedPage(filePath, stat, offset, limit) {
+  let index;
+  try {
+    index = await fs.promises.open(filePath + INDEX_SUFFIX, 'r');
+  } catch (e) {
+    return null;
+  }
+  try {
+    const indexSize = (await index.stat()).size;
+    if (indexSize % SPAN_SIZE) return null;
+    const total = indexSize / SPAN_SIZE;
+    const count = Math.max(0, Math.min(limit, total - offset));
+    if (!count) return { total, records: [] };
+
+    const spans = Buffer.alloc(count * SPAN_SIZE);
+    await index.read(spans, 0, spans.length, offset * SPAN_SIZE);
+    const ranges = [];
+    for (let i = 0; i < count; i++) {
+      ranges.push([
+        Number(spans.readBigUInt64LE(i * SPAN_SIZE)),
+        Number(spans.readBigUInt64LE(i * SPAN_SIZE + 8))
+      ]);
+    }
+    const first = ranges[0][0];
+    const last = ranges[ranges.length - 1][1];
+    if (last > stat.size) return null; // index does not match the file
+
+    // Records are stored in order, so one read covers the page
+    const file = await fs.promises.open(filePath, 'r');
+    const data = Buffer.alloc(last - first);
+    try {
+      await file.read(data, 0, data.length, first);
+    } finally {
+      await file.close();
+    }
+    return {
+      total,
+      records: ranges.map(([start, end]) => data.subarray(start - first, end - first).toString('utf8'))
+    };
+  } finally {
+    await index.close();
+  }
+}
+
+// Fallback for line artifacts still being written (no index yet): stream and count lines
+async function readLinePage(filePath, offset, limit) {
+  const lines = readline.createInterface({ input: fs.createReadStream(filePath), crlfDelay: Infinity });
+  const records = [];
+  let total = 0;
+  for await (const line of lines) {
+    if (!line.trim()) continue;
+    if (total >= offset && records.length < limit) records.push(line);
+    total += 1;
+  }
+  return { total, records };
+}
+
+// A page of records as a JSON response body: {success, offset, limit, total, items}
+async function readPage(filePath, stat, offset, limit) {
+  let page = await readIndexedPage(filePath, stat, offset, limit);
+  if (!page && isLineOriented(filePath)) {
+    page = await readLinePage(filePath, offset, limit);
+  }
+  if (!page) return null;
+  // JSON records are spliced in as stored; text lines become JSON strings
+  const items = filePath.endsWith('.txt')
+    ? JSON.stringify(page.records)
+    : `[${page.records.join(',')}]`;
+  return `{"success":true,"offset":${offset},"limit":${limit},"total":${page.total},"items":${items}}`;
+}
+
+function pageParams(query) {
+  const offset = Math.max(0, parseInt(query.offset, 10) || 0);
+  const limit = Math.min(MAX_PAGE, Math.max(1, parseInt(query.limit, 10) || DEFAULT_PAGE));
+  return { offset, limit };
+}
+
+module.exports = { streamFile, sendBody, readPage, pageParams };
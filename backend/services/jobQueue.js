@@ -0,0 +1,211 @@
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+const { EventEmitter } = require('events');
+const ScrapeJob = require('../models/ScrapeJob');
+const ScrapeResult = require('../models/ScrapeResult');
+const { runScrape } = require('./worker');
+
+// Every job appends its events here (one JSON object per line) so clients can replay them
+const JOB_DIR = path.join(__dirname, '../../output/jobs');
+// Jobs running at once; matches the worker's default pool size
+const JOB_CONCURRENCY = Number(process.env.JOB_CONCURRENCY) || 2;
+// Finished jobs stay in memory this long so reattaching clients skip the disk
+const RETAIN_MS = 10 * 60 * 1000;
+
+// Event artifact names → ScrapeResult.files keys
+const FILE_KEYS = {
+  postid: 'postid',
+  media_ids: 'mediaIds',
+  comments: 'comments',
+  likes: 'likes',
+  followers: 'followers',
+  leads: 'leads',
+  leads_data: 'leadsData',
+  leads_ranked: 'leadsRanked'
+};
+
+const jobs = new Map();     // job id → Job (in flight, or recently finished)
+const inFlight = new Map(); // target → Promise<Job>, so one target never runs twice at once
+const waiting = [];
+let running = 0;
+
+function eventLogPath(jobId) {
+  return path.join(JOB_DIR, `${jobId}.ndjson`);
+}
+
+function normalizeTarget(username) {
+  return username.trim().replace(/^@/, '').toLowerCase();
+}
+
+class Job extends EventEmitter {
+  constructor(doc, events = []) {
+    super();
+    this.setMaxListeners(0);
+    this.doc = doc;
+    this.id = String(doc._id);
+    this.events = events;
+    this.done = false;
+    fs.mkdirSync(JOB_DIR, { recursive: true });
+    this.log = fs.createWriteStream(eventLogPath(this.id), { flags: 'a' });
+  }
+
+  // Number the event, persist it and hand it to every subscriber
+  push(event) {
+    const entry = { seq: this.events.length, ...event };
+    this.events.push(entry);
+    this.log.write(JSON.stringify(entry) + '\n');
+    this.emit('event', entry);
+  }
+}
+
+// State a finished job gives every ScrapeResult attached to it
+function finalState(doc) {
+  return {
+    status: doc.status,
+    'metadata.endTime': doc.endTime,
+    error: doc.error
+  };
+}
+
+function handleEvent(job, event) {
+  if (event.type === 'run') {
+    job.doc.runId = event.run_id;
+    ScrapeJob.updateOne({ _id: job.doc._id }, { $set: { runId: event.run_id } }).exec();
+    ScrapeResult.updateMany({ job: job.doc._id }, { $set: { runId: event.run_id } }).exec();
+  } else if (event.type === 'artifact' && FILE_KEYS[event.artifact]) {
+    const key = `files.${FILE_KEYS[event.artifact]}`;
+    job.doc.set(key, event.path);
+    ScrapeJob.updateOne({ _id: job.doc._id }, { $set: { [key]: event.path } }).exec();
+    ScrapeResult.updateMany({ job: job.doc._id }, { $set: { [key]: event.path } }).exec();
+  }
+  job.push(event);
+}
+
+function finish(job, code) {
+  job.push({
+    type: 'complete',
+    code: code,
+    message: code === 0 ? 'Scraping completed successfully' : 'Scraping failed'
+  });
+  job.doc.status = code === 0 ? 'completed' : 'failed';
+  job.doc.exitCode = code;
+  job.doc.endTime = new Date();
+  job.doc.error = code !== 0 ? `Process exited with code ${code}` : undefined;
+  job.doc.eventCount = job.events.length;
+  job.doc.save().catch(err => console.error('Error saving scrape job:', err));
+  ScrapeResult.updateMany({ job: job.doc._id }, finalState(job.doc)).exec();
+
+  job.done = true;
+  job.log.end();
+  inFlight.delete(job.doc.target);
+  running -= 1;
+  drain();
+  setTimeout(() => jobs.delete(job.id), RETAIN_MS).unref();
+}
+
+function start(job) {
+  running += 1;
+  job.doc.status = 'running';
+  job.doc.startTime = job.doc.startTime || new Date();
+  job.doc.save().catch(err => console.error('Error saving scrape job:', err));
+  // The job id names the run's output directory, so a re-queued job resumes the same run
+  const args = [...job.doc.args, `--run-id=${job.id}`];
+  runScrape(job.doc.username, args, (event) => handleEvent(job, event), (code) => finish(job, code));
+}
+
+function drain() {
+  while (running < JOB_CONCURRENCY && waiting.length) {
+    start(waiting.shift());
+  }
+}
+
+function schedule(job) {
+  jobs.set(job.id, job);
+  waiting.push(job);
+  drain();
+  return job;
+}
+
+async function createJob(target, username, args) {
+  const doc = await ScrapeJob.create({ target, username, args });
+  return schedule(new Job(doc));
+}
+
+// Queue a scrape of username, or join the job already queued or running for it
+async function enqueue(username, args) {
+  const target = normalizeTarget(username);
+  if (!inFlight.has(target)) {
+    const pending = createJob(target, username.trim().replace(/^@/, ''), args);
+    inFlight.set(target, pending);
+    pending.catch(() => inFlight.delete(target));
+  }
+  return inFlight.get(target);
+}
+
+// Create a ScrapeResult that follows job: it picks up the job's files and final status
+async function attachResult(job, fields) {
+  const result = await ScrapeResult.create({
+    ...fields,
+    job: job.doc._id,
+    runId: job.doc.runId,
+    status: 'running',
+    files: job.doc.files ? job.doc.files.toObject() : {}
+  });
+  if (job.done) {
+    await ScrapeResult.updateOne({ _id: result._id }, finalState(job.doc));
+  }
+  return result;
+}
+
+// Read a job's persisted events with seq >= from
+async function readLog(jobId, from, onEvent) {
+  const logPath = eventLogPath(jobId);
+  if (!fs.existsSync(logPath)) return;
+  const lines = readline.createInterface({ input: fs.createReadStream(logPath), crlfDelay: Infinity });
+  for await (const line of lines) {
+    if (!line.trim()) continue;
+    try {
+      const event = JSON.parse(line);
+      if (event.seq >= from) onEvent(event);
+    } catch (e) {
+      // A torn final line from a crash is skipped
+    }
+  }
+}
+
+// Replay events from offset `from`, then follow the job live.
+// Returns an unsubscribe function, or null when the job has nothing more to send.
+async function subscribe(jobId, from, onEvent) {
+  const job = jobs.get(String(jobId));
+  if (!job) {
+    await readLog(jobId, from, onEvent);
+    return null;
+  }
+  job.events.slice(from).forEach(onEvent);
+  if (job.done) return null;
+  job.on('event', onEvent);
+  return () => job.off('event', onEvent);
+}
+
+// Re-queue jobs a previous server process left unfinished; running ones resume from their checkpoint
+async function recoverJobs() {
+  const docs = await ScrapeJob.find({ status: { $in: ['queued', 'running'] } }).sort({ createdAt: 1 });
+  for (const doc of docs) {
+    if (inFlight.has(doc.target)) continue;
+    const events = [];
+    await readLog(doc._id, 0, (event) => events.push(event));
+    if (doc.status === 'running' && !doc.args.includes('--resume')) {
+      doc.args.push('--resume');
+    }
+    doc.status = 'queued';
+    const job = new Job(doc, events);
+    job.push({ type: 'log', message: 'Job re-queued after a server restart' });
+    inFlight.set(doc.target, Promise.resolve(schedule(job)));
+  }
+  if (docs.length) {
+    console.log(`↻ Re-queued ${docs.length} unfinished scrape job(s)`);
+  }
+}
+
+module.exports = { FILE_KEYS, enqueue, attachResult, subscribe, recoverJobs };
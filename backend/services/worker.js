@@ -0,0 +1,137 @@
+const http = require('http');
+const path = require('path');
+const fs = require('fs');
+const { spawn } = require('child_process');
+
+const ROOT = path.join(__dirname, '../..');
+const WORKER_SOCKET = process.env.WORKER_SOCKET || path.join(ROOT, 'output', 'worker.sock');
+const WORKER_PORT = process.env.WORKER_PORT;
+
+// Split a byte stream into lines and hand each parsed JSON object to onEvent
+function lineParser(onEvent) {
+  let buffer = '';
+  return (data) => {
+    buffer += data.toString();
+    const lines = buffer.split('\n');
+    buffer = lines.pop() || '';
+    lines.forEach(line => {
+      if (!line.trim()) return;
+      try {
+        onEvent(JSON.parse(line));
+      } catch (e) {
+        console.error('Invalid event line:', line.slice(0, 200));
+      }
+    });
+  };
+}
+
+// Run one job on the resident worker (worker.py); events arrive as NDJSON
+function runOnWorker(username, args, onEvent, onDone, onUnavailable) {
+  const body = JSON.stringify({ username, args });
+  const target = WORKER_PORT
+    ? { host: '127.0.0.1', port: Number(WORKER_PORT) }
+    : { socketPath: WORKER_SOCKET };
+  let finished = false;
+  const finish = (code) => {
+    if (!finished) {
+      finished = true;
+      onDone(code);
+    }
+  };
+
+  const req = http.request({
+    ...target,
+    method: 'POST',
+    path: '/jobs',
+    headers: { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(body) }
+  }, (res) => {
+    if (res.statusCode !== 200) {
+      res.resume();
+      onEvent({ type: 'error', message: `Worker refused the job (HTTP ${res.statusCode})` });
+      return finish(1);
+    }
+    const parse = lineParser((event) => {
+      if (event.type === 'complete') {
+        finish(event.code);
+      } else {
+        onEvent(event);
+      }
+    });
+    res.on('data', parse);
+    res.on('end', () => finish(1));
+    res.on('error', () => finish(1));
+  });
+
+  req.on('error', (err) => {
+    if (finished) return;
+    if (err.code === 'ECONNREFUSED' || err.code === 'ENOENT') {
+      // No worker running: the caller falls back to a one-off process
+      finished = true;
+      return onUnavailable();
+    }
+    onEvent({ type: 'error', message: `Worker connection failed: ${err.message}` });
+    finish(1);
+  });
+  req.end(body);
+
+  // Closing the connection makes the worker stop this job
+  return { cancel: () => { finished = true; req.destroy(); } };
+}
+
+// Run one job in a fresh main.py process; fd 3 carries structured events (see events.py)
+function runProcess(username, args, onEvent, onDone) {
+  const outputDir = path.join(ROOT, 'output');
+  if (!fs.existsSync(outputDir)) {
+    fs.mkdirSync(outputDir, { recursive: true });
+  }
+
+  const pythonProcess = spawn('python3', [path.join(ROOT, 'main.py'), ...args], {
+    cwd: ROOT,
+    env: { ...process.env, PYTHONUNBUFFERED: '1', EVENTS_FD: '3' },
+    stdio: ['pipe', 'pipe', 'pipe', 'pipe']
+  });
+
+  // Pass username as stdin to avoid interactive input
+  pythonProcess.stdin.write(username + '\n');
+  pythonProcess.stdin.end();
+
+  const consoleLines = (type) => {
+    let buffer = '';
+    return (data) => {
+      buffer += data.toString();
+      const lines = buffer.split('\n');
+      buffer = lines.pop() || '';
+      lines.forEach(line => {
+        if (line.trim()) onEvent({ type, message: line.trim() });
+      });
+    };
+  };
+  pythonProcess.stdout.on('data', consoleLines('log'));
+  pythonProcess.stderr.on('data', consoleLines('error'));
+  pythonProcess.stdio[3].on('data', lineParser(onEvent));
+
+  // 'close' fires after every stdio stream, fd 3 included, has ended
+  pythonProcess.on('close', (code) => onDone(code));
+
+  return { cancel: () => pythonProcess.kill() };
+}
+
+// Run a scrape job, preferring the resident worker over spawning main.py.
+// onEvent receives events.py events plus {type: 'log'} console lines; onDone the exit code.
+function runScrape(username, args, onEvent, onDone) {
+  let job = null;
+  let cancelled = false;
+  job = runOnWorker(username, args, onEvent, onDone, () => {
+    if (!cancelled) {
+      job = runProcess(username, args, onEvent, onDone);
+    }
+  });
+  return {
+    cancel: () => {
+      cancelled = true;
+      job.cancel();
+    }
+  };
+}
+
+module.exports = { runScrape };
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Per-run checkpoint manifest used by main.py --resume.
+Records completed stages, in-flight pagination cursors, output offsets, budget
+counters and which leads are already enriched, so a killed run can continue
+where it stopped without repeating requests.
+"""
+
+import os
+import json
+import time
+import threading
+from retry import get_breaker
+
+MANIFEST_VERSION = 1
+
+
+class RunCheckpoint:
+    def __init__(self, path, resume=False, target=None):
+        self.path = path
+        self.enriched_path = path + ".enriched"
+        self._lock = threading.Lock()
+        self.resumed = False
+        self.data = None
+        if resume and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.data = data
+                    self.resumed = True
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable checkpoint {path}: {e}")
+        if self.data is None:
+            self.data = {
+                "version": MANIFEST_VERSION,
+                "target": target,
+                "started_at": time.time(),
+                "stages": {},
+                "enriched_count": 0,
+                "counters": {},
+            }
+        self._enriched = self._load_enriched()
+        self.save()
+
+    # --- Persistence ---
+    def _load_enriched(self):
+        """Read the enriched-leads sidecar, dropping lines not yet committed to the manifest"""
+        count = self.data.get("enriched_count", 0)
+        names = []
+        if self.resumed and count and os.path.exists(self.enriched_path):
+            with open(self.enriched_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if len(names) >= count:
+                        break
+                    if line.strip():
+                        names.append(line.strip())
+        self.data["enriched_count"] = len(names)
+        with open(self.enriched_path, "w", encoding="utf-8") as f:
+            f.writelines(n + "\n" for n in names)
+        return set(names)
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        self.data["updated_at"] = time.time()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp, self.path)
+
+    # --- Stages ---
+    def is_done(self, stage):
+        with self._lock:
+            return bool(self.data["stages"].get(stage, {}).get("done"))
+
+    def progress(self, stage):
+        """Saved in-flight state for a stage (empty when starting fresh)"""
+        with self._lock:
+            return dict(self.data["stages"].get(stage, {}))
+
+    def update(self, stage, **fields):
+        with self._lock:
+            self.data["stages"].setdefault(stage, {}).update(fields)
+            self._save_locked()
+
+    def mark_done(self, stage, **fields):
+        if get_breaker().tripped:
+            # A stage cut short by an expired session stays resumable
+            self.update(stage, **fields)
+            return
+        self.update(stage, done=True, **fields)
+
+    def set_counters(self, **counters):
+        with self._lock:
+            self.data["counters"].update(counters)
+            self._save_locked()
+
+    def open_output(self, stage, path, key="offset"):
+        """Open a stage's output for writing, truncated back to the last checkpointed offset.
+
+        Returns (file, resumed); resumed is False when the file was started fresh.
+        """
+        offset = self.progress(stage).get(key)
+        if offset is not None and os.path.exists(path) and os.path.getsize(path) >= offset:
+            f = open(path, "r+", encoding="utf-8")
+            f.truncate(offset)
+            f.seek(offset)
+            return f, True
+        return open(path, "w", encoding="utf-8"), False
+
+    # --- Enriched leads ---
+    def enriched(self):
+        with self._lock:
+            return set(self._enriched)
+
+    def add_enriched(self, username, **fields):
+        """Record a lead as enriched, together with the stage fields (e.g. output offset)"""
+        self.add_enriched_many([username], **fields)
+
+    def add_enriched_many(self, usernames, **fields):
+        """Record a flushed batch of enriched leads with the stage fields in one manifest write"""
+        with self._lock:
+            with open(self.enriched_path, "a", encoding="utf-8") as f:
+                f.writelines(u + "\n" for u in usernames)
+            self._enriched.update(usernames)
+            self.data["enriched_count"] += len(usernames)
+            self.data["stages"].setdefault("enrichment", {}).update(fields)
+            self._save_locked()
+
+
+def open_stage_output(checkpoint, stage, path, key="offset"):
+    """Open a stage's output file, resuming from the checkpoint when there is one.
+
+    Returns (file, state) where state is the saved stage progress, or {} for a fresh start.
+    """
+    if checkpoint is None:
+        return open(path, "w", encoding="utf-8"), {}
+    f, resumed = checkpoint.open_output(stage, path, key)
+    return f, (checkpoint.progress(stage) if resumed else {})
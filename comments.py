@@ -1,19 +1,16 @@
 #!/usr/bin/env python3
-import requests
+import os
 import json
-import time
-from cookies_headers import COOKIES, HEADERS  # same format as before
+import http_client
+from checkpoint import open_stage_output
+from records import RecordWriter, is_ndjson
+import events
+from paginator import Budget, Paginator, media_chains, DEFAULT_WORKERS
 
 # --- Constants ---
 URL = "https://www.instagram.com/graphql/query"
 DOC_ID = "25060748103519434"  # Current Polaris Post Comments Query ID
 
-# --- Prepare Headers ---
-HEADERS = HEADERS.copy()
-HEADERS["x-fb-friendly-name"] = "PolarisPostCommentsPaginationQuery"
-HEADERS["x-ig-app-id"] = "936619743392459"
-HEADERS["content-type"] = "application/x-www-form-urlencoded"
-
 # --- GraphQL Query Variables ---
 def make_variables(media_id, after_cursor=None):
     variables = {
@@ -27,16 +24,35 @@ def make_variables(media_id, after_cursor=None):
     }
     return json.dumps(variables)
 
+# --- Request builder ---
+def build_comments_request(media_id, after=None):
+    return {
+        "method": "POST",
+        "url": URL,
+        "endpoint": "comments",
+        "data": {
+            "fb_api_req_friendly_name": "PolarisPostCommentsPaginationQuery",
+            "variables": make_variables(media_id, after),
+            "doc_id": DOC_ID,
+        },
+    }
+
 # --- Fetch a single page of comments ---
 def fetch_comments(media_id, after=None):
-    payload = {
-        "fb_api_req_friendly_name": "PolarisPostCommentsPaginationQuery",
-        "variables": make_variables(media_id, after),
-        "doc_id": DOC_ID,
-    }
+    try:
+        res = http_client.request(**build_comments_request(media_id, after))
+        if res.status_code != 200:
+            print("HTTP Error:", res.status_code)
+            return None
+        return res.json()
+    except Exception as e:
+        print(f"[!] Request failed for media {media_id}: {e}")
+        return None
 
+async def fetch_comments_async(client, media_id, after=None):
+    """Async fetch_comments over an async_http.AsyncClient"""
     try:
-        res = requests.post(URL, headers=HEADERS, cookies=COOKIES, data=payload, timeout=15)
+        res = await client.request(**build_comments_request(media_id, after))
         if res.status_code != 200:
             print("HTTP Error:", res.status_code)
             return None
@@ -45,118 +61,117 @@ def fetch_comments(media_id, after=None):
         print(f"[!] Request failed for media {media_id}: {e}")
         return None
 
-# --- Collect all comments for one media ---
-def collect_comments_for_media(media_id, file_handle, first_item_ref, global_count, max_total=50):
-    after = None
-    page = 1
-    total_comments = 0
-
-    while True:
-        # Stop if global limit reached
-        if global_count[0] >= max_total:
-            print(f"[!] Reached global limit of {max_total} comments across all media")
-            break
-            
-        print(f"\n[*] Fetching comments (page {page}) for media ID {media_id}...")
-        data = fetch_comments(media_id, after)
-        if not data:
-            break
+# --- Page parser ---
+def parse_comments_page(media_id, data):
+    """Return (comments, next_cursor) for one page; next_cursor is None on the last page"""
+    comments_data = data["data"]["xdt_api__v1__media__media_id__comments__connection"]
+    comments = []
+    for edge in comments_data.get("edges", []):
+        node = edge["node"]
+        user = node.get("user", {})
+        comments.append({
+            "media_id": media_id,
+            "username": user.get("username", ""),
+            "text": node.get("text", ""),
+            "likes": node.get("comment_like_count", 0),
+            "created_at": node.get("created_at", 0)
+        })
+    page_info = comments_data.get("page_info", {})
+    after = page_info.get("end_cursor")
+    return comments, (after if page_info.get("has_next_page", False) and after else None)
+
+@events.stage("comments")
+def scrape_comments(filename, output_file="comments.json", media_entries=None, on_comment=None, checkpoint=None,
+                    max_workers=None):
+    """Scrape comments from media IDs file.
+
+    media_entries may be any iterable of 'shortcode:media_id' records (e.g. a pipeline
+    queue) to start before the full list is known; on_comment is called per saved comment.
+    Several media are crawled at once under one shared comment budget; each media's
+    comments are written in page order.
+    With a checkpoint, finished media are skipped and in-flight ones resume at their cursors.
+    """
+    if checkpoint and checkpoint.is_done("comments") and os.path.exists(output_file):
+        print(f"[*] Comments already collected → {output_file}")
+        return output_file
 
+    # --- Load Media IDs File ---
+    if media_entries is None:
         try:
-            comments_data = data["data"]["xdt_api__v1__media__media_id__comments__connection"]
-            edges = comments_data.get("edges", [])
-        except Exception as e:
-            print(f"[!] Parse error for media {media_id}: {e}")
-            break
-
-        remaining = max_total - global_count[0]
-        for edge in edges[:remaining]:
-            node = edge["node"]
-            user = node.get("user", {})
-            comment = {
-                "media_id": media_id,
-                "username": user.get("username", ""),
-                "text": node.get("text", ""),
-                "likes": node.get("comment_like_count", 0),
-                "created_at": node.get("created_at", 0)
-            }
-            # Stream comment to file
-            if not first_item_ref[0]:
-                file_handle.write(",\n")
-            json.dump(comment, file_handle, ensure_ascii=False)
-            first_item_ref[0] = False
-            total_comments += 1
-            global_count[0] += 1
-            
-            if global_count[0] >= max_total:
-                break
-
-        page_info = comments_data.get("page_info", {})
-        has_next = page_info.get("has_next_page", False)
-        after = page_info.get("end_cursor")
-
-        print(f"    → Collected {len(edges[:remaining])} new comments, total {total_comments} for this media (Global: {global_count[0]}/{max_total})...")
-
-        if global_count[0] >= max_total:
-            print(f"[+] Reached global limit of {max_total} comments\n")
-            break
-
-        if not has_next or not after:
-            print(f"[+] Done fetching comments for media {media_id}.\n")
-            break
-
-        page += 1
-        time.sleep(2)
-
-    return total_comments
+            with open(filename, "r") as f:
+                media_entries = [line.strip() for line in f if line.strip()]
+        except FileNotFoundError:
+            print(f"Error: File '{filename}' not found.")
+            return None
 
-def scrape_comments(filename, output_file="comments.json"):
-    """Scrape comments from media IDs file"""
-    # --- Load Media IDs File ---
-    try:
-        with open(filename, "r") as f:
-            media_entries = [line.strip() for line in f if line.strip()]
-    except FileNotFoundError:
-        print(f"Error: File '{filename}' not found.")
-        return None
+        if not media_entries:
+            print("File is empty or invalid.")
+            return None
 
-    if not media_entries:
-        print("File is empty or invalid.")
-        return None
+        print(f"[*] Processing {len(media_entries)} media IDs...\n")
+    else:
+        print("[*] Processing media IDs as they arrive...\n")
 
     # --- Main Execution ---
-    print(f"[*] Processing {len(media_entries)} media IDs...\n")
     MAX_COMMENTS = 50  # Limit for MVP
-    total_comments = 0
-    first_item = [True]  # Use list to allow modification in nested function
-    global_count = [0]  # Use list to allow modification in nested function
-
-    # Open file and write opening bracket
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("[\n")
-        
-        for entry in media_entries:
-            if global_count[0] >= MAX_COMMENTS:
-                print(f"[!] Reached global limit of {MAX_COMMENTS} comments, stopping")
-                break
-                
-            parts = entry.split(":")
-            if len(parts) != 2:
-                print(f"[!] Invalid line format: {entry}")
-                continue
-
-            shortcode, media_id = parts
-            count = collect_comments_for_media(media_id, f, first_item, global_count, MAX_COMMENTS)
-            total_comments += count
-            time.sleep(2)
-        
-        # Close JSON array
-        f.write("\n]")
-
-    if global_count[0] >= MAX_COMMENTS:
-        print(f"\n✅ Done! Saved {total_comments} comments → {output_file} (Limited to {MAX_COMMENTS} total)")
+
+    f, state = open_stage_output(checkpoint, "comments", output_file)
+    done_media = set(state.get("done_media", []))
+    cursors = dict(state.get("cursors") or {})
+    if state.get("media") and state.get("cursor"):
+        cursors[state["media"]] = state["cursor"]
+    written = state.get("count", 0)
+    budget = Budget(MAX_COMMENTS, used=written)
+    if state:
+        print(f"[*] Resuming after {written} comments ({len(done_media)} media done)")
+
+    def save():
+        writer.flush()
+        if checkpoint:
+            checkpoint.update("comments", count=written, offset=f.tell(), cursors=dict(cursors),
+                              done_media=sorted(done_media), media=None, cursor=None)
+
+    def handle(media_id, comments, after):
+        nonlocal written
+        granted = budget.take(len(comments))
+        for comment in comments[:granted]:
+            writer.write(comment)
+            events.record("comments", comment)
+            if on_comment:
+                on_comment(comment)
+            written += 1
+        print(f"    → Collected {granted} new comments for media {media_id} (Global: {written}/{MAX_COMMENTS})...")
+        more = granted == len(comments) and after is not None
+        if more:
+            cursors[media_id] = after
+        elif granted == len(comments):
+            cursors.pop(media_id, None)
+            done_media.add(media_id)
+            print(f"[+] Done fetching comments for media {media_id}.\n")
+        save()
+        return more
+
+    def fetch(media_id, after):
+        print(f"\n[*] Fetching comments for media ID {media_id}...")
+        return fetch_comments(media_id, after)
+
+    # NDJSON or a JSON array, by the output file's extension
+    with f:
+        writer = RecordWriter(f, is_ndjson(output_file), count=written, resumed=bool(state), index=True)
+        if not state:
+            save()
+        paginator = Paginator(fetch, parse_comments_page, handle, budget,
+                              max_workers=max_workers or DEFAULT_WORKERS, label="comments")
+        paginator.run(media_chains(media_entries, done_media, cursors))
+
+        writer.close()
+    if checkpoint:
+        checkpoint.mark_done("comments", count=written)
+
+    if written >= MAX_COMMENTS:
+        print(f"\n✅ Done! Saved {written} comments → {output_file} (Limited to {MAX_COMMENTS} total)")
     else:
-        print(f"\n✅ Done! Saved {total_comments} comments → {output_file}")
+        print(f"\n✅ Done! Saved {written} comments → {output_file}")
     return output_file
 
 if __name__ == "__main__":
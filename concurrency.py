@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Adaptive (AIMD) concurrency limit for network-bound worker pools.
+The limit on in-flight work grows by one after every healthy window of completions
+and is cut multiplicatively when the window shows throttling (new 429s at the shared
+scheduler), a high error rate, or LATENCY_PATIENCE windows in a row whose p90 is well
+above the p90 measured at about half the current limit. Comparing p90 with p90 across
+limits means only latency that grows with concurrency counts, not an ordinary tail.
+Scheduler waits count as latency, so a saturated rate budget also pulls the limit down.
+AsyncLimiter puts the same controller in front of tasks on an event loop (--async).
+
+Configuration:
+  ENRICH_MAX_CONCURRENCY      ceiling on in-flight enrichments (default 16)
+  ENRICH_MIN_CONCURRENCY      floor (default 1)
+  ENRICH_INITIAL_CONCURRENCY  starting limit (default 4)
+"""
+
+import os
+import asyncio
+import threading
+import scheduler
+
+# --- Configuration ---
+MAX_CONCURRENCY = int(os.environ.get("ENRICH_MAX_CONCURRENCY", "16") or 16)
+MIN_CONCURRENCY = int(os.environ.get("ENRICH_MIN_CONCURRENCY", "1") or 1)
+INITIAL_CONCURRENCY = int(os.environ.get("ENRICH_INITIAL_CONCURRENCY", "4") or 4)
+MIN_WINDOW = 8             # completions per adjustment, or the current limit if larger
+MAX_ERROR_RATE = 0.2       # error share in a window that counts as congestion
+LATENCY_TOLERANCE = 2.0    # window p90 above the p90 at half the limit * tolerance counts as congestion
+LATENCY_PATIENCE = 2       # consecutive slow windows before a latency cut (the limit holds meanwhile)
+ERROR_DECREASE = 0.5       # multiplicative cut on throttling/errors
+LATENCY_DECREASE = 0.75    # gentler cut on latency growth alone
+LEVEL_SMOOTHING = 0.3      # weight of a new window in its limit level's p90 (follows a slower network)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class AdaptiveLimiter:
+    """Blocking slot limiter whose limit follows AIMD on observed completions"""
+
+    def __init__(self, max_limit=MAX_CONCURRENCY, min_limit=MIN_CONCURRENCY, initial=INITIAL_CONCURRENCY):
+        self.max_limit = max(1, int(max_limit))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        self.limit = float(min(self.max_limit, max(self.min_limit, int(initial))))
+        self.inflight = 0
+        self._level_p90 = {}  # limit → smoothed p90 latency of windows run at that limit
+        self._slow_windows = 0
+        self._cond = threading.Condition()
+        self._latencies = []
+        self._errors = 0
+        self._throttled_seen = scheduler.get_scheduler().snapshot()["throttled"]
+        self.stats = {"peak": int(self.limit), "increases": 0, "decreases": 0, "samples": 0}
+
+    def acquire(self):
+        """Block until a slot is free under the current limit"""
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                self._cond.wait()
+            self.inflight += 1
+
+    def try_acquire(self):
+        """Take a slot if one is free under the current limit; never blocks"""
+        with self._cond:
+            if self.inflight >= int(self.limit):
+                return False
+            self.inflight += 1
+            return True
+
+    def release(self, latency=None, ok=True):
+        """Free a slot; latency=None (e.g. a local cache hit) is not used as a sample"""
+        with self._cond:
+            self.inflight -= 1
+            if latency is not None:
+                self.stats["samples"] += 1
+                self._latencies.append(latency)
+                if not ok:
+                    self._errors += 1
+                if len(self._latencies) >= max(MIN_WINDOW, int(self.limit)):
+                    self._adjust()
+            self._cond.notify_all()
+
+    def _reference(self, level):
+        """Smoothed p90 recorded at about half the given limit (else the lowest level below it), or None"""
+        lower = [l for l in self._level_p90 if l < level]
+        if not lower:
+            return None
+        half = [l for l in lower if l <= level // 2]
+        return self._level_p90[max(half) if half else min(lower)]
+
+    def _adjust(self):
+        latencies = sorted(self._latencies)
+        p90 = percentile(latencies, 0.9)
+        error_rate = self._errors / len(latencies)
+        throttled = scheduler.get_scheduler().snapshot()["throttled"]
+        new_throttles = throttled - self._throttled_seen
+        self._throttled_seen = throttled
+        self._latencies = []
+        self._errors = 0
+
+        before = int(self.limit)
+        reference = self._reference(before)
+        slow = reference is not None and p90 > reference * LATENCY_TOLERANCE
+        self._slow_windows = self._slow_windows + 1 if slow else 0
+        if new_throttles or error_rate > MAX_ERROR_RATE:
+            self.limit = max(self.min_limit, self.limit * ERROR_DECREASE)
+            reason = f"{new_throttles} throttled, {error_rate:.0%} errors"
+        elif self._slow_windows >= LATENCY_PATIENCE:
+            self.limit = max(self.min_limit, self.limit * LATENCY_DECREASE)
+            self._slow_windows = 0
+            reason = f"p90 {p90:.2f}s vs {reference:.2f}s at a lower limit"
+        elif not slow:
+            self.limit = min(self.max_limit, self.limit + 1)
+            reason = f"p90 {p90:.2f}s"
+
+        # Each limit level keeps a smoothed p90 of its own windows
+        level = self._level_p90.get(before)
+        self._level_p90[before] = p90 if level is None else level + (p90 - level) * LEVEL_SMOOTHING
+
+        after = int(self.limit)
+        if after > before:
+            self.stats["increases"] += 1
+            self.stats["peak"] = max(self.stats["peak"], after)
+        elif after < before:
+            self.stats["decreases"] += 1
+            print(f"[*] Enrichment concurrency {before} → {after} ({reason})")
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self.stats, limit=int(self.limit), ceiling=self.max_limit)
+
+
+class AsyncLimiter:
+    """Awaitable front for an AdaptiveLimiter shared by the tasks of one event loop"""
+
+    def __init__(self, limiter=None):
+        self.limiter = limiter or AdaptiveLimiter()
+        self._waiters = []
+
+    async def acquire(self):
+        """Wait (without blocking the loop) until a slot is free under the current limit"""
+        while not self.limiter.try_acquire():
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                self._waiters.remove(waiter)
+
+    def release(self, latency=None, ok=True):
+        """Free a slot (see AdaptiveLimiter.release) and let waiting tasks retry"""
+        self.limiter.release(latency, ok=ok)
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def snapshot(self):
+        return self.limiter.snapshot()
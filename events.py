@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Structured progress events for the backend.
+When EVENTS_FD names an open file descriptor (the backend passes 3), every event is
+written there as one JSON line; a resident worker process routes them to a sink
+instead (set_sink). Otherwise emitting is a no-op and only the usual console output
+remains. Event types:
+
+  {"type": "run", "run_id": "20260101-120000-1a2b3c4d", "path": "/.../output/runs/<user>/<run_id>"}
+  {"type": "stage", "stage": "comments", "status": "started|finished|failed", "elapsed": 1.2}
+  {"type": "record", "artifact": "comments", "data": {...}}
+  {"type": "artifact", "artifact": "leads_data", "path": "/.../user_leads_data.ndjson"}
+  {"type": "counters", "requests": 42, ...}
+  {"type": "error", "message": "...", "code": "session_expired"}
+  {"type": "log", "message": "..."}                      (worker jobs only: console lines)
+"""
+
+import os
+import json
+import time
+import inspect
+import functools
+import threading
+from collections import Counter
+import scheduler
+from records import iter_records
+
+_lock = threading.Lock()
+_channel = None
+_opened = False
+_recorded = Counter()  # record events sent per artifact
+_sink = None
+
+
+def _get_channel():
+    global _channel, _opened
+    if not _opened:
+        _opened = True
+        fd = os.environ.get("EVENTS_FD", "").strip()
+        if fd:
+            try:
+                _channel = os.fdopen(int(fd), "w", buffering=1, encoding="utf-8")
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Event channel unavailable (EVENTS_FD={fd}): {e}")
+    return _channel
+
+
+def set_sink(sink):
+    """Send events to sink(event_dict) instead of EVENTS_FD; None restores the fd channel.
+
+    Also starts a new per-artifact record count, as each worker job is a new run.
+    """
+    global _sink
+    with _lock:
+        _sink = sink
+        _recorded.clear()
+
+
+def enabled():
+    with _lock:
+        return _sink is not None or _get_channel() is not None
+
+
+def emit(event_type, **fields):
+    """Write one event line; a closed channel disables further events"""
+    global _channel
+    with _lock:
+        event = {"type": event_type, "ts": round(time.time(), 3), **fields}
+        if _sink is not None:
+            _sink(event)
+            return
+        channel = _get_channel()
+        if channel is None:
+            return
+        try:
+            channel.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+        except (OSError, ValueError):
+            _channel = None
+
+
+def record(artifact, data):
+    with _lock:
+        _recorded[artifact] += 1
+    emit("record", artifact=artifact, data=data)
+
+
+def replay(artifact, path):
+    """Send an artifact's records when this run reused the file instead of producing it"""
+    with _lock:
+        if (_sink is None and _get_channel() is None) or _recorded[artifact] or not path or not os.path.exists(path):
+            return
+    try:
+        if path.endswith((".json", ".ndjson")):
+            for item in iter_records(path):
+                record(artifact, item)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record(artifact, line.strip())
+    except Exception as e:
+        print(f"⚠️ Could not replay {path}: {e}")
+
+
+def artifact(key, path):
+    emit("artifact", artifact=key, path=path)
+
+
+def counters(**values):
+    emit("counters", **values)
+
+
+def error(message, code=None):
+    emit("error", message=message, code=code)
+
+
+def stage(name):
+    """Decorator emitting started/finished (or failed) stage events around a function"""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def run_async(*args, **kwargs):
+                start = time.monotonic()
+                emit("stage", stage=name, status="started")
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException as e:
+                    emit("stage", stage=name, status="failed", elapsed=round(time.monotonic() - start, 3), error=str(e))
+                    raise
+                emit("stage", stage=name, status="finished", elapsed=round(time.monotonic() - start, 3))
+                counters(**scheduler.get_scheduler().snapshot())
+                return result
+            return run_async
+
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            start = time.monotonic()
+            emit("stage", stage=name, status="started")
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                emit("stage", stage=name, status="failed", elapsed=round(time.monotonic() - start, 3), error=str(e))
+                raise
+            emit("stage", stage=name, status="finished", elapsed=round(time.monotonic() - start, 3))
+            counters(**scheduler.get_scheduler().snapshot())
+            return result
+        return run
+    return decorate
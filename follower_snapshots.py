@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Follower snapshot store.
+Each followers crawl is saved per target as a sorted array of interned follower IDs
+(8 bytes each) with its timestamp; usernames are interned once in a shared table.
+Deltas between snapshots (added/removed) come from a merge-scan of the sorted arrays.
+Instagram lists followers newest first, so a crawl that started at the first page is a
+"head" snapshot: every follower newer than its oldest entry is in it, which makes even a
+capped crawl a valid base for the next delta crawl.
+
+Usage: python3 follower_snapshots.py <username>   # show the latest delta
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import threading
+from array import array
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output", "follower_snapshots.db")
+BUSY_TIMEOUT_MS = 10000
+
+
+def diff_sorted(old, new):
+    """Merge-scan two sorted ID sequences; returns (added, removed) as sorted lists"""
+    added, removed = [], []
+    i = j = 0
+    while i < len(old) and j < len(new):
+        if old[i] == new[j]:
+            i += 1
+            j += 1
+        elif old[i] < new[j]:
+            removed.append(old[i])
+            i += 1
+        else:
+            added.append(new[j])
+            j += 1
+    removed.extend(old[i:])
+    added.extend(new[j:])
+    return added, removed
+
+
+def merge_sorted(a, b):
+    """Union of two sorted ID sequences as a sorted array"""
+    out = array("Q")
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] == b[j]:
+            out.append(a[i])
+            i += 1
+            j += 1
+        elif a[i] < b[j]:
+            out.append(a[i])
+            i += 1
+        else:
+            out.append(b[j])
+            j += 1
+    out.extend(a[i:])
+    out.extend(b[j:])
+    return out
+
+
+def sorted_ids(ids):
+    """Deduplicated, sorted array of follower IDs"""
+    return array("Q", sorted(set(int(i) for i in ids)))
+
+
+def _unpack(blob):
+    ids = array("Q")
+    ids.frombytes(blob)
+    return ids
+
+
+class Snapshot:
+    def __init__(self, snapshot_id, target, taken_at, complete, ids, head=False):
+        self.id = snapshot_id
+        self.target = target
+        self.taken_at = taken_at
+        self.complete = bool(complete)
+        self.head = bool(head) or self.complete  # a complete list is also its own head
+        self.ids = ids
+
+    def __contains__(self, follower_id):
+        """Binary search in the sorted ID array"""
+        ids, key = self.ids, int(follower_id)
+        lo, hi = 0, len(ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ids[mid] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < len(ids) and ids[lo] == key
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class SnapshotStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, username TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " target TEXT NOT NULL,"
+            " taken_at REAL NOT NULL,"
+            " complete INTEGER NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " ids BLOB NOT NULL,"
+            " head INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(snapshots)")}
+        if "head" not in columns:  # stores written before head snapshots existed
+            self.conn.execute("ALTER TABLE snapshots ADD COLUMN head INTEGER NOT NULL DEFAULT 0")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS snapshots_target ON snapshots (target, taken_at)")
+        self.conn.commit()
+
+    def intern(self, pairs):
+        """Record (follower_id, username) pairs; usernames are stored once per ID"""
+        with self._lock:
+            self.conn.executemany(
+                "INSERT INTO users (id, username) VALUES (?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET username = excluded.username",
+                ((int(i), u) for i, u in pairs),
+            )
+            self.conn.commit()
+
+    def save(self, target, ids, complete, head=False, taken_at=None):
+        """Store a snapshot of follower IDs for target; returns its row ID.
+
+        head marks a crawl that started at the first (newest) followers page.
+        """
+        blob = sorted_ids(ids).tobytes()
+        with self._lock:
+            cur = self.conn.execute(
+                "INSERT INTO snapshots (target, taken_at, complete, count, ids, head) VALUES (?, ?, ?, ?, ?, ?)",
+                (target.lower(), taken_at or time.time(), int(bool(complete)), len(blob) // 8, blob,
+                 int(bool(head or complete))),
+            )
+            self.conn.commit()
+            return cur.lastrowid
+
+    def _snapshots(self, target, where="", limit=1):
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT id, target, taken_at, complete, ids, head FROM snapshots WHERE target = ? {where} "
+                f"ORDER BY taken_at DESC, id DESC LIMIT ?",
+                (target.lower(), limit),
+            ).fetchall()
+        return [Snapshot(r[0], r[1], r[2], r[3], _unpack(r[4]), r[5]) for r in rows]
+
+    def latest(self, target, complete_only=False, head_only=False):
+        """Newest snapshot of target; complete_only/head_only restrict it to full lists/head crawls"""
+        where = "AND complete = 1" if complete_only else "AND (head = 1 OR complete = 1)" if head_only else ""
+        found = self._snapshots(target, where)
+        return found[0] if found else None
+
+    def history(self, target, limit=2):
+        return self._snapshots(target, limit=limit)
+
+    def usernames(self, ids):
+        """Map follower IDs to their interned usernames"""
+        names = {}
+        ids = [int(i) for i in ids]
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for fid, uname in self.conn.execute(f"SELECT id, username FROM users WHERE id IN ({marks})", chunk):
+                    names[fid] = uname
+        return names
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    """Process-wide store (FOLLOWER_SNAPSHOTS_PATH overrides the location)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = os.environ.get("FOLLOWER_SNAPSHOTS_PATH", "").strip() or DEFAULT_PATH
+            _store = SnapshotStore(path)
+        return _store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 follower_snapshots.py <username>")
+        sys.exit(1)
+    target = sys.argv[1].strip().lower()
+    store = get_snapshot_store()
+    snaps = store.history(target, limit=2)
+    if not snaps:
+        print(f"❌ No follower snapshots for @{target}")
+        sys.exit(1)
+    latest = snaps[0]
+    print(f"@{target}: {len(latest)} followers in snapshot from {time.ctime(latest.taken_at)}"
+          + ("" if latest.complete else " (partial)"))
+    if len(snaps) > 1:
+        added, removed = diff_sorted(snaps[1].ids, latest.ids)
+        names = store.usernames(added + removed)
+        print(f"Since {time.ctime(snaps[1].taken_at)}: +{len(added)} / -{len(removed)}")
+        for fid in added:
+            print(f"  + {names.get(fid, fid)}")
+        if latest.complete and snaps[1].complete:
+            for fid in removed:
+                print(f"  - {names.get(fid, fid)}")
+        elif removed:
+            print("  (removals are only reported between two complete snapshots)")
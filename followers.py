@@ -1,117 +1,218 @@
 #!/usr/bin/env python3
-import requests, json, time, random, sys
-from cookies_headers import COOKIES, HEADERS
+import json, sys, os, time
+import http_client
+from checkpoint import open_stage_output
+import events
+from paginator import Budget, Paginator
+from follower_snapshots import get_snapshot_store, merge_sorted, sorted_ids
+
+DELTA_KNOWN_RUN = 100  # delta mode stops after this many consecutive already-known followers (or a known page)
+# Followers a delta crawl keeps paging past the lead limit while looking for the known ones
+DELTA_SCAN_LIMIT = int(os.environ.get("FOLLOWERS_DELTA_SCAN_LIMIT", "5000") or 5000)
 
 # --- Step 1: Get USER_ID using new endpoint ---
 def get_user_id(username):
     url = f"https://www.instagram.com/api/v1/users/web_profile_info/?username={username}"
+    r = None
     try:
-        r = requests.get(url, headers=HEADERS, cookies=COOKIES, timeout=15)
+        r = http_client.get(url, endpoint="web_profile_info")
         r.raise_for_status()
         data = r.json()
         return str(data["data"]["user"]["id"])
     except Exception as e:
         print(f"[!] Error fetching user ID: {e}")
-        if "message" in r.text:
+        if r is not None and "message" in r.text:
             print("Response:", r.text)
         return None
 
-def scrape_followers(username):
-    """Scrape followers for a username"""
+# --- Request builder ---
+QUERY_HASH = "37479f2b8209594dde7facb0d904896a"  # followers query
+
+def build_followers_request(username, user_id, after=None):
+    variables = {
+        "id": user_id,
+        "first": 50,
+        "after": after or None
+    }
+    return {
+        "method": "GET",
+        "url": "https://www.instagram.com/graphql/query/",
+        "endpoint": "followers",
+        "headers": {"Referer": f"https://www.instagram.com/{username}/followers/"},
+        "params": {
+            "query_hash": QUERY_HASH,
+            "variables": json.dumps(variables)
+        },
+    }
+
+# --- Page parser ---
+def parse_followers_page(user_id, data):
+    """Return (follower nodes, next cursor) for one page; the cursor is None on the last page"""
+    try:
+        followed_by = data["data"]["user"]["edge_followed_by"]
+    except KeyError:
+        print("[!] Unexpected response:")
+        print(json.dumps(data, indent=2)[:300])
+        raise
+    page_info = followed_by["page_info"]
+    after = page_info.get("end_cursor")
+    return [u["node"] for u in followed_by["edges"]], (after if page_info.get("has_next_page") and after else None)
+
+def save_snapshot(username, seen, complete, head=False, base=None):
+    """Record the follower IDs seen by this crawl (merged into base for delta crawls).
+
+    head marks a crawl that started at the first page. A delta crawl that paged down
+    to the followers already in its base is merged with it, so the merged snapshot is
+    still a head (complete if the base was) and can be the next delta's base.
+    """
+    try:
+        store = get_snapshot_store()
+        store.intern(seen)
+        ids = [fid for fid, _ in seen]
+        if base is not None:
+            ids = merge_sorted(base.ids, sorted_ids(ids))
+        store.save(username, ids, complete=complete, head=head)
+    except Exception as e:
+        print(f"⚠️ Could not save follower snapshot: {e}")
+
+@events.stage("followers")
+def scrape_followers(username, on_username=None, checkpoint=None, delta=False, output_file=None):
+    """Scrape followers for a username into output_file (default <username>_followers.txt).
+
+    on_username is called for every saved follower.
+    With a checkpoint, an interrupted dump continues from its saved end_cursor.
+    Every crawl is recorded in the follower snapshot store. With delta=True only
+    followers missing from the latest head snapshot are saved, and paging stops at
+    the first page made only of known followers, or after DELTA_KNOWN_RUN (at most
+    half the snapshot) consecutive known followers. Once MAX_FOLLOWERS leads are
+    out, a delta crawl keeps paging IDs into the snapshot (up to DELTA_SCAN_LIMIT)
+    until it reaches the known followers.
+    """
     username = username.strip().lower()
     if not username:
         print("❌ Please enter a valid username.")
         return None
 
-    USER_ID = get_user_id(username)
+    OUT_FILE = output_file or f"{username}_followers.txt"
+    if checkpoint and checkpoint.is_done("followers") and os.path.exists(OUT_FILE):
+        return OUT_FILE
+    saved = checkpoint.progress("followers") if checkpoint else {}
+
+    USER_ID = saved.get("user_id") or get_user_id(username)
     if not USER_ID:
         print("❌ Failed to get user ID.")
         return None
 
     print(f"[*] Got user ID for @{username}: {USER_ID}")
 
-    # --- Step 2: Setup ---
-    QUERY_HASH = "37479f2b8209594dde7facb0d904896a"  # followers query
-    OUT_FILE = f"{username}_followers.txt"
-
-    session = requests.Session()
-    session.headers.update({
-        **HEADERS,
-        "X-IG-App-ID": "936619743392459",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": f"https://www.instagram.com/{username}/followers/",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                      "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36"
-    })
-    session.cookies.update(COOKIES)
-
     print(f"[*] Starting followers dump for @{username} (User ID: {USER_ID})...\n")
 
-    after = ""
-    count = 0
-    page = 1
+    f, state = open_stage_output(checkpoint, "followers", OUT_FILE)
+    after = state.get("cursor") or ""
+    count = state.get("count", 0)
+    page = state.get("page", 1)
+    if after:
+        print(f"[*] Resuming at page {page} after {count} followers")
+
+    previous = None
+    if delta:
+        try:
+            # Followers are listed newest first, so any crawl from the first page is a
+            # valid base; a resumed crawl's snapshot misses the head and is not
+            previous = get_snapshot_store().latest(username, head_only=True)
+        except Exception as e:
+            print(f"⚠️ Follower snapshots unavailable: {e}")
+        if previous:
+            print(f"[*] Delta mode: {len(previous)} followers known from snapshot of {time.ctime(previous.taken_at)}")
+        else:
+            print("[*] Delta mode: no previous snapshot, collecting all followers")
+    seen = []  # (follower_id, username) pairs for the snapshot
+    known_run = 0
+    new_seen = 0  # followers missing from the snapshot, including those past the lead limit
+    # Half the snapshot, so followers who left a capped snapshot don't hide where it ends
+    known_limit = min(DELTA_KNOWN_RUN, max(1, len(previous) // 2)) if previous else 0
+    reached_known = False
+    complete = False
 
     # --- Step 3: Fetch followers ---
     MAX_FOLLOWERS = 50  # Limit for MVP
-    with open(OUT_FILE, "w", encoding="utf-8") as f:
-        while True:
-            # Stop if we've reached the limit
-            if count >= MAX_FOLLOWERS:
-                print(f"\n✅ Reached limit of {MAX_FOLLOWERS} followers (stopping early)")
-                break
-            
-            variables = {
-                "id": USER_ID,
-                "first": 50,
-                "after": after or None
-            }
-
-            params = {
-                "query_hash": QUERY_HASH,
-                "variables": json.dumps(variables)
-            }
-
-            try:
-                r = session.get("https://www.instagram.com/graphql/query/", params=params, timeout=15)
-                r.raise_for_status()
-                data = r.json()
-            except Exception as e:
-                print(f"[!] Request error: {e}")
-                break
-
-            try:
-                edges = data["data"]["user"]["edge_followed_by"]["edges"]
-                page_info = data["data"]["user"]["edge_followed_by"]["page_info"]
-            except KeyError:
-                print("[!] Unexpected response:")
-                print(json.dumps(data, indent=2)[:300])
-                break
-
-            new_usernames = [u["node"]["username"] for u in edges]
-            remaining = MAX_FOLLOWERS - count
-            usernames_to_write = new_usernames[:remaining]
-            
-            for uname in usernames_to_write:
-                f.write(uname + "\n")
-
-            count += len(usernames_to_write)
-            print(f"Page {page}: +{len(usernames_to_write)} usernames (Total: {count})")
-
-            if not page_info.get("has_next_page") or count >= MAX_FOLLOWERS:
-                if count >= MAX_FOLLOWERS:
-                    print(f"\n✅ Reached limit of {MAX_FOLLOWERS} followers")
-                else:
-                    print("\n✅ Finished! No more pages.")
-                break
-
-            after = page_info.get("end_cursor", "")
-            if not after:
-                break
-
-            page += 1
-            sleep_time = random.randint(2, 5)
-            print(f"→ Waiting {sleep_time}s before next page...\n")
-            time.sleep(sleep_time)
+    budget = Budget(MAX_FOLLOWERS, used=count)
+    # A delta crawl pages on past the lead limit until it meets the snapshot
+    scan = Budget(MAX_FOLLOWERS + DELTA_SCAN_LIMIT, used=count) if previous else budget
+
+    def fetch(user_id, cursor):
+        try:
+            # New followers are the point of a crawl, so skip the response cache
+            r = http_client.request(**build_followers_request(username, user_id, cursor), fresh=True)
+            r.raise_for_status()
+            return r.json()
+        except Exception as e:
+            print(f"[!] Request error: {e}")
+            return None
+
+    def handle(user_id, nodes, cursor):
+        nonlocal count, page, known_run, new_seen, reached_known, complete
+        written = 0
+        page_known = 0
+        for node in nodes:
+            if node.get("id"):
+                seen.append((node["id"], node["username"]))
+            if previous and node.get("id") and node["id"] in previous:
+                known_run += 1
+                page_known += 1
+                if known_run >= known_limit:
+                    # Everyone after this point followed before the snapshot
+                    reached_known = True
+                    break
+                continue
+            known_run = 0
+            new_seen += 1
+            if previous:
+                scan.take(1)
+            if not budget.take(1):
+                continue
+            f.write(node["username"] + "\n")
+            events.record("followers", node["username"])
+            if on_username:
+                on_username(node["username"])
+            count += 1
+            written += 1
+
+        if previous and nodes and page_known == len(nodes):
+            reached_known = True
+
+        print(f"Page {page}: +{written} usernames (Total: {count})")
+
+        if reached_known:
+            complete = not state and previous.complete
+            print(f"\n✅ Reached already-known followers; {new_seen} new since last snapshot, {count} saved")
+            return False
+        if not cursor or count >= MAX_FOLLOWERS and not previous:
+            if cursor:
+                print(f"\n✅ Reached limit of {MAX_FOLLOWERS} followers")
+            else:
+                complete = not state
+                print("\n✅ Finished! No more pages.")
+            return False
+
+        page += 1  # pacing comes from the shared request scheduler
+        if checkpoint:
+            f.flush()
+            checkpoint.update("followers", user_id=user_id, cursor=cursor, count=count, page=page, offset=f.tell())
+        return True
+
+    with f:
+        if scan.exhausted.is_set():
+            print(f"\n✅ Reached limit of {MAX_FOLLOWERS} followers (stopping early)")
+        else:
+            # A single cursor chain: followers pages are strictly sequential
+            Paginator(fetch, parse_followers_page, handle, scan, max_workers=1, label="followers").run(
+                [(USER_ID, after or None)])
+    if seen:
+        # Only a crawl that met the base extends it; otherwise its own head is the new base
+        save_snapshot(username, seen, complete, head=not state, base=previous if reached_known else None)
+    if checkpoint:
+        checkpoint.mark_done("followers", user_id=USER_ID, count=count)
 
     print(f"\n✅ DONE! {count} followers saved to {OUT_FILE}")
     print("Preview:")
@@ -42,6 +42,37 @@ function TabPanel({ children, value, index, ...other }) {
   );
 }
 
+// File shown by each tab, in tab order
+const TAB_FILES = ['comments', 'leadsData', 'leadsRanked', 'postid', 'followers', 'likes'];
+// Records requested per page
+const PAGE_SIZE = 100;
+
+// Parse a whole file the way it is stored (used when the server cannot page it)
+function parseFile(filePath, text) {
+  if (filePath.endsWith('.ndjson')) {
+    // One JSON record per line; a malformed line is skipped
+    return text.split('\n').reduce((items, line) => {
+      if (line.trim()) {
+        try {
+          items.push(JSON.parse(line));
+        } catch (e) {
+          // Ignore partial or invalid lines
+        }
+      }
+      return items;
+    }, []);
+  }
+  if (filePath.endsWith('.json')) {
+    try {
+      const parsed = JSON.parse(text);
+      return Array.isArray(parsed) ? parsed : [parsed];
+    } catch (e) {
+      return [];
+    }
+  }
+  return text.split('\n').filter(line => line.trim());
+}
+
 function ResultDetail() {
   const { id } = useParams();
   const navigate = useNavigate();
@@ -50,21 +81,28 @@ function ResultDetail() {
   const [error, setError] = useState('');
   const [activeTab, setActiveTab] = useState(0);
   const [fileData, setFileData] = useState({});
+  // Per file: { total, loading } for the pages fetched so far
+  const [pages, setPages] = useState({});
 
   useEffect(() => {
+    setFileData({});
+    setPages({});
     fetchResult();
   }, [id]);
 
+  // Fetch the first page of a tab's file when the tab is first shown
+  useEffect(() => {
+    const key = TAB_FILES[activeTab];
+    if (result && !pages[key]) {
+      loadPage(key);
+    }
+  }, [result, activeTab]);
+
   const fetchResult = async () => {
     try {
       setLoading(true);
       const response = await axios.get(getApiUrl(`api/results/${id}`));
       setResult(response.data.data);
-      
-      // Fetch file contents
-      if (response.data.data.files) {
-        await fetchFileContents(response.data.data.files);
-      }
     } catch (error) {
       setError('Failed to fetch result details');
       console.error('Fetch error:', error);
@@ -73,34 +111,43 @@ function ResultDetail() {
     }
   };
 
-  const fetchFileContents = async (files) => {
-    const data = {};
-    
-    for (const [key, filePath] of Object.entries(files)) {
-      if (!filePath) continue;
-      
-      try {
-        // Read file from backend
-        const response = await axios.get(getApiUrl(`api/results/${id}/file/${key}`), {
-          responseType: 'text'
-        });
-        
-        if (filePath.endsWith('.json')) {
-          try {
-            data[key] = JSON.parse(response.data);
-          } catch (e) {
-            data[key] = response.data;
-          }
-        } else {
-          data[key] = response.data.split('\n').filter(line => line.trim());
+  // Fetch the next page of a file and append it to what the tab already shows
+  const loadPage = async (key) => {
+    const filePath = result?.files?.[key];
+    if (!filePath) {
+      setPages(prev => ({ ...prev, [key]: { total: 0, loading: false } }));
+      return;
+    }
+    if (pages[key]?.loading) return;
+
+    const offset = (fileData[key] || []).length;
+    setPages(prev => ({ ...prev, [key]: { ...prev[key], loading: true } }));
+
+    try {
+      const response = await axios.get(getApiUrl(`api/results/${id}/file/${key}`), {
+        params: { offset, limit: PAGE_SIZE }
+      });
+      const { items, total } = response.data;
+      setFileData(prev => ({ ...prev, [key]: [...(prev[key] || []).slice(0, offset), ...items] }));
+      setPages(prev => ({ ...prev, [key]: { total, loading: false } }));
+    } catch (error) {
+      let items = [];
+      if (error.response?.status === 501) {
+        // No record index for this file: fall back to reading it whole
+        try {
+          const response = await axios.get(getApiUrl(`api/results/${id}/file/${key}`), {
+            responseType: 'text'
+          });
+          items = parseFile(filePath, response.data);
+        } catch (e) {
+          console.error(`Error fetching file ${key}:`, e);
         }
-      } catch (error) {
+      } else {
         console.error(`Error fetching file ${key}:`, error);
-        data[key] = [];
       }
+      setFileData(prev => ({ ...prev, [key]: items }));
+      setPages(prev => ({ ...prev, [key]: { total: items.length, loading: false } }));
     }
-    
-    setFileData(data);
   };
 
   const handleTabChange = (event, newValue) => {
@@ -138,6 +185,31 @@ function ResultDetail() {
     );
   };
 
+  const renderLoadMore = (key) => {
+    const page = pages[key];
+    const loaded = (fileData[key] || []).length;
+    if (!page) {
+      return null;
+    }
+    if (page.loading) {
+      return (
+        <Box sx={{ textAlign: 'center', mt: 2 }}>
+          <CircularProgress size={24} />
+        </Box>
+      );
+    }
+    if (loaded >= page.total) {
+      return null;
+    }
+    return (
+      <Box sx={{ textAlign: 'center', mt: 2 }}>
+        <Button variant="outlined" onClick={() => loadPage(key)}>
+          Load more ({loaded.toLocaleString()} of {page.total.toLocaleString()})
+        </Button>
+      </Box>
+    );
+  };
+
   const renderComments = () => {
     const comments = Array.isArray(fileData.comments) ? fileData.comments : [];
     return renderTable(comments, [
@@ -279,14 +351,17 @@ function ResultDetail() {
 
         <TabPanel value={activeTab} index={0}>
           {renderComments()}
+          {renderLoadMore('comments')}
         </TabPanel>
 
         <TabPanel value={activeTab} index={1}>
           {renderLeadsData()}
+          {renderLoadMore('leadsData')}
         </TabPanel>
 
         <TabPanel value={activeTab} index={2}>
           {renderLeadsRanked()}
+          {renderLoadMore('leadsRanked')}
         </TabPanel>
 
         <TabPanel value={activeTab} index={3}>
@@ -301,6 +376,7 @@ function ResultDetail() {
           ) : (
             <Typography color="text.secondary">No post IDs available</Typography>
           )}
+          {renderLoadMore('postid')}
         </TabPanel>
 
         <TabPanel value={activeTab} index={4}>
@@ -315,6 +391,7 @@ function ResultDetail() {
           ) : (
             <Typography color="text.secondary">No followers data available</Typography>
           )}
+          {renderLoadMore('followers')}
         </TabPanel>
 
         <TabPanel value={activeTab} index={5}>
@@ -329,6 +406,7 @@ function ResultDetail() {
           ) : (
             <Typography color="text.secondary">No likes data available</Typography>
           )}
+          {renderLoadMore('likes')}
         </TabPanel>
       </Paper>
     </Container>
@@ -27,6 +27,9 @@ import ExpandMoreIcon from '@mui/icons-material/ExpandMore';
 import axios from 'axios';
 import getApiUrl from '../config/api';
 
+// Reconnect attempts after the event stream drops
+const MAX_REATTACH = 5;
+
 function Scraper() {
   const [username, setUsername] = useState('');
   const [loading, setLoading] = useState(false);
@@ -44,6 +47,9 @@ function Scraper() {
   const [status, setStatus] = useState('idle'); // idle, running, completed, error
   const [error, setError] = useState('');
   const eventSourceRef = useRef(null);
+  const jobRef = useRef(null);        // id of the job being followed
+  const lastSeqRef = useRef(-1);      // seq of the last event received, for reattaching
+  const completedRef = useRef(false);
 
   useEffect(() => {
     // Cleanup on unmount
@@ -80,15 +86,17 @@ function Scraper() {
       eventSourceRef.current.close();
     }
 
+    jobRef.current = null;
+    lastSeqRef.current = -1;
+    completedRef.current = false;
+
     try {
-      const token = localStorage.getItem('token');
-      
       // Use fetch with POST for streaming
       const response = await fetch(getApiUrl('api/scrape/start'), {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'Authorization': `Bearer ${token}`
+          'Authorization': `Bearer ${localStorage.getItem('token')}`
         },
         body: JSON.stringify({ username: username.trim() })
       });
@@ -97,58 +105,89 @@ function Scraper() {
         throw new Error('Failed to start scraping');
       }
 
-      // Read the stream
-      const reader = response.body.getReader();
-      const decoder = new TextDecoder();
-      let buffer = '';
+      followStream(response, 0);
+    } catch (error) {
+      console.error('Start scraping error:', error);
+      setError(error.message || 'Failed to start scraping');
+      setStatus('error');
+      setLoading(false);
+    }
+  };
+
+  // Read SSE messages until the job completes; a dropped connection reattaches to the job
+  const followStream = async (response, retries) => {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let stopped = false;
+    eventSourceRef.current = { close: () => { stopped = true; reader.cancel(); } };
 
-      const readStream = async () => {
-        try {
-          while (true) {
-            const { done, value } = await reader.read();
-            
-            if (done) {
-              setStatus('completed');
-              setLoading(false);
-              break;
-            }
+    try {
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
 
-            buffer += decoder.decode(value, { stream: true });
-            const lines = buffer.split('\n');
-            buffer = lines.pop() || '';
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() || '';
 
-            for (const line of lines) {
-              if (line.startsWith('data: ')) {
-                try {
-                  const data = JSON.parse(line.slice(6));
-                  handleStreamData(data);
-                } catch (e) {
-                  // Ignore parse errors
-                }
-              }
+        for (const line of lines) {
+          if (line.startsWith('data: ')) {
+            try {
+              const data = JSON.parse(line.slice(6));
+              handleStreamData(data);
+            } catch (e) {
+              // Ignore parse errors
             }
           }
-        } catch (error) {
-          console.error('Stream error:', error);
-          setError('Error reading stream');
-          setStatus('error');
-          setLoading(false);
         }
-      };
+      }
+    } catch (error) {
+      console.error('Stream error:', error);
+    }
+
+    if (stopped || completedRef.current) return;
+    if (jobRef.current && retries < MAX_REATTACH) {
+      // The job keeps running on the server; pick up after the last event we saw
+      setTimeout(() => reattach(retries + 1), 1000 * (retries + 1));
+      return;
+    }
+    setError('Error reading stream');
+    setStatus('error');
+    setLoading(false);
+  };
 
-      readStream();
-      eventSourceRef.current = { close: () => reader.cancel() };
+  const reattach = async (retries) => {
+    try {
+      const response = await fetch(
+        getApiUrl(`api/scrape/jobs/${jobRef.current}/events?from=${lastSeqRef.current + 1}`),
+        { headers: { 'Authorization': `Bearer ${localStorage.getItem('token')}` } }
+      );
+      if (!response.ok) {
+        throw new Error('Failed to reattach');
+      }
+      followStream(response, retries);
     } catch (error) {
-      console.error('Start scraping error:', error);
-      setError(error.message || 'Failed to start scraping');
-      setStatus('error');
-      setLoading(false);
+      console.error('Reattach error:', error);
+      if (retries < MAX_REATTACH) {
+        setTimeout(() => reattach(retries + 1), 1000 * (retries + 1));
+      } else {
+        setError('Lost connection to the scraping job');
+        setStatus('error');
+        setLoading(false);
+      }
     }
   };
 
   const handleStreamData = (data) => {
+    if (typeof data.seq === 'number') {
+      lastSeqRef.current = data.seq;
+    }
     switch (data.type) {
       case 'connected':
+        if (data.jobId) {
+          jobRef.current = data.jobId;
+        }
         setLogs(prev => [...prev, { type: 'info', message: data.message }]);
         break;
       
@@ -160,6 +199,15 @@ function Scraper() {
         setLogs(prev => [...prev, { type: 'error', message: data.message }]);
         break;
       
+      case 'stage':
+        setLogs(prev => [...prev, {
+          type: data.status === 'failed' ? 'error' : 'info',
+          message: data.status === 'started'
+            ? `Stage ${data.stage} started`
+            : `Stage ${data.stage} ${data.status} in ${data.elapsed}s${data.error ? `: ${data.error}` : ''}`
+        }]);
+        break;
+
       case 'data':
         if (data.file && data.data) {
           setDataItems(prev => ({
@@ -170,6 +218,7 @@ function Scraper() {
         break;
       
       case 'complete':
+        completedRef.current = true;
         setStatus(data.code === 0 ? 'completed' : 'error');
         setLoading(false);
         setLogs(prev => [...prev, { 
@@ -194,7 +243,10 @@ function Scraper() {
     }
     setLoading(false);
     setStatus('idle');
-    setLogs(prev => [...prev, { type: 'info', message: 'Scraping stopped by user' }]);
+    setLogs(prev => [...prev, {
+      type: 'info',
+      message: 'Stopped watching; the job keeps running and its result will appear under Results'
+    }]);
   };
 
   const getFileCount = (key) => {
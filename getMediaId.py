@@ -1,10 +1,75 @@
 #!/usr/bin/env python3
-import requests, re, time
+import re, sys, glob, os
+import http_client
+import events
 
+# --- Shortcode <-> media ID ---
+# A post shortcode is the numeric media ID written in base64 with the URL-safe alphabet,
+# so it can be converted locally without fetching the post page.
+SHORTCODE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+_SHORTCODE_INDEX = {c: i for i, c in enumerate(SHORTCODE_ALPHABET)}
+_MAX_MEDIA_ID = (1 << 64) - 1
+
+def shortcode_to_media_id(shortcode):
+    """Decode a post shortcode into its numeric media ID (as a string), or None if invalid"""
+    shortcode = (shortcode or "").strip()
+    if not shortcode:
+        return None
+    value = 0
+    for ch in shortcode:
+        idx = _SHORTCODE_INDEX.get(ch)
+        if idx is None:
+            return None
+        value = value * 64 + idx
+    # Long shortcodes (e.g. private posts) carry extra data and don't decode to an ID
+    if value > _MAX_MEDIA_ID:
+        return None
+    return str(value)
+
+def media_id_to_shortcode(media_id):
+    """Encode a numeric media ID (int or str, optionally '<id>_<owner>') into its shortcode"""
+    value = int(str(media_id).split("_")[0])
+    if value < 0:
+        raise ValueError(f"Invalid media ID: {media_id}")
+    chars = []
+    while True:
+        value, rem = divmod(value, 64)
+        chars.append(SHORTCODE_ALPHABET[rem])
+        if value == 0:
+            break
+    return "".join(reversed(chars))
+
+def parse_media_entry(entry):
+    """Split a 'shortcode:media_id' record into its parts, or return None if malformed"""
+    parts = entry.strip().split(":")
+    if len(parts) < 2 or not parts[0] or not parts[1]:
+        return None
+    return parts[0], parts[1]
+
+def decode_media_ids(postid_file, media_ids_file, on_record=None):
+    """Write shortcode:media_id records for every decodable shortcode in postid_file.
+
+    Known shortcodes decode locally, so there is nothing to wait for; on_record is
+    called with each record as it is written. Returns the number of records.
+    """
+    count = 0
+    with open(postid_file, "r", encoding="utf-8") as f, open(media_ids_file, "w", encoding="utf-8") as out:
+        for line in f:
+            shortcode = line.strip()
+            media_id = shortcode_to_media_id(shortcode)
+            if media_id:
+                record = f"{shortcode}:{media_id}"
+                out.write(record + "\n")
+                count += 1
+                if on_record:
+                    on_record(record)
+    return count
+
+# --- HTTP lookup (verification / fallback only) ---
 def get_media_id(profile_id):
     url = f"https://www.instagram.com/p/{profile_id}/"
     try:
-        r = requests.get(url, timeout=10)
+        r = http_client.get(url, endpoint="post_page")
         match = re.search(r'"page_id":\s*"postPage_([0-9]+)"', r.text)
         if match:
             return match.group(1)
@@ -12,8 +77,13 @@ def get_media_id(profile_id):
         print(f"[!] Error fetching {profile_id}: {e}")
     return None
 
-def scrape_media_ids(filename, output_file="media_ids.txt"):
-    """Extract media IDs from profile IDs file"""
+@events.stage("media_ids")
+def scrape_media_ids(filename, output_file="media_ids.txt", verify=False):
+    """Extract media IDs from profile IDs file.
+
+    IDs are decoded locally from the shortcodes; the post page is only fetched when a
+    shortcode can't be decoded, or for every post when verify=True.
+    """
     try:
         with open(filename, "r") as f:
             profile_ids = [line.strip() for line in f if line.strip()]
@@ -27,15 +97,25 @@ def scrape_media_ids(filename, output_file="media_ids.txt"):
 
     print(f"Extracting media IDs for {len(profile_ids)} posts...\n")
     media_ids = []
+    fetched = 0
+    mismatches = 0
 
     for pid in profile_ids:
-        mid = get_media_id(pid)
+        mid = shortcode_to_media_id(pid)
+        if mid is None or verify:
+            remote = get_media_id(pid)
+            fetched += 1
+            if mid is not None and remote and remote != mid:
+                print(f"[!] {pid}: decoded {mid} but post page says {remote}")
+                mismatches += 1
+            mid = remote or mid
         if mid:
-            print(f"{pid} → {mid}")
             media_ids.append(f"{pid}:{mid}")
         else:
             print(f"{pid} → Not found / Private / Error")
-        time.sleep(1)
+
+    if fetched:
+        print(f"Fetched {fetched} post pages ({mismatches} mismatches)")
 
     if media_ids:
         with open(output_file, "w") as f:
@@ -46,7 +126,30 @@ def scrape_media_ids(filename, output_file="media_ids.txt"):
         print("\n⚠️ No media IDs found.")
         return None
 
+def check_corpus(paths):
+    """Check the decoder/encoder against known 'shortcode:media_id' pairs. Returns the failure count."""
+    checked = 0
+    failures = 0
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                entry = parse_media_entry(line)
+                if not entry:
+                    continue
+                shortcode, media_id = entry
+                media_id = media_id.split("_")[0]
+                checked += 1
+                decoded = shortcode_to_media_id(shortcode)
+                encoded = media_id_to_shortcode(media_id)
+                if decoded != media_id or encoded != shortcode:
+                    failures += 1
+                    print(f"[!] {path}: {shortcode} ↔ {media_id} (decoded {decoded}, encoded {encoded})")
+    print(f"Checked {checked} pairs, {failures} failures")
+    return failures
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--check":
+        corpus = sys.argv[2:] or sorted(glob.glob(os.path.join("output", "*_media_ids.txt")))
+        sys.exit(1 if check_corpus(corpus) else 0)
     filename = input("Enter filename containing profile IDs: ").strip()
     scrape_media_ids(filename)
-
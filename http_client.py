@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for all scrapers.
+Owns pooled keep-alive sessions and applies per-endpoint headers and timeouts,
+so every request in a run goes through one place.
+"""
+
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+from cookies_headers import COOKIES, HEADERS
+import scheduler
+import response_cache
+import retry
+
+# --- Configuration ---
+POOL_SIZE = 32  # max keep-alive connections per host
+DEFAULT_TIMEOUT = 15
+
+# Per-endpoint defaults (timeout + header overrides on top of the session headers).
+# Paginated read endpoints set cache_ttl (seconds) to be served from the response cache.
+ENDPOINTS = {
+    "profile_posts": {
+        "timeout": 20,
+        "headers": {},
+        "cache_ttl": 3600,
+        "idempotent": True,  # read-only GraphQL query sent as POST
+    },
+    "post_page": {
+        "timeout": 10,
+        "anonymous": True,
+    },
+    "comments": {
+        "timeout": 15,
+        "headers": {
+            "x-fb-friendly-name": "PolarisPostCommentsPaginationQuery",
+            "x-ig-app-id": "936619743392459",
+            "content-type": "application/x-www-form-urlencoded",
+        },
+        "cache_ttl": 6 * 3600,
+        "idempotent": True,
+    },
+    "likers": {
+        "timeout": 15,
+        "headers": {
+            "X-IG-App-ID": "936619743392459",
+            "User-Agent": "Mozilla/5.0",
+        },
+        "cache_ttl": 6 * 3600,
+    },
+    "followers": {
+        "timeout": 15,
+        "headers": {
+            "X-IG-App-ID": "936619743392459",
+            "X-Requested-With": "XMLHttpRequest",
+        },
+    },
+    "web_profile_info": {
+        "timeout": 15,
+        "headers": {},
+    },
+    "profile_info": {
+        "timeout": 15,
+        "headers": {
+            "x-csrftoken": COOKIES["csrftoken"],
+        },
+        "idempotent": True,
+    },
+}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _build_session(anonymous):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = DEFAULT_ACCEPT_ENCODING
+    session.headers["Connection"] = "keep-alive"
+    if not anonymous:
+        session.headers.update(HEADERS)
+        session.cookies.update(COOKIES)
+    return session
+
+
+def get_session(anonymous=False):
+    """Return the process-wide pooled session (authenticated unless anonymous=True)"""
+    key = "anonymous" if anonymous else "auth"
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = _build_session(anonymous)
+        return session
+
+
+def prepare(endpoint, headers=None, timeout=None):
+    """Resolve an endpoint's spec, merged header overrides and timeout"""
+    spec = ENDPOINTS.get(endpoint, {})
+    merged = dict(spec.get("headers") or {})
+    if headers:
+        merged.update(headers)
+    if timeout is None:
+        timeout = spec.get("timeout", DEFAULT_TIMEOUT)
+    return spec, merged, timeout
+
+
+def cached_response(spec, method, url, endpoint, fresh=False, params=None, data=None):
+    """Look a request up in the response cache; returns (cache, key, response or None)"""
+    cache = response_cache.get_cache() if spec.get("cache_ttl") else None
+    if not cache:
+        return None, None, None
+    key = response_cache.cache_key(method, url, endpoint, params, data)
+    return cache, key, (None if fresh else cache.get(key, spec["cache_ttl"]))
+
+
+def store_response(cache, key, endpoint, resp):
+    # Only successful JSON pages are cached (not login redirects or challenge pages)
+    if cache and resp.status_code == 200 and resp.content.lstrip()[:1] == b"{":
+        cache.put(key, endpoint, resp)
+
+
+def request(method, url, endpoint=None, headers=None, timeout=None, fresh=False, **kwargs):
+    """Send a request through the shared session with the endpoint's defaults applied.
+
+    Each call first takes a slot from the shared request scheduler, which replaces
+    per-module sleeps between pages. Endpoints with a cache_ttl are read through the
+    response cache; cache hits do not use the request budget. fresh=True skips the
+    cache lookup but still stores the new response.
+
+    Transient failures are retried under the shared retry policy. A response showing
+    an expired session trips the circuit breaker and raises retry.SessionExpired, as
+    does every later call.
+    """
+    spec, merged, timeout = prepare(endpoint, headers, timeout)
+    session = get_session(anonymous=spec.get("anonymous", False))
+    cache, key, cached = cached_response(spec, method, url, endpoint, fresh, kwargs.get("params"), kwargs.get("data"))
+    if cached is not None:
+        return cached
+    sched = scheduler.get_scheduler()
+    policy = retry.get_policy()
+    breaker = retry.get_breaker()
+    attempt = 0
+    while True:
+        breaker.check()
+        sched.acquire(endpoint)
+        try:
+            resp = session.request(method, url, headers=merged or None, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            delay = policy.retry_delay(attempt, method, spec, error=e,
+                                       connect=isinstance(e, requests.exceptions.ConnectTimeout))
+            if delay is None:
+                raise
+        else:
+            sched.observe(endpoint, resp.status_code, resp.headers)
+            retry.check_session(resp, spec)
+            delay = policy.retry_delay(attempt, method, spec, status=resp.status_code, headers=resp.headers)
+            if delay is None:
+                break
+        attempt += 1
+        time.sleep(delay)
+    store_response(cache, key, endpoint, resp)
+    return resp
+
+
+def get(url, endpoint=None, **kwargs):
+    return request("GET", url, endpoint=endpoint, **kwargs)
+
+
+def post(url, endpoint=None, **kwargs):
+    return request("POST", url, endpoint=endpoint, **kwargs)
@@ -1,19 +1,71 @@
 #!/usr/bin/env python3
-import requests
-import re
+import os
 import json
 import sys
 import time
-from cookies_headers import COOKIES, HEADERS  # same format as before
+import threading
+import queue
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import http_client
+from checkpoint import open_stage_output
+from profile_store import get_profile_store, get_store_stats
+from concurrency import AdaptiveLimiter, MAX_CONCURRENCY
+from retry import get_breaker
+from records import RecordWriter, is_ndjson
+import events
 
 # --- Configuration ---
+PROFILE_FIELDS = ("username", "full_name", "is_private", "biography", "follower_count", "following_count")
+# "single": read everything from web_profile_info, GraphQL only for missing fields
+# "graphql": always do web_profile_info + PolarisProfilePageContentQuery (legacy two-request path)
+ENRICH_MODES = ("single", "graphql")
 
+_stats = {"profiles": 0, "web_profile_requests": 0, "graphql_requests": 0, "graphql_fallbacks": 0}
+_stats_lock = threading.Lock()
+_FEED_DONE = object()
+# Per thread/task: did the profile fetch in progress see a throttled or failing server?
+_fetch_health = contextvars.ContextVar("fetch_health", default=None)
 
 
-def get_user_id(username):
+def _count(key, n=1):
+    with _stats_lock:
+        _stats[key] += n
+
+
+def get_enrichment_stats():
+    """Snapshot of request counters, including how often the GraphQL fallback fired"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_enrichment_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def _note_response(resp):
+    """Flag the current fetch when the server throttled (429) or failed (5xx)"""
+    health = _fetch_health.get()
+    if health is not None and (resp.status_code == 429 or resp.status_code >= 500):
+        health["congested"] = True
+
+
+def watch_fetch():
+    """Start tracking the current thread's (or task's) fetch; returns the dict _note_response flags"""
+    health = {"congested": False}
+    _fetch_health.set(health)
+    return health
+
+
+def build_web_profile_request(username):
     url = f"https://www.instagram.com/api/v1/users/web_profile_info/?username={username}"
-    resp = requests.get(url, headers=HEADERS, cookies=COOKIES, allow_redirects=False)
+    return {"method": "GET", "url": url, "endpoint": "web_profile_info", "allow_redirects": False}
 
+
+def parse_web_profile(username, resp):
+    """Return the web_profile_info user object from a response, or None"""
     if resp.status_code == 302:
         print("❌ Redirected to login — cookies expired or invalid.")
         return None
@@ -23,14 +75,42 @@ def get_user_id(username):
 
     try:
         js = resp.json()
-        return js["data"]["user"]["id"]
+        user = js["data"]["user"]
+        if not user or not user.get("id"):
+            raise KeyError("id")
+        return user
     except Exception as e:
         print(f"⚠️ Could not parse user_id for {username}: {e}")
         return None
 
 
+def get_web_profile(username):
+    """Fetch the web_profile_info user object for a username"""
+    resp = http_client.request(**build_web_profile_request(username))
+    _count("web_profile_requests")
+    _note_response(resp)
+    return parse_web_profile(username, resp)
 
-def get_profile_info(username, user_id):
+
+def get_user_id(username):
+    user = get_web_profile(username)
+    return user["id"] if user else None
+
+
+def profile_from_web_info(user):
+    """Map a web_profile_info user object onto the enrichment record; None marks missing fields"""
+    return {
+        "username": user.get("username"),
+        "full_name": user.get("full_name"),
+        "is_private": user.get("is_private"),
+        "biography": user.get("biography"),
+        "follower_count": (user.get("edge_followed_by") or {}).get("count", user.get("follower_count")),
+        "following_count": (user.get("edge_follow") or {}).get("count", user.get("following_count")),
+    }
+
+
+
+def build_profile_info_request(username, user_id):
     url = "https://www.instagram.com/graphql/query"
     doc_id = "24963806849976236"
 
@@ -63,11 +143,11 @@ def get_profile_info(username, user_id):
         "variables": json.dumps(variables)
     }
 
-    headers = HEADERS.copy()
-    headers["referer"] = f"https://www.instagram.com/{username}/"
-    headers["x-csrftoken"] = COOKIES["csrftoken"]
+    headers = {"referer": f"https://www.instagram.com/{username}/"}
+    return {"method": "POST", "url": url, "endpoint": "profile_info", "headers": headers, "data": data}
 
-    resp = requests.post(url, headers=headers, cookies=COOKIES, data=data)
+
+def parse_profile_info(username, resp):
     if resp.status_code != 200:
         print(f"❌ GraphQL failed for {username}: HTTP {resp.status_code}")
         return None
@@ -88,9 +168,281 @@ def get_profile_info(username, user_id):
         return None
 
 
+def get_profile_info(username, user_id):
+    resp = http_client.request(**build_profile_info_request(username, user_id))
+    _count("graphql_requests")
+    _note_response(resp)
+    return parse_profile_info(username, resp)
+
+
+# --- Enrichment engine ---
+def stored_profile(username):
+    """Fresh record from the profile store, or None"""
+    store = get_profile_store()
+    if store:
+        cached = store.get(username)
+        if cached:
+            print(f"💾 @{username} from profile store")
+            _count("profiles")
+            return cached
+    return None
+
+
+def remember_profile(username, info):
+    store = get_profile_store()
+    if info and store:
+        store.put(username, info)
+
+
+def enrich_username(username, mode="single"):
+    """Return the profile record for a single username, from the profile store when fresh"""
+    info = stored_profile(username)
+    if info:
+        return info
+    info = fetch_profile(username, mode)
+    remember_profile(username, info)
+    return info
+
+
+def complete_profile(info, extra):
+    """Fill fields missing from web_profile_info from the GraphQL record.
+
+    When the GraphQL fallback failed the partial web_profile_info record is kept.
+    """
+    if extra:
+        for k in PROFILE_FIELDS:
+            if info.get(k) is None:
+                info[k] = extra.get(k)
+    else:
+        print(f"⚠️ Keeping partial profile for {info.get('username')}: missing {', '.join(missing_fields(info))}")
+    _count("profiles")
+    return info
+
+
+def missing_fields(info):
+    return [k for k in PROFILE_FIELDS if info.get(k) is None]
+
+
+def fetch_profile(username, mode="single"):
+    """Fetch the profile record for a single username from Instagram"""
+    print(f"\n🔍 Processing @{username}...")
+    user = get_web_profile(username)
+    if not user:
+        return None
+
+    if mode == "single":
+        info = profile_from_web_info(user)
+        if not missing_fields(info):
+            _count("profiles")
+            return info
+        # Some fields absent from web_profile_info: fill them from the GraphQL query
+        _count("graphql_fallbacks")
+        return complete_profile(info, get_profile_info(username, user["id"]))
+
+    info = get_profile_info(username, user["id"])
+    if info:
+        _count("profiles")
+    return info
+
+
+async def fetch_profile_async(client, username, mode="single"):
+    """Async fetch_profile over an async_http.AsyncClient"""
+    print(f"\n🔍 Processing @{username}...")
+    resp = await client.request(**build_web_profile_request(username))
+    _count("web_profile_requests")
+    _note_response(resp)
+    user = parse_web_profile(username, resp)
+    if not user:
+        return None
+
+    if mode == "single":
+        info = profile_from_web_info(user)
+        if not missing_fields(info):
+            _count("profiles")
+            return info
+        _count("graphql_fallbacks")
+    resp = await client.request(**build_profile_info_request(username, user["id"]))
+    _count("graphql_requests")
+    _note_response(resp)
+    extra = parse_profile_info(username, resp)
+    if mode == "single":
+        return complete_profile(info, extra)
+    if extra:
+        _count("profiles")
+    return extra
+
+
+async def enrich_username_async(client, username, mode="single", limiter=None):
+    """Async enrich_username: profile store first, then the network.
+
+    Network fetches wait for a slot from limiter (a concurrency.AsyncLimiter) when given
+    and report their latency to it; only transport errors, 429s and 5xx count as errors.
+    """
+    info = stored_profile(username)
+    if info:
+        return info
+    if limiter:
+        await limiter.acquire()
+    health = watch_fetch()
+    start = time.monotonic()
+    ok = False
+    try:
+        info = await fetch_profile_async(client, username, mode)
+        ok = not health["congested"]
+    finally:
+        if limiter:
+            limiter.release(time.monotonic() - start, ok=ok)
+    remember_profile(username, info)
+    return info
+
+
+def enrich_usernames(usernames, max_workers=None, mode="single", limiter=None, known=None):
+    """Enrich usernames on a worker pool sharing the pooled http_client sessions.
+
+    Yields profile dicts in completion order; usernames that fail are skipped.
+    Request pacing comes from the shared scheduler, not per-worker sleeps, and the
+    number of leads in flight follows an AdaptiveLimiter whose ceiling is max_workers
+    (ENRICH_MAX_CONCURRENCY by default). The iterable is consumed lazily so callers
+    can stream leads in. known maps lowercase usernames to profiles this run already
+    fetched, which are used before the profile store.
+    """
+    if mode not in ENRICH_MODES:
+        raise ValueError(f"Unknown enrichment mode: {mode}")
+    limiter = limiter or AdaptiveLimiter(max_limit=max_workers or MAX_CONCURRENCY)
+
+    def work(username):
+        """Return (profile, network latency, ok); store hits carry no latency sample.
+
+        Only transport errors and throttled (429) or failing (5xx) responses are not ok:
+        a missing or skipped profile says nothing about congestion.
+        """
+        info = known.get(username) if known else None
+        if info:
+            return info, None, True
+        info = stored_profile(username)
+        if info:
+            return info, None, True
+        health = watch_fetch()
+        start = time.monotonic()
+        try:
+            info = fetch_profile(username, mode)
+        except Exception as e:
+            print(f"⚠️ Enrichment failed for {username}: {e}")
+            return None, time.monotonic() - start, False
+        latency = time.monotonic() - start
+        if not info:
+            print(f"⚠️ Skipped {username}")
+        remember_profile(username, info)
+        return info, latency, not health["congested"]
+
+    # A feeder thread pulls usernames so results are yielded as soon as they complete,
+    # even while the (possibly streaming) input iterable is blocked waiting for more.
+    results = queue.Queue()
+    stop = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=limiter.max_limit) as pool:
+        def run(username):
+            info, latency, ok = None, None, False
+            try:
+                info, latency, ok = work(username)
+            finally:
+                limiter.release(latency, ok=ok)
+                results.put(info)
+
+        def feed():
+            submitted = 0
+            try:
+                for username in usernames:
+                    username = (username or "").strip().lower()
+                    if not username:
+                        continue
+                    limiter.acquire()
+                    if stop.is_set() or get_breaker().tripped:
+                        limiter.release()
+                        break
+                    pool.submit(run, username)
+                    submitted += 1
+            except Exception as e:
+                print(f"⚠️ Lead feed stopped: {e}")
+            finally:
+                results.put((_FEED_DONE, submitted))
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        received = 0
+        total = None
+        try:
+            while total is None or received < total:
+                item = results.get()
+                if isinstance(item, tuple) and item and item[0] is _FEED_DONE:
+                    total = item[1]
+                    continue
+                received += 1
+                if item:
+                    yield item
+        finally:
+            stop.set()
+            stats = limiter.snapshot()
+            if stats["samples"]:
+                print(f"[*] Enrichment concurrency ended at {stats['limit']}/{stats['ceiling']} "
+                      f"(peak {stats['peak']}, {stats['increases']} increases, {stats['decreases']} decreases)")
+
+
+@events.stage("enrichment")
+def enrich_to_file(usernames, output_file, max_workers=None, mode="single", checkpoint=None,
+                   on_profile=None, indent=2, known=None):
+    """Stream enriched profiles into a record file (.ndjson or JSON array); returns the number written.
+
+    Records are flushed in batches. With a checkpoint, each flushed batch is committed
+    to the manifest, already-enriched leads are skipped and the file is continued
+    from its last committed offset. known is passed on to enrich_usernames.
+    """
+    if checkpoint and checkpoint.is_done("enrichment") and os.path.exists(output_file):
+        count = checkpoint.progress("enrichment").get("count", 0)
+        print(f"✅ Leads already enriched ({count}) → {output_file}")
+        return count
+
+    f, state = open_stage_output(checkpoint, "enrichment", output_file)
+    count = state.get("count", 0)
+    done = checkpoint.enriched() if state else set()
+    if done:
+        print(f"[*] Resuming enrichment; skipping {len(done)} already-enriched leads")
+    todo = (u for u in usernames if (u or "").strip().lower() not in done)
+    finished = False
+
+    unflushed = []
+
+    def commit(offset):
+        if checkpoint:
+            checkpoint.add_enriched_many(unflushed, offset=offset, count=writer.count)
+        unflushed.clear()
+
+    with f:
+        ndjson = is_ndjson(output_file)
+        writer = RecordWriter(f, ndjson, indent=None if ndjson else indent, count=count,
+                              resumed=bool(state), on_flush=commit, index=True)
+        if not state:
+            writer.flush()
+        try:
+            for info in enrich_usernames(todo, max_workers=max_workers, mode=mode, known=known):
+                unflushed.append((info.get("username") or "").lower())
+                writer.write(info)
+                events.record("leads_data", info)
+                if on_profile:
+                    on_profile(info)
+            finished = True
+        except Exception as e:
+            print(f"⚠️ Lead enrichment stopped early: {e}")
+        writer.close()
+        count = writer.count
+    if checkpoint and finished:
+        checkpoint.mark_done("enrichment", count=count)
+    return count
+
+
 if __name__ == "__main__":
-    input_file = "usernames.txt"
-    output_file = "output.json"
+    input_file = sys.argv[1] if len(sys.argv) > 1 else "usernames.txt"
+    output_file = sys.argv[2] if len(sys.argv) > 2 else "output.json"
 
     try:
         usernames = [u.strip().lower() for u in open(input_file) if u.strip()]
@@ -98,33 +450,16 @@ if __name__ == "__main__":
         print(f"❌ Input file '{input_file}' not found.")
         sys.exit(1)
 
-    count = 0
-    first_item = True
-
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("[\n")
-        
-        for username in usernames:
-            print(f"\n🔍 Processing @{username}...")
-            user_id = get_user_id(username)
-            if not user_id:
-                continue
-
-            info = get_profile_info(username, user_id)
-            if info:
-                if not first_item:
-                    f.write(",\n")
-                json.dump(info, f, indent=4, ensure_ascii=False)
-                f.flush()  # Ensure data is written immediately
-                first_item = False
-                count += 1
-                print(f"✅ Done: {info['username']} — Followers: {info['follower_count']}")
-            else:
-                print(f"⚠️ Skipped {username}")
-
-            time.sleep(2)
-        
-        f.write("\n]")
+    def report(info):
+        print(f"✅ Done: {info['username']} — Followers: {info['follower_count']}")
 
-    print(f"\n📁 Saved {count} profiles to '{output_file}' successfully!")
+    count = enrich_to_file(usernames, output_file, on_profile=report, indent=4)
 
+    stats = get_enrichment_stats()
+    print(f"\n📁 Saved {count} profiles to '{output_file}' successfully!")
+    print(f"   Requests: {stats['web_profile_requests']} web_profile_info, {stats['graphql_requests']} GraphQL "
+          f"({stats['graphql_fallbacks']} fallbacks)")
+    store_stats = get_store_stats()
+    if store_stats:
+        print(f"   Profile store: {store_stats['hits']} hits, {store_stats['misses']} misses, "
+              f"{store_stats['stale']} stale ({store_stats['hit_ratio']:.0%} hit ratio)")
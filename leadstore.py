@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Disk-backed lead aggregation.
+Streams usernames from the likers, followers and comments outputs into SQLite,
+counting how often each user appears per source, so the lead cap can pick the
+most engaged users without holding the whole audience in memory.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import Counter
+from records import iter_records
+import events
+
+BATCH_SIZE = 50000  # usernames counted in memory before each upsert
+SOURCES = ("liked", "commented", "follows")
+# Engagement weight per appearance; a comment is a stronger signal than a like
+ENGAGEMENT_WEIGHTS = {"liked": 1, "commented": 2, "follows": 1}
+
+
+class LeadStore:
+    def __init__(self, path, fresh=True):
+        self.path = path
+        if fresh:
+            for suffix in ("", "-journal"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        self.conn = sqlite3.connect(path)
+        # The store is rebuilt from the source files, so durability is not needed
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("PRAGMA cache_size=-16000")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS leads ("
+            " username TEXT PRIMARY KEY,"
+            " liked INTEGER NOT NULL DEFAULT 0,"
+            " commented INTEGER NOT NULL DEFAULT 0,"
+            " follows INTEGER NOT NULL DEFAULT 0"
+            ") WITHOUT ROWID"
+        )
+
+    def _flush(self, source, counts):
+        if not counts:
+            return
+        self.conn.executemany(
+            f"INSERT INTO leads (username, {source}) VALUES (?, ?) "
+            f"ON CONFLICT(username) DO UPDATE SET {source} = {source} + excluded.{source}",
+            counts.items(),
+        )
+        self.conn.commit()
+        counts.clear()
+
+    def add(self, source, usernames):
+        """Count every username from an iterable under source; returns how many were read"""
+        if source not in SOURCES:
+            raise ValueError(f"Unknown lead source: {source}")
+        counts = Counter()
+        total = 0
+        for uname in usernames:
+            if not uname:
+                continue
+            counts[uname] += 1
+            total += 1
+            if len(counts) >= BATCH_SIZE:
+                self._flush(source, counts)
+        self._flush(source, counts)
+        return total
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+
+    def top(self, limit):
+        """Yield (username, liked, commented, follows) ordered by engagement, then username"""
+        score = " + ".join(f"{w} * {s}" for s, w in ENGAGEMENT_WEIGHTS.items())
+        yield from self.conn.execute(
+            f"SELECT username, liked, commented, follows FROM leads "
+            f"ORDER BY {score} DESC, username ASC LIMIT ?",
+            (limit,),
+        )
+
+    def close(self):
+        self.conn.close()
+
+
+@events.stage("leads")
+def aggregate_leads(leads_file, likes_file, followers_file, comments_file, max_leads, store_path=None):
+    """Merge usernames from likers, followers and comments into the capped leads file.
+
+    Appearances are counted per source in a SQLite store (store_path, or a temporary
+    file next to leads_file) and the max_leads most engaged users are kept.
+    Every engine picks its leads this way; returns how many were written.
+    """
+    store_path = store_path or leads_file + ".db"
+    store = LeadStore(store_path)
+    written = 0
+    try:
+        for source, path, reader in (
+            ("liked", likes_file, iter_lines),
+            ("follows", followers_file, iter_lines),
+            ("commented", comments_file, iter_commenters),
+        ):
+            try:
+                if path and os.path.exists(path):
+                    store.add(source, reader(path))
+            except Exception as e:
+                print(f"⚠️ Skipping {source} source {path}: {e}")
+
+        total = store.count()
+        # Most engaged first
+        with open(leads_file, "w", encoding="utf-8") as f:
+            for uname, liked, commented, follows in store.top(max_leads):
+                f.write(uname + "\n")
+                events.record("leads", uname)
+                written += 1
+    finally:
+        store.close()
+
+    if total > max_leads:
+        print(f"✅ Leads saved to: {leads_file} (Top {max_leads} of {total} total leads by engagement)")
+    else:
+        print(f"✅ Leads saved to: {leads_file}")
+    print(f"   Per-source counts: {store_path}")
+    return written
+
+
+class EarlyLeads:
+    """Dedupes usernames from every collector and picks the first max_leads to enrich early.
+
+    The streaming engines subclass it to enrich these while collection is still running.
+    The final leads are still the most engaged ones (aggregate_leads, once the collectors
+    finish); early profiles that make that cut are not fetched again.
+    """
+
+    def __init__(self, max_leads):
+        self.max_leads = max_leads
+        self.offered = 0
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def accept(self, username):
+        """Record a collected username; returns it when it is one of the first max_leads, else None"""
+        uname = (username or "").strip()
+        key = uname.lower()
+        with self._lock:
+            self.offered += 1
+            if not key or key in self._seen or len(self._seen) >= self.max_leads:
+                return None
+            self._seen.add(key)
+        return uname
+
+    @property
+    def accepted(self):
+        with self._lock:
+            return len(self._seen)
+
+
+def iter_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            uname = line.strip()
+            if uname:
+                yield uname
+
+
+def iter_commenters(path):
+    for c in iter_records(path):
+        if isinstance(c, dict) and c.get("username"):
+            yield c["username"]
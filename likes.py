@@ -1,105 +1,126 @@
 #!/usr/bin/env python3
-import requests, time, sys, json
-from cookies_headers import COOKIES, HEADERS  # same format as before
-
-# --- Headers & Cookies ---
-HEADERS = HEADERS.copy()
-HEADERS["X-IG-App-ID"] = "936619743392459"
-HEADERS["User-Agent"] = "Mozilla/5.0"
+import os, sys, json
+import http_client
+from checkpoint import open_stage_output
+import events
+from paginator import Budget, Paginator, media_chains, DEFAULT_WORKERS
+
+# --- Request builder ---
+def build_likers_request(media_id, next_max_id=None):
+    url = f"https://www.instagram.com/api/v1/media/{media_id}/likers/?count=50"
+    if next_max_id:
+        url += f"&max_id={next_max_id}"
+    return {"method": "GET", "url": url, "endpoint": "likers"}
 
 # --- Function to fetch likers ---
-def get_likers(media_id, file_handle, global_count, max_total=50):
-    next_max_id = ""
-    page = 1
-    total = 0
-
-    while True:
-        # Stop if global limit reached
-        if global_count[0] >= max_total:
-            print(f"[!] Reached global limit of {max_total} likers across all media")
-            break
-            
-        print(f"[*] Fetching page {page} for media {media_id}...")
-
-        url = f"https://www.instagram.com/api/v1/media/{media_id}/likers/?count=50"
-        if next_max_id:
-            url += f"&max_id={next_max_id}"
-
-        try:
-            r = requests.get(url, headers=HEADERS, cookies=COOKIES, timeout=15)
-            data = r.json()
-        except Exception as e:
-            print(f"[!] Error fetching media {media_id}: {e}")
-            break
-
-        users = data.get("users", [])
-        if not users:
-            print(f"[!] No users found or session expired for {media_id}.")
-            break
-
-        remaining = max_total - global_count[0]
-        for user in users[:remaining]:
-            username = user.get("username")
-            if username:
-                file_handle.write(username + "\n")
-                total += 1
-                global_count[0] += 1
-                if global_count[0] >= max_total:
-                    break
-
-        print(f"    → Saved {total} usernames for this media (Global: {global_count[0]}/{max_total})...")
-
-        if global_count[0] >= max_total:
-            print(f"[+] Reached global limit of {max_total} likers\n")
-            break
-
-        has_more = data.get("has_more")
-        next_max_id = data.get("next_max_id")
-
-        if not has_more or not next_max_id:
-            print(f"[+] Done fetching likers for media {media_id}. Total: {total}\n")
-            break
-
-        page += 1
-        time.sleep(2)
-    
-    return total
-
-def scrape_likes(filename, output_file="likers.txt"):
-    """Scrape likers from media IDs file"""
-    # --- Input ---
+def fetch_likers(media_id, next_max_id=None):
     try:
-        with open(filename, "r") as f:
-            media_entries = [line.strip() for line in f if line.strip()]
-    except FileNotFoundError:
-        print(f"Error: File '{filename}' not found.")
+        return http_client.request(**build_likers_request(media_id, next_max_id)).json()
+    except Exception as e:
+        print(f"[!] Error fetching media {media_id}: {e}")
         return None
 
-    if not media_entries:
-        print("File is empty or invalid.")
+async def fetch_likers_async(client, media_id, next_max_id=None):
+    """Async fetch_likers over an async_http.AsyncClient"""
+    try:
+        return (await client.request(**build_likers_request(media_id, next_max_id))).json()
+    except Exception as e:
+        print(f"[!] Error fetching media {media_id}: {e}")
         return None
 
+# --- Page parser ---
+def parse_likers_page(media_id, data):
+    """Return (usernames, next_max_id) for one page; next_max_id is None on the last page"""
+    users = data.get("users", [])
+    if not users:
+        print(f"[!] No users found or session expired for {media_id}.")
+    usernames = [u.get("username") for u in users if u.get("username")]
+    next_max_id = data.get("next_max_id")
+    return usernames, (next_max_id if users and data.get("has_more") and next_max_id else None)
+
+@events.stage("likes")
+def scrape_likes(filename, output_file="likers.txt", media_entries=None, on_username=None, checkpoint=None,
+                 max_workers=None):
+    """Scrape likers from media IDs file.
+
+    media_entries may be any iterable of 'shortcode:media_id' records (e.g. a pipeline
+    queue); on_username is called for every saved liker.
+    Several media are crawled at once under one shared liker budget; each media's
+    likers are written in page order.
+    With a checkpoint, finished media are skipped and in-flight ones resume at next_max_id.
+    """
+    if checkpoint and checkpoint.is_done("likes") and os.path.exists(output_file):
+        print(f"[*] Likers already collected → {output_file}")
+        return output_file
+
+    # --- Input ---
+    if media_entries is None:
+        try:
+            with open(filename, "r") as f:
+                media_entries = [line.strip() for line in f if line.strip()]
+        except FileNotFoundError:
+            print(f"Error: File '{filename}' not found.")
+            return None
+
+        if not media_entries:
+            print("File is empty or invalid.")
+            return None
+
+        print(f"[*] Processing {len(media_entries)} media IDs...\n")
+    else:
+        print("[*] Processing media IDs as they arrive...\n")
+
     # --- Main Execution ---
-    print(f"[*] Processing {len(media_entries)} media IDs...\n")
     MAX_LIKERS = 50  # Limit for MVP
-    global_count = [0]  # Use list to allow modification in nested function
-
-    with open(output_file, "w") as f:
-        for entry in media_entries:
-            if global_count[0] >= MAX_LIKERS:
-                print(f"[!] Reached global limit of {MAX_LIKERS} likers, stopping")
-                break
-                
-            parts = entry.split(":")
-            if len(parts) != 2:
-                print(f"[!] Invalid line format: {entry}")
-                continue
-
-            shortcode, media_id = parts
-            get_likers(media_id, f, global_count, MAX_LIKERS)
-            time.sleep(2)
-
-    if global_count[0] >= MAX_LIKERS:
+
+    f, state = open_stage_output(checkpoint, "likes", output_file)
+    done_media = set(state.get("done_media", []))
+    cursors = dict(state.get("cursors") or {})
+    if state.get("media") and state.get("cursor"):
+        cursors[state["media"]] = state["cursor"]
+    written = state.get("count", 0)
+    budget = Budget(MAX_LIKERS, used=written)
+    if state:
+        print(f"[*] Resuming after {written} likers ({len(done_media)} media done)")
+
+    def save():
+        if checkpoint:
+            f.flush()
+            checkpoint.update("likes", count=written, offset=f.tell(), cursors=dict(cursors),
+                              done_media=sorted(done_media), media=None, cursor=None)
+
+    def handle(media_id, usernames, next_max_id):
+        nonlocal written
+        granted = budget.take(len(usernames))
+        for username in usernames[:granted]:
+            f.write(username + "\n")
+            events.record("likes", username)
+            if on_username:
+                on_username(username)
+            written += 1
+        print(f"    → Saved {granted} usernames for media {media_id} (Global: {written}/{MAX_LIKERS})...")
+        more = granted == len(usernames) and next_max_id is not None
+        if more:
+            cursors[media_id] = next_max_id
+        elif granted == len(usernames):
+            cursors.pop(media_id, None)
+            done_media.add(media_id)
+            print(f"[+] Done fetching likers for media {media_id}.\n")
+        save()
+        return more
+
+    def fetch(media_id, next_max_id):
+        print(f"[*] Fetching likers for media {media_id}...")
+        return fetch_likers(media_id, next_max_id)
+
+    with f:
+        paginator = Paginator(fetch, parse_likers_page, handle, budget,
+                              max_workers=max_workers or DEFAULT_WORKERS, label="likers")
+        paginator.run(media_chains(media_entries, done_media, cursors))
+    if checkpoint:
+        checkpoint.mark_done("likes", count=written)
+
+    if written >= MAX_LIKERS:
         print(f"\n✅ All likers saved to {output_file} (Limited to {MAX_LIKERS} total)")
     else:
         print(f"\n✅ All likers saved to {output_file}")
@@ -6,52 +6,78 @@ Takes a username as input and runs all scrapers in sequence.
 
 import sys
 import os
-import json
+import argparse
 import shutil
-import time
 import tempfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import csv
 import re
-from profile import scrape_profile
+from profile import scrape_profile, refresh_profile
 from getMediaId import scrape_media_ids
 from comments import scrape_comments
 from likes import scrape_likes
 from followers import scrape_followers
+from leads_data import enrich_to_file, get_enrichment_stats
+from checkpoint import RunCheckpoint
+from scheduler import get_scheduler
+from retry import get_breaker
+from scoring import clean_lead, score_lead
+from ranking import rank_stream
+from profile_store import get_store_stats
+from response_cache import get_cache_stats
+from leadstore import aggregate_leads
+from records import artifact_path, has_lines, set_output_format, DEFAULT_FORMAT
+from artifacts import open_run, reuse, commit
+import events
 import subprocess
 
-def main():
-    """Main function to run all scrapers"""
-    # Get username input
-    username = input("Enter Instagram username: ").strip()
-    
-    if not username:
-        print("❌ Please enter a valid username.")
-        sys.exit(1)
-    
-    print(f"\n{'='*60}")
-    print(f"Starting scraping process for @{username}")
-    print(f"{'='*60}\n")
-    
-    # Ensure output directory
-    output_dir = os.path.join(os.getcwd(), "output")
-    os.makedirs(output_dir, exist_ok=True)
+MAX_LEADS = 50  # Limit for MVP
+
+
+def report_lead(item):
+    """Score an enriched profile as soon as it arrives (pipeline mode)"""
+    row = clean_lead(item)
+    if row:
+        score_lead(row)
+        print(f"⭐ @{row['username']}: {row['lead_score']:.2f} ({row['category']})")
+
+
+@events.stage("ranking")
+def rank_leads(leads_data_out, ranked_json, ranked_csv, top_k=None, full_ranking=None):
+    """Clean, dedupe, score and sort enriched leads into the ranked JSON/CSV outputs.
+
+    Leads are streamed from leads_data_out; top_k bounds how many are kept and written,
+    and full_ranking (a CSV path) additionally receives every lead in ranked order.
+    """
+    try:
+        ranked, total = rank_stream(leads_data_out, ranked_json, ranked_csv, top_k=top_k, full_ranking=full_ranking)
+        if ranked:
+            print(f"✅ Ranked leads saved to: {ranked_json} and {ranked_csv}"
+                  + (f" (top {ranked} of {total})" if ranked < total else ""))
+            if full_ranking:
+                print(f"✅ Full ranking ({total} leads) saved to: {full_ranking}")
+        else:
+            # Output files are always materialized to satisfy callers
+            print(f"⚠️ No enriched leads to rank. Wrote empty results to: {ranked_json}")
+    except Exception as e:
+        print(f"⚠️ Ranking failed: {e}")
+
 
+def run_staged(username, output_dir, checkpoint=None, refresh=False, followers_delta=False):
+    """Run every stage to completion before starting the next one.
+
+    With refresh, an existing postid file is updated incrementally with new posts.
+    With followers_delta, only followers new since the last snapshot become leads.
+    """
     # Step 1: Scrape profile posts (with pre-seed and skip support)
     print("\n[1/5] Scraping profile posts...")
     print("-" * 60)
 
-    def has_lines(p):
-        try:
-            with open(p, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        return True
-        except Exception:
-            return False
-        return False
-
     postid_out = os.path.join(output_dir, f"{username}_postid.txt")
+    media_ids_target = os.path.join(output_dir, f"{username}_media_ids.txt")
+    media_from_profile = False
+    # Post IDs are complete once the crawl finished or they were seeded; anything else
+    # in postid_out is an interrupted crawl that continues from its checkpointed cursor
+    profile_done = checkpoint is None or checkpoint.is_done("profile")
 
     # 1) If pre-seeded via env POST_IDS (comma/space/newline separated), write and skip scraping
     seed_env = os.environ.get("POST_IDS", "").strip()
@@ -60,6 +86,7 @@ def main():
         if items:
             with open(postid_out, "w", encoding="utf-8") as f:
                 f.write("\n".join(items))
+            profile_done = True
             print(f"✅ Seeded {len(items)} post IDs from POST_IDS → {postid_out}")
 
     # 2) If seed file exists under seed/, copy it
@@ -68,12 +95,22 @@ def main():
     if os.path.exists(seed_file) and not has_lines(postid_out):
         try:
             shutil.copyfile(seed_file, postid_out)
+            profile_done = True
             print(f"✅ Seeded post IDs from {seed_file} → {postid_out}")
         except Exception as e:
             print(f"⚠️ Failed to use seed file: {e}")
 
-    # 3) If output already has content, skip scraping
-    if has_lines(postid_out):
+    if profile_done and checkpoint and has_lines(postid_out):
+        checkpoint.mark_done("profile")
+
+    # 3) If output is complete, skip scraping (or only fetch posts newer than it)
+    if profile_done and has_lines(postid_out):
+        if refresh:
+            try:
+                refresh_profile(username, postid_out,
+                                media_ids_file=media_ids_target if has_lines(media_ids_target) else None)
+            except Exception as e:
+                print(f"⚠️ Profile refresh failed, using existing post IDs: {e}")
         print(f"✅ Profile posts saved to: {postid_out}\n")
     else:
         # Prefer user's working script integration (no logic changes)
@@ -177,23 +214,23 @@ def main():
             return False
 
         ok = False
-        try:
-            ok = run_external_profile_scraper(username)
-        except Exception as e:
-            print(f"⚠️ External profile scraper error: {e}")
+        if has_lines(postid_out):
+            # External scripts cannot continue a crawl, so go straight to the live scraper
+            print("↻ Continuing the interrupted profile crawl...")
+        else:
+            try:
+                ok = run_external_profile_scraper(username)
+            except Exception as e:
+                print(f"⚠️ External profile scraper error: {e}")
+            if ok and checkpoint:
+                checkpoint.mark_done("profile")
         
         if not ok:
             # Fallback to live scrape, but don't abort pipeline if it fails
             try:
-                postid_file = scrape_profile(username)
-                if postid_file:
-                    try:
-                        shutil.move(postid_file, postid_out)
-                    except Exception:
-                        try:
-                            shutil.copyfile(postid_file, postid_out)
-                        except Exception:
-                            pass
+                scrape_profile(username, media_ids_file=media_ids_target, checkpoint=checkpoint,
+                               output_file=postid_out)
+                media_from_profile = has_lines(media_ids_target)
             except Exception as e:
                 print(f"⚠️ Profile scrape failed, continuing with seeds if any: {e}")
         
@@ -211,12 +248,18 @@ def main():
     # Step 2: Get media IDs
     print("\n[2/5] Extracting media IDs...")
     print("-" * 60)
-    media_ids_target = os.path.join(output_dir, f"{username}_media_ids.txt")
     media_ids_file = None
-    try:
-        media_ids_file = scrape_media_ids(postid_out, media_ids_target)
-    except Exception as e:
-        print(f"⚠️ Media ID extraction failed: {e}")
+    # The profile crawl writes shortcode:media_id records itself; only derive them when missing/stale
+    if media_from_profile or (
+        has_lines(media_ids_target) and os.path.getmtime(media_ids_target) >= os.path.getmtime(postid_out)
+    ):
+        media_ids_file = media_ids_target
+        print("✅ Media IDs already captured during profile crawl; skipping extraction.")
+    else:
+        try:
+            media_ids_file = scrape_media_ids(postid_out, media_ids_target)
+        except Exception as e:
+            print(f"⚠️ Media ID extraction failed: {e}")
 
     if not media_ids_file:
         # Try seeds for media IDs
@@ -252,19 +295,26 @@ def main():
     # Steps 3-5: Run comments, likes, followers in parallel
     print("\n[3-5] Running comments, likes, and followers in parallel...")
     print("-" * 60)
-    comments_target = os.path.join(output_dir, f"{username}_comments.json")
+    comments_target = artifact_path(output_dir, f"{username}_comments")
     likes_target = os.path.join(output_dir, f"{username}_likers.txt")
 
     comments_file = None
     likes_file = None
     followers_file = None
 
+    followers_done = os.path.join(output_dir, f"{username}_followers.txt")
+    if checkpoint and checkpoint.is_done("followers") and os.path.exists(followers_done):
+        followers_file = followers_done
+        print(f"✅ Followers already collected: {followers_file}")
+
     with ThreadPoolExecutor(max_workers=3) as executor:
         futures = {}
         if media_ids_file and os.path.exists(media_ids_file):
-            futures[executor.submit(scrape_comments, media_ids_file, comments_target)] = "comments"
-            futures[executor.submit(scrape_likes, media_ids_file, likes_target)] = "likes"
-        futures[executor.submit(scrape_followers, username)] = "followers"
+            futures[executor.submit(scrape_comments, media_ids_file, comments_target, checkpoint=checkpoint)] = "comments"
+            futures[executor.submit(scrape_likes, media_ids_file, likes_target, checkpoint=checkpoint)] = "likes"
+        if not followers_file:
+            futures[executor.submit(scrape_followers, username, checkpoint=checkpoint,
+                                    delta=followers_delta, output_file=followers_done)] = "followers"
         for future in as_completed(futures):
             task = futures[future]
             try:
@@ -284,16 +334,6 @@ def main():
                 elif task == "followers":
                     followers_file = result
                     if followers_file:
-                        followers_out = os.path.join(output_dir, f"{username}_followers.txt")
-                        try:
-                            shutil.move(followers_file, followers_out)
-                            followers_file = followers_out
-                        except Exception:
-                            try:
-                                shutil.copyfile(followers_file, followers_out)
-                                followers_file = followers_out
-                            except Exception:
-                                pass
                         print(f"✅ Followers saved to: {followers_file}")
                     else:
                         print("⚠️ Failed to scrape followers.")
@@ -326,57 +366,21 @@ def main():
                 except Exception as e:
                     print(f"⚠️ Failed to copy seeded followers: {e}")
 
+    if checkpoint:
+        checkpoint.set_counters(**get_scheduler().snapshot())
+
     # Aggregate leads (usernames) from followers, likers, comments
     print("\n[6/6] Aggregating leads...")
-    leads = set()
-    try:
-        if likes_file and os.path.exists(likes_file):
-            with open(likes_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    uname = line.strip()
-                    if uname:
-                        leads.add(uname)
-    except Exception:
-        pass
-
-    try:
-        if followers_file and os.path.exists(followers_file):
-            with open(followers_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    uname = line.strip()
-                    if uname:
-                        leads.add(uname)
-    except Exception:
-        pass
-
-    try:
-        if comments_file and os.path.exists(comments_file):
-            with open(comments_file, "r", encoding="utf-8") as f:
-                comments = json.load(f)
-                for c in comments:
-                    uname = (c or {}).get("username")
-                    if uname:
-                        leads.add(uname)
-    except Exception:
-        pass
-
     leads_file = os.path.join(output_dir, f"{username}_leads.txt")
-    # Limit to 50 accounts for MVP
-    MAX_LEADS = 50
-    sorted_leads = sorted(leads)
-    limited_leads = sorted_leads[:MAX_LEADS]
-    
-    with open(leads_file, "w", encoding="utf-8") as f:
-        for uname in limited_leads:
-            f.write(uname + "\n")
-    
-    if len(sorted_leads) > MAX_LEADS:
-        print(f"✅ Leads saved to: {leads_file} (Limited to {MAX_LEADS} of {len(sorted_leads)} total leads)")
+    leads_db = os.path.join(output_dir, f"{username}_leads.db")
+    if checkpoint and checkpoint.is_done("leads") and has_lines(leads_file):
+        print(f"✅ Leads already aggregated: {leads_file}")
     else:
-        print(f"✅ Leads saved to: {leads_file}")
-
-    # Enrich leads by invoking multiple leads_data.py subprocesses in parallel
-    leads_data_out = os.path.join(output_dir, f"{username}_leads_data.json")
+        aggregate_leads(leads_file, likes_file, followers_file, comments_file, MAX_LEADS, store_path=leads_db)
+        if checkpoint:
+            checkpoint.mark_done("leads")
+    # Enrich leads in-process on a shared worker pool (no per-batch subprocesses)
+    leads_data_out = artifact_path(output_dir, f"{username}_leads_data")
     try:
         with open(leads_file, "r", encoding="utf-8") as f:
             all_leads = [line.strip() for line in f if line.strip()]
@@ -384,208 +388,203 @@ def main():
         all_leads = []
 
     if all_leads:
-        # Chunk leads and run parallel workers based on CPU and lead volume
-        def chunks(seq, n):
-            for i in range(0, len(seq), n):
-                yield seq[i:i+n]
-
-        def run_worker(batch):
-            with tempfile.TemporaryDirectory() as tmpdir:
-                ufile = os.path.join(tmpdir, "usernames.txt")
-                ofile = os.path.join(tmpdir, "output.json")
-                with open(ufile, "w", encoding="utf-8") as uf:
-                    uf.write("\n".join(batch))
-                subprocess.run([sys.executable, os.path.join(os.getcwd(), "leads_data.py")], cwd=tmpdir, check=False)
-                if os.path.exists(ofile):
-                    try:
-                        with open(ofile, "r", encoding="utf-8") as jf:
-                            return json.load(jf)
-                    except Exception:
-                        return []
-                return []
-
-        cpu = os.cpu_count() or 4
-        max_workers = min(16, max(4, cpu * 2))
-        # Aim for ~2-3 batches per worker to keep them busy
-        target_batches = max_workers * 3
-        batch_size = max(10, (len(all_leads) + target_batches - 1) // target_batches)
-
+        # In-flight enrichments self-tune under ENRICH_MAX_CONCURRENCY (see concurrency.py)
         try:
-            first_item = True
-            with open(leads_data_out, "w", encoding="utf-8") as f:
-                f.write("[\n")
-                
-                with ThreadPoolExecutor(max_workers=max_workers) as pool:
-                    futures = [pool.submit(run_worker, batch) for batch in chunks(all_leads, batch_size)]
-                    for fut in as_completed(futures):
-                        try:
-                            worker_results = fut.result() or []
-                            for item in worker_results:
-                                if not first_item:
-                                    f.write(",\n")
-                                json.dump(item, f, ensure_ascii=False, indent=2)
-                                f.flush()  # Ensure data is written immediately
-                                first_item = False
-                        except Exception:
-                            pass
-                
-                f.write("\n]")
-            print(f"✅ Leads data saved to: {leads_data_out}\n")
+            enrich_mode = os.environ.get("ENRICH_MODE", "single").strip() or "single"
+            enrich_to_file(all_leads, leads_data_out, mode=enrich_mode, checkpoint=checkpoint)
+            stats = get_enrichment_stats()
+            print(f"✅ Leads data saved to: {leads_data_out}")
+            print(f"   Enriched {stats['profiles']} profiles with {stats['web_profile_requests']} web_profile_info + "
+                  f"{stats['graphql_requests']} GraphQL requests ({stats['graphql_fallbacks']} fallbacks)\n")
         except Exception as e:
             print(f"⚠️ Failed writing leads data: {e}")
     else:
         print("⚠️ No leads to enrich.")
 
-    # Rank leads for the niche
-    try:
-        if os.path.exists(leads_data_out):
-            with open(leads_data_out, "r", encoding="utf-8") as f:
-                enriched_data = json.load(f)
-        else:
-            enriched_data = []
-
-        # Clean and dedupe
-        seen = set()
-        cleaned = []
-        for item in enriched_data or []:
-            uname = (item.get("username") or "").strip().lower()
-            if not uname or uname in seen:
-                continue
-            seen.add(uname)
-            cleaned.append({
-                "username": uname,
-                "full_name": (item.get("full_name") or "").strip(),
-                "followers": int(item.get("follower_count") or 0),
-                "following": int(item.get("following_count") or 0),
-                "bio": (item.get("biography") or "").strip().lower(),
-            })
-
-        ranked_json = os.path.join(output_dir, f"{username}_leads_ranked.json")
-        ranked_csv = os.path.join(output_dir, f"{username}_leads_ranked.csv")
-
-        if cleaned:
-            # Signals and scoring per updated rules
-            keywords = ["fitness", "gym", "training", "health", "workout"]
-            for row in cleaned:
-                # Lowercase everything per cleaning rule
-                row["full_name"] = (row["full_name"] or "").lower()
-                bio = row["bio"]
-                # Bio relevance count and tiered score
-                matches = sum(1 for kw in keywords if kw in bio)
-                if matches >= 2:
-                    bio_score = 1.0
-                elif matches == 1:
-                    bio_score = 0.6
-                else:
-                    bio_score = 0.0
-
-                # Authenticity: real name has >1 words
-                authenticity = 1 if len((row["full_name"] or "").strip().split()) > 1 else 0
-
-                # Follow ratio balance (best near 1)
-                followers = max(0, int(row["followers"]))
-                following = max(0, int(row["following"]))
-                if followers > 0 and following > 0:
-                    ratio = following / followers
-                    # Score 1 at ratio==1, declines towards 0 as deviates
-                    follow_score = min(ratio, 1/ratio)
-                    if follow_score > 1:
-                        follow_score = 1.0
-                    if follow_score < 0:
-                        follow_score = 0.0
-                else:
-                    follow_score = 0.0
-
-                # Weighted total: 70% bio, 20% authenticity, 10% ratio
-                lead_score = 0.7 * bio_score + 0.2 * authenticity + 0.1 * follow_score
-                # Ensure within [0,1]
-                if lead_score < 0:
-                    lead_score = 0.0
-                if lead_score > 1:
-                    lead_score = 1.0
-
-                # Classification; enforce niche mention requirement for Medium/High
-                if lead_score > 0.7 and bio_score > 0:
-                    category = "High potential"
-                elif lead_score >= 0.4 and bio_score > 0:
-                    category = "Medium potential"
-                else:
-                    category = "Low potential"
-
-                row["lead_score"] = round(lead_score, 4)
-                row["category"] = category
-
-            # Sort descending by score
-            ranked = sorted(cleaned, key=lambda x: x["lead_score"], reverse=True)
-
-            with open(ranked_json, "w", encoding="utf-8") as f:
-                f.write("[\n")
-                first_item = True
-                for r in ranked:
-                    if not first_item:
-                        f.write(",\n")
-                    json.dump({
-                        "username": r["username"],
-                        "full_name": r["full_name"],
-                        "followers": r["followers"],
-                        "following": r["following"],
-                        "bio": r["bio"],
-                        "lead_score": round(r["lead_score"], 4),
-                        "category": r["category"],
-                    }, f, ensure_ascii=False, indent=2)
-                    f.flush()  # Ensure data is written immediately
-                    first_item = False
-                f.write("\n]")
-
-            with open(ranked_csv, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["username", "full_name", "followers", "following", "bio", "lead_score", "category"])
-                for r in ranked:
-                    writer.writerow([
-                        r["username"],
-                        r["full_name"],
-                        r["followers"],
-                        r["following"],
-                        r["bio"],
-                        f"{r['lead_score']:.4f}",
-                        r["category"],
-                    ])
-                    f.flush()  # Ensure data is written immediately
-
-            print(f"✅ Ranked leads saved to: {ranked_json} and {ranked_csv}")
-        else:
-            # Always materialize output files to satisfy callers
-            ranked = []
-            try:
-                with open(ranked_json, "w", encoding="utf-8") as f:
-                    json.dump(ranked, f, ensure_ascii=False, indent=2)
-                with open(ranked_csv, "w", newline="", encoding="utf-8") as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["username", "full_name", "followers", "following", "bio", "lead_score", "category"])
-                print(f"⚠️ No enriched leads to rank. Wrote empty results to: {ranked_json}")
-            except Exception as e:
-                print(f"⚠️ Failed writing empty ranked outputs: {e}")
-    except Exception as e:
-        print(f"⚠️ Ranking failed: {e}")
-    
-    # Summary
+    return {
+        "postid": postid_out,
+        "media_ids": media_ids_file,
+        "comments": comments_file,
+        "likes": likes_file,
+        "followers": followers_file,
+        "leads": leads_file,
+        "leads_db": leads_db if os.path.exists(leads_db) else None,
+        "leads_data": leads_data_out,
+    }
+
+
+def publish_artifacts(files):
+    """Send artifact paths and final counters to the event channel.
+
+    Artifacts this run reused rather than produced (no record events yet) are replayed.
+    """
+    for key in ("postid", "media_ids", "comments", "likes", "followers", "leads", "leads_data", "leads_ranked"):
+        path = files.get(key)
+        if path:
+            events.replay(key, path)
+            events.artifact(key, path)
+    events.counters(**get_scheduler().snapshot(), **get_enrichment_stats(),
+                    cache=get_cache_stats(), profile_store=get_store_stats())
+
+
+def print_summary(files):
     print(f"\n{'='*60}")
     print("✅ Scraping process completed!")
     print(f"{'='*60}")
     print("\nGenerated files:")
-    print(f"  - {postid_out}")
-    if media_ids_file:
-        print(f"  - {media_ids_file}")
-    if comments_file:
-        print(f"  - {comments_file}")
-    if likes_file:
-        print(f"  - {likes_file}")
-    if followers_file:
-        print(f"  - {followers_file}")
-    print(f"  - {leads_file}")
-    print(f"  - {leads_data_out}")
+    for key in ("postid", "media_ids", "comments", "likes", "followers", "leads", "leads_db", "leads_data"):
+        if files.get(key):
+            print(f"  - {files[key]}")
+    sched_stats = get_scheduler().snapshot()
+    print(f"\nRequests: {sched_stats['requests']} "
+          f"(waited {sched_stats['waited']:.1f}s for budget, {sched_stats['throttled']} throttled responses)")
+    cache_stats = get_cache_stats()
+    if cache_stats:
+        print(f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+              f"{cache_stats['expired']} expired ({cache_stats['hit_ratio']:.0%} hit ratio, "
+              f"{cache_stats['size_bytes'] / 1048576:.1f} MB, {cache_stats['evictions']} evicted)")
+    store_stats = get_store_stats()
+    if store_stats:
+        print(f"Profile store: {store_stats['hits']} hits, {store_stats['misses']} misses, "
+              f"{store_stats['stale']} stale ({store_stats['hit_ratio']:.0%} hit ratio)")
     print()
 
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run all Instagram scrapers for a username.")
+    parser.add_argument("username", nargs="?", help="Instagram username (prompted for when omitted)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="stream records between stages instead of running them one after another")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="run every stage as tasks on one asyncio event loop (needs aiohttp)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the latest interrupted run (or --run-id) from its checkpoint manifest")
+    parser.add_argument("--run-id", default=None, metavar="ID",
+                        help="name this run's directory under output/runs/<username>/ (default: timestamp-based)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="crawl the profile again instead of reusing post IDs from the last finished run")
+    parser.add_argument("--followers-delta", action="store_true",
+                        help="only collect followers that are new since the last follower snapshot")
+    parser.add_argument("--refresh", action="store_true",
+                        help="fetch only posts newer than the existing post IDs and merge them in "
+                             "(always done for post IDs reused from an earlier run)")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="write record artifacts (comments, leads data, ranking) as newline-delimited JSON")
+    parser.add_argument("--top-k", type=int, default=None, metavar="K",
+                        help="keep only the K best leads in the ranked outputs (streamed, bounded memory)")
+    parser.add_argument("--full-ranking", action="store_true",
+                        help="also write every lead in ranked order to <user>_leads_ranked_full.csv")
+    return parser.parse_args(argv)
+
+
+def run(username, args):
+    """Run every scraper for username with parsed CLI args; returns the exit status.
+
+    main() calls this once per process; the resident worker (worker.py) once per job.
+    """
+    set_output_format("ndjson" if args.ndjson else DEFAULT_FORMAT)
+    print(f"\n{'='*60}")
+    print(f"Starting scraping process for @{username}")
+    print(f"{'='*60}\n")
+    
+    # Ensure output directory; every run writes into its own directory under output/runs/
+    output_dir = os.path.join(os.getcwd(), "output")
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        run_info = open_run(output_dir, username, run_id=args.run_id, resume=args.resume)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    if run_info.manifest:
+        # A finished run is never written again (its files are shared store objects)
+        print(f"✅ Run {run_info.id} already finished: {run_info.dir}")
+        files = run_info.artifacts()
+        publish_artifacts(files)
+        print_summary(files)
+        return 0
+    run_dir = run_info.dir
+    events.emit("run", run_id=run_info.id, path=run_dir)
+    print(f"Run {run_info.id}: {run_dir}\n")
+
+    # Every run keeps a checkpoint manifest so an interrupted run can be resumed
+    checkpoint = RunCheckpoint(run_info.checkpoint_path, resume=args.resume, target=username)
+    if checkpoint.resumed:
+        print(f"↻ Resuming from checkpoint: {checkpoint.path}\n")
+    elif not args.fresh:
+        # Cross-run reuse is an explicit lookup: post IDs (and their media IDs) from the newest finished run
+        source = reuse(run_info, {
+            "postid": os.path.join(run_dir, f"{username}_postid.txt"),
+            "media_ids": os.path.join(run_dir, f"{username}_media_ids.txt"),
+        })
+        if source:
+            # Reused post IDs are a finished crawl; only an interrupted crawl of this run resumes
+            checkpoint.mark_done("profile", reused_from=os.path.basename(source))
+            # A reused list is topped up with posts published since, so it never goes stale
+            args.refresh = True
+            print(f"↻ Reusing post IDs from run {os.path.basename(source)} and fetching newer posts "
+                  f"(--fresh to crawl again)\n")
+
+    files = None
+    if args.use_async:
+        # The async engine keeps no per-stage checkpoints; --resume applies to the thread engines
+        from async_engine import run_async_engine
+        try:
+            files = run_async_engine(username, run_dir, max_leads=MAX_LEADS, on_profile=report_lead,
+                                     refresh=args.refresh, followers_delta=args.followers_delta)
+        except RuntimeError as e:
+            print(f"⚠️ {e}; falling back to the pipeline engine")
+            args.pipeline = True
+    async_run = files is not None
+    if files is None and args.pipeline:
+        from pipeline import run_pipeline
+        files = run_pipeline(username, run_dir, max_leads=MAX_LEADS, on_profile=report_lead, checkpoint=checkpoint,
+                             refresh=args.refresh, followers_delta=args.followers_delta)
+    elif files is None:
+        files = run_staged(username, run_dir, checkpoint=checkpoint, refresh=args.refresh,
+                           followers_delta=args.followers_delta)
+
+    breaker = get_breaker()
+    if breaker.tripped:
+        print(f"\n❌ Run stopped: session expired ({breaker.reason}).")
+        if async_run:
+            # The async engine keeps no checkpoint, so there is nothing to resume
+            print("   Refresh the cookies in cookies_headers.py and run again.")
+        else:
+            # Completed stages are in the checkpoint; new cookies + --resume picks up from there
+            print("   Refresh the cookies in cookies_headers.py and re-run with --resume.")
+        return 2
+
+    # Rank leads for the niche
+    ranked_json = artifact_path(run_dir, f"{username}_leads_ranked")
+    ranked_csv = os.path.join(run_dir, f"{username}_leads_ranked.csv")
+    full_ranking = os.path.join(run_dir, f"{username}_leads_ranked_full.csv") if args.full_ranking else None
+    rank_leads(files["leads_data"], ranked_json, ranked_csv, top_k=args.top_k, full_ranking=full_ranking)
+    checkpoint.set_counters(**get_scheduler().snapshot(), **get_enrichment_stats())
+    checkpoint.mark_done("ranking")
+    files["leads_ranked"] = ranked_json
+    files["leads_ranked_csv"] = ranked_csv
+    files["leads_ranked_full"] = full_ranking
+
+    # Finish the run: artifacts become content-addressed links, and later runs can reuse them
+    commit(run_info, {key: path for key, path in files.items() if key != "leads_db"})
+
+    publish_artifacts(files)
+    print_summary(files)
+    return 0
+
+
+def main():
+    """Main function to run all scrapers"""
+    args = parse_args()
+    # Get username input
+    username = (args.username or input("Enter Instagram username: ")).strip()
+    
+    if not username:
+        print("❌ Please enter a valid username.")
+        sys.exit(1)
+
+    sys.exit(run(username, args))
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Budgeted concurrent paginator shared by the comments, likes and followers collectors.
+Crawls several cursor chains (e.g. one per media) at once under a shared item budget,
+stops handing out work as soon as the budget is spent, and keeps each chain's pages
+in order. Requests go through http_client, so the shared scheduler paces them.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from getMediaId import parse_media_entry
+from retry import get_breaker
+
+DEFAULT_WORKERS = int(os.environ.get("PAGINATOR_WORKERS", "4") or 4)
+
+
+class Budget:
+    """Thread-safe item budget shared by every chain of a crawl"""
+
+    def __init__(self, limit, used=0):
+        self.limit = limit
+        self.used = used
+        self._lock = threading.Lock()
+        self.exhausted = threading.Event()
+        if used >= limit:
+            self.exhausted.set()
+
+    def take(self, n):
+        """Reserve up to n items; returns how many were granted"""
+        with self._lock:
+            granted = max(0, min(n, self.limit - self.used))
+            self.used += granted
+            if self.used >= self.limit:
+                self.exhausted.set()
+            return granted
+
+    @property
+    def remaining(self):
+        with self._lock:
+            return max(0, self.limit - self.used)
+
+
+class Paginator:
+    """Runs fetch/parse/handle for many cursor chains on a bounded worker pool.
+
+    fetch(key, cursor) returns a decoded page (None stops the chain), parse(key, page)
+    returns (items, next_cursor) and handle(key, items, next_cursor) consumes a page and
+    returns False to stop that chain. handle calls are serialized, in page order per key.
+    """
+
+    def __init__(self, fetch, parse, handle, budget, max_workers=DEFAULT_WORKERS, label="items"):
+        self.fetch = fetch
+        self.parse = parse
+        self.handle = handle
+        self.budget = budget
+        self.max_workers = max(1, max_workers)
+        self.label = label
+        self.lock = threading.Lock()  # held while handle() runs
+
+    def _stopped(self):
+        return self.budget.exhausted.is_set() or get_breaker().tripped
+
+    def _crawl(self, key, cursor):
+        while not self._stopped():
+            try:
+                page = self.fetch(key, cursor)
+            except Exception as e:
+                print(f"[!] Request failed for {key}: {e}")
+                return
+            if not page:
+                return
+            try:
+                items, next_cursor = self.parse(key, page)
+            except Exception as e:
+                print(f"[!] Parse error for {key}: {e}")
+                return
+            with self.lock:
+                if self.budget.exhausted.is_set() and items:
+                    return
+                if not self.handle(key, items, next_cursor):
+                    return
+            if not next_cursor:
+                return
+            cursor = next_cursor
+
+    def run(self, chains):
+        """Crawl an iterable of (key, cursor) chains, which may still be arriving"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            inflight = set()
+            try:
+                for key, cursor in chains:
+                    if self._stopped():
+                        break
+                    while len(inflight) >= self.max_workers:
+                        finished, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                        if self._stopped():
+                            break
+                    if self._stopped():
+                        break
+                    inflight.add(pool.submit(self._crawl, key, cursor))
+            finally:
+                # Chains that have not started yet are dropped once the budget is spent
+                # or the session has expired
+                if self._stopped():
+                    for future in inflight:
+                        future.cancel()
+                    if self.budget.exhausted.is_set():
+                        print(f"[!] Reached global limit of {self.budget.limit} {self.label}, stopping")
+                wait(inflight)
+
+
+def media_chains(media_entries, done_media=(), cursors=None):
+    """Turn 'shortcode:media_id' records into (media_id, cursor) chains for Paginator.run.
+
+    Media in done_media are skipped; media with a saved cursor resume from it.
+    """
+    cursors = cursors or {}
+    for entry in media_entries:
+        parts = parse_media_entry(entry)
+        if not parts:
+            print(f"[!] Invalid line format: {entry}")
+            continue
+        shortcode, media_id = parts
+        if media_id in done_media:
+            continue
+        yield media_id, cursors.get(media_id)
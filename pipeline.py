@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Streaming stage pipeline for main.py --pipeline.
+Stages are producers/consumers connected by bounded queues: comments and likes start
+on the first known media ID, and enrichment starts on the first collected lead.
+Leads are capped like the staged engine, by engagement once collection is done; the
+first leads to arrive are enriched early and reused when they make the cut.
+"""
+
+import os
+import queue
+import threading
+from profile import scrape_profile, refresh_profile
+from getMediaId import decode_media_ids
+from comments import scrape_comments
+from likes import scrape_likes
+from followers import scrape_followers
+from leads_data import enrich_usernames, enrich_to_file, get_enrichment_stats
+from leadstore import EarlyLeads, aggregate_leads, iter_lines
+from records import artifact_path, has_lines
+
+QUEUE_SIZE = 256
+_DONE = object()
+
+
+class Channel:
+    """Bounded queue between two stages; the consumer can detach without blocking the producer"""
+
+    def __init__(self, maxsize=QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize)
+        self.detached = False
+
+    def put(self, item):
+        """Blocking put; returns False once the consumer has detached"""
+        while not self.detached:
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self):
+        self.put(_DONE)
+
+    def detach(self):
+        self.detached = True
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            yield item
+
+
+class Topic:
+    """Fans one stream out to several consumer channels"""
+
+    def __init__(self):
+        self.channels = []
+
+    def subscribe(self, maxsize=QUEUE_SIZE):
+        channel = Channel(maxsize)
+        self.channels.append(channel)
+        return channel
+
+    def publish(self, item):
+        for channel in self.channels:
+            channel.put(item)
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
+
+
+class LeadJunction(EarlyLeads):
+    """Dedupes usernames from every collector and forwards the first max_leads to early enrichment"""
+
+    def __init__(self, max_leads, maxsize=QUEUE_SIZE):
+        super().__init__(max_leads)
+        self.channel = Channel(maxsize)
+
+    def offer(self, username):
+        uname = self.accept(username)
+        return bool(uname) and self.channel.put(uname)
+
+    def close(self):
+        self.channel.close()
+
+
+def _produce_media(username, postid_out, media_ids_out, topic, checkpoint=None, refresh=False):
+    """Publish shortcode:media_id records as soon as each one is known"""
+    try:
+        state = checkpoint.progress("profile") if checkpoint else {}
+        # Post IDs are complete once the crawl finished (or they were reused); otherwise
+        # an existing postid file is an interrupted crawl
+        postid_fresh = has_lines(postid_out) and (checkpoint is None or bool(state.get("done")))
+        if refresh and postid_fresh:
+            try:
+                refresh_profile(username, postid_out,
+                                media_ids_file=media_ids_out if has_lines(media_ids_out) else None)
+            except Exception as e:
+                print(f"⚠️ Profile refresh failed, using existing post IDs: {e}")
+        if has_lines(postid_out) and not postid_fresh:
+            # Interrupted crawl: replay the records it already wrote, then continue it
+            offset = state.get("media_offset", 0)
+            if os.path.exists(media_ids_out):
+                with open(media_ids_out, "r", encoding="utf-8") as f:
+                    for line in f.read(offset).splitlines():
+                        if line.strip():
+                            topic.publish(line.strip())
+            scrape_profile(username, media_ids_file=media_ids_out, on_media=topic.publish,
+                           checkpoint=checkpoint, output_file=postid_out)
+        elif has_lines(media_ids_out) and (
+            not postid_fresh or os.path.getmtime(media_ids_out) >= os.path.getmtime(postid_out)
+        ):
+            with open(media_ids_out, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        topic.publish(line.strip())
+        elif postid_fresh:
+            decode_media_ids(postid_out, media_ids_out, on_record=topic.publish)
+        else:
+            scrape_profile(username, media_ids_file=media_ids_out, on_media=topic.publish,
+                           checkpoint=checkpoint, output_file=postid_out)
+    except Exception as e:
+        print(f"⚠️ Profile stage failed: {e}")
+    finally:
+        topic.close()
+
+
+def run_pipeline(username, output_dir, max_leads=50, max_workers=None, on_profile=None, checkpoint=None,
+                 refresh=False, followers_delta=False):
+    """Run all stages concurrently, streaming records between them.
+
+    on_profile is called with each enriched profile as soon as it is written.
+    With a resumed checkpoint, each stage continues from its saved progress.
+    With refresh, an existing postid file is first updated with new posts only.
+    With followers_delta, only followers new since the last snapshot become leads.
+    Returns the generated file paths, keyed like main.run_staged().
+    """
+    paths = {
+        "postid": os.path.join(output_dir, f"{username}_postid.txt"),
+        "media_ids": os.path.join(output_dir, f"{username}_media_ids.txt"),
+        "comments": artifact_path(output_dir, f"{username}_comments"),
+        "likes": os.path.join(output_dir, f"{username}_likers.txt"),
+        "followers": os.path.join(output_dir, f"{username}_followers.txt"),
+        "leads": os.path.join(output_dir, f"{username}_leads.txt"),
+        "leads_db": os.path.join(output_dir, f"{username}_leads.db"),
+        "leads_data": artifact_path(output_dir, f"{username}_leads_data"),
+    }
+    print("\n[pipeline] Streaming profile → comments/likes/followers → enrichment")
+    print("-" * 60)
+
+    media = Topic()
+    comments_in = media.subscribe()
+    likes_in = media.subscribe()
+    leads = LeadJunction(max_leads)
+    produced = {}
+
+    def collector(name, fn, channel=None):
+        try:
+            produced[name] = fn()
+        except Exception as e:
+            print(f"⚠️ {name} task failed: {e}")
+        finally:
+            # Stop receiving media IDs once this collector hit its cap or failed
+            if channel is not None:
+                channel.detach()
+
+    def run_followers():
+        if checkpoint and checkpoint.is_done("followers") and os.path.exists(paths["followers"]):
+            return paths["followers"]
+        return scrape_followers(username, on_username=leads.offer, checkpoint=checkpoint,
+                                delta=followers_delta, output_file=paths["followers"])
+
+    threads = [
+        threading.Thread(target=_produce_media,
+                         args=(username, paths["postid"], paths["media_ids"], media, checkpoint, refresh)),
+        threading.Thread(target=collector, args=("comments", lambda: scrape_comments(
+            None, paths["comments"], media_entries=comments_in,
+            on_comment=lambda c: leads.offer(c.get("username")), checkpoint=checkpoint), comments_in)),
+        threading.Thread(target=collector, args=("likes", lambda: scrape_likes(
+            None, paths["likes"], media_entries=likes_in, on_username=leads.offer, checkpoint=checkpoint),
+            likes_in)),
+        threading.Thread(target=collector, args=("followers", run_followers)),
+    ]
+    for t in threads:
+        t.start()
+
+    def close_leads():
+        for t in threads:
+            t.join()
+        leads.close()
+
+    closer = threading.Thread(target=close_leads)
+    closer.start()
+
+    # Early enrichment consumes leads in the calling thread as soon as they are accepted
+    # max_workers caps the adaptive enrichment concurrency (ENRICH_MAX_CONCURRENCY by default)
+    enrich_mode = os.environ.get("ENRICH_MODE", "single").strip() or "single"
+    early = {}
+    try:
+        for info in enrich_usernames(leads.channel, max_workers=max_workers, mode=enrich_mode):
+            early[(info.get("username") or "").lower()] = info
+    except Exception as e:
+        print(f"⚠️ Early enrichment stopped: {e}")
+    finally:
+        leads.channel.detach()
+    closer.join()
+
+    for key in ("comments", "likes", "followers"):
+        if not produced.get(key):
+            paths[key] = None
+    # The final leads are the most engaged ones, exactly as in the staged engine
+    if checkpoint and checkpoint.is_done("leads") and has_lines(paths["leads"]):
+        print(f"✅ Leads already aggregated: {paths['leads']}")
+    else:
+        aggregate_leads(paths["leads"], paths["likes"], paths["followers"], paths["comments"], max_leads,
+                        store_path=paths["leads_db"])
+        if checkpoint:
+            checkpoint.mark_done("leads")
+    final = list(iter_lines(paths["leads"])) if os.path.exists(paths["leads"]) else []
+    count = enrich_to_file(final, paths["leads_data"], max_workers=max_workers, mode=enrich_mode,
+                           checkpoint=checkpoint, on_profile=on_profile, known=early)
+
+    stats = get_enrichment_stats()
+    reused = sum(1 for uname in final if uname.lower() in early)
+    print(f"\n✅ Pipeline done: {len(final)} leads by engagement from {leads.offered} collected usernames, "
+          f"{count} enriched ({reused} of {len(early)} early profiles kept, "
+          f"{stats['graphql_fallbacks']} GraphQL fallbacks)")
+    if not os.path.exists(paths["leads_db"]):
+        paths["leads_db"] = None
+    if not has_lines(paths["media_ids"]):
+        paths["media_ids"] = None
+    return paths
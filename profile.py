@@ -1,115 +1,204 @@
 # netflix_posts_2025.py
 # Run: python3 netflix_posts_2025.py
 # ΓåÆ Saves ALL post shortcodes to <username>_postid.txt
+#   (and optionally shortcode:media_id:like_count:comment_count records)
 
-import requests, json, time, re, os
-from cookies_headers import COOKIES, HEADERS  # <--- load from external file
+import json, re, os, shutil, contextlib
+import http_client
+from checkpoint import open_stage_output
+from getMediaId import shortcode_to_media_id
+import events
 
 DOC_ID = "25461702053427256"  # Current Polaris query ID (Nov 2025)
 
-def scrape_profile(username):
-    """Scrape all post shortcodes for a username"""
-    # Fast path: if we already have a generated file, reuse it to avoid network flakiness
-    existing_local = f"{username}_postid.txt"
-    existing_out = os.path.join(os.getcwd(), "output", existing_local)
+def media_record(node):
+    """Build a 'shortcode:media_id:like_count:comment_count' record from a timeline node"""
+    shortcode = node['code']
+    media_id = str(node.get('pk') or (node.get('id') or "").split("_")[0] or "")
+    if not media_id.isdigit():
+        media_id = shortcode_to_media_id(shortcode) or ""
+    if not media_id:
+        return None
+    likes = node.get('like_count')
+    comments = node.get('comment_count')
+    fields = [shortcode, media_id, "" if likes is None else str(likes), "" if comments is None else str(comments)]
+    return ":".join(fields)
 
-    def has_lines(p):
-        try:
-            with open(p, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        return True
-        except Exception:
-            return False
-        return False
-
-    if os.path.exists(existing_out) and has_lines(existing_out):
-        return existing_out
-    if os.path.exists(existing_local) and has_lines(existing_local):
-        return existing_local
-    def get_posts(after=None):
-        variables = {
-            "username": username,
-            "first": 50,
-            "data": {
-                "count": 50,
-                "include_reel_media_seen_timestamp": True,
-                "include_relationship_info": True,
-                "latest_besties_reel_media": True,
-                "latest_reel_media": True
-            },
-            "__relay_internal__pv__PolarisIsLoggedInrelayprovider": True
-        }
-        if after:
-            variables["after"] = after
-
-        payload = {
-            'variables': json.dumps(variables),
-            'doc_id': DOC_ID,
-            'fb_dtsg': 'NAfsdGpQ8B1C8aSW9ZBSQw7gpZMByeVd3CjWCQ8AUqxG51UlPCIlgwA:17843709688147332:1757617690',
-            'lsd': 'YOvULOO686BEKESSLvSL9H',
-            'jazoest': '26113',
-        }
-
-        # Be resilient to non-JSON (e.g., HTML challenges/rate limits)
-        r = requests.post(
-            "https://www.instagram.com/graphql/query/",
-            headers=HEADERS,
-            cookies=COOKIES,
-            data=payload,
-            timeout=20
-        )
-        ct = (r.headers.get("content-type") or "").lower()
-        if "application/json" in ct:
-            try:
-                return r.json()
-            except Exception:
-                pass
-        # Fallback: try decode as JSON anyway; else raise with snippet for diagnostics
+def build_posts_request(username, after=None):
+    variables = {
+        "username": username,
+        "first": 50,
+        "data": {
+            "count": 50,
+            "include_reel_media_seen_timestamp": True,
+            "include_relationship_info": True,
+            "latest_besties_reel_media": True,
+            "latest_reel_media": True
+        },
+        "__relay_internal__pv__PolarisIsLoggedInrelayprovider": True
+    }
+    if after:
+        variables["after"] = after
+
+    payload = {
+        'variables': json.dumps(variables),
+        'doc_id': DOC_ID,
+        'fb_dtsg': 'NAfsdGpQ8B1C8aSW9ZBSQw7gpZMByeVd3CjWCQ8AUqxG51UlPCIlgwA:17843709688147332:1757617690',
+        'lsd': 'YOvULOO686BEKESSLvSL9H',
+        'jazoest': '26113',
+    }
+    return {"method": "POST", "url": "https://www.instagram.com/graphql/query/", "endpoint": "profile_posts",
+            "data": payload}
+
+def parse_posts_response(r):
+    """Decode a timeline response, being resilient to non-JSON (e.g., HTML challenges/rate limits)"""
+    ct = (r.headers.get("content-type") or "").lower()
+    if "application/json" in ct:
         try:
-            return json.loads(r.text)
+            return r.json()
         except Exception:
-            snippet = (r.text or "").strip()[:300]
-            raise RuntimeError(f"Instagram response not JSON (status {r.status_code}): {snippet}")
+            pass
+    # Fallback: try decode as JSON anyway; else raise with snippet for diagnostics
+    try:
+        return json.loads(r.text)
+    except Exception:
+        snippet = (r.text or "").strip()[:300]
+        raise RuntimeError(f"Instagram response not JSON (status {r.status_code}): {snippet}")
+
+def get_posts(username, after=None, fresh=False):
+    """Fetch one timeline page (newest first); fresh=True bypasses the response cache.
+
+    Transient failures are retried by http_client under the shared retry policy.
+    """
+    return parse_posts_response(http_client.request(**build_posts_request(username, after), fresh=fresh))
+
+def timeline_connection(data):
+    return data['data']['xdt_api__v1__feed__user_timeline_graphql_connection']
 
+@events.stage("profile")
+def scrape_profile(username, media_ids_file=None, on_media=None, checkpoint=None, output_file=None):
+    """Scrape all post shortcodes for a username into output_file (default <username>_postid.txt).
+
+    When media_ids_file is given, shortcode:media_id records (plus like/comment counts)
+    are written there from the same timeline nodes, so no separate media ID stage is needed.
+    on_media is called with each record as soon as its page arrives.
+    With a checkpoint, an interrupted crawl continues from its saved cursor.
+    Reusing an earlier run's post IDs is the caller's decision (artifacts.reuse).
+    """
     print(f"Dumping ALL @{username} posts...")
-    output_file = f"{username}_postid.txt"
-    with open(output_file, "w") as f:
-        cursor = None
-        total = 0
+    output_file = output_file or f"{username}_postid.txt"
+    f, state = open_stage_output(checkpoint, "profile", output_file)
+    media_ctx = contextlib.nullcontext()
+    if media_ids_file:
+        media_ctx, media_state = open_stage_output(checkpoint, "profile", media_ids_file, key="media_offset")
+        if bool(state) != bool(media_state):
+            # The two outputs disagree; restart both from scratch
+            f.seek(0)
+            f.truncate()
+            media_ctx.seek(0)
+            media_ctx.truncate()
+            state = {}
+    with media_ctx as media_f, f:
+        cursor = state.get("cursor")
+        total = state.get("total", 0)
+        if cursor:
+            print(f"Resuming after {total} posts...")
         while True:
-            # Basic retry loop to survive transient failures
-            attempts = 0
-            last_err = None
-            while attempts < 3:
-                try:
-                    data = get_posts(cursor)
-                    break
-                except Exception as e:
-                    last_err = e
-                    attempts += 1
-                    time.sleep(2 * attempts)
-            else:
-                # Exhausted retries
-                raise last_err or RuntimeError("Failed to fetch posts")
-            edges = data['data']['xdt_api__v1__feed__user_timeline_graphql_connection']['edges']
+            data = get_posts(username, cursor)
+            edges = timeline_connection(data)['edges']
             
             for edge in edges:
                 shortcode = edge['node']['code']
                 f.write(shortcode + "\n")
+                events.record("postid", shortcode)
+                if media_f or on_media:
+                    record = media_record(edge['node'])
+                    if record and media_f:
+                        media_f.write(record + "\n")
+                        events.record("media_ids", record)
+                    if record and on_media:
+                        on_media(record)
                 total += 1
 
             print(f"Saved {total} posts...", end="\r")
 
-            page_info = data['data']['xdt_api__v1__feed__user_timeline_graphql_connection']['page_info']
+            page_info = timeline_connection(data)['page_info']
             if not page_info['has_next_page']:
                 break
             cursor = page_info['end_cursor']
-            time.sleep(2)
+            if checkpoint:
+                f.flush()
+                fields = {"cursor": cursor, "total": total, "offset": f.tell()}
+                if media_f:
+                    media_f.flush()
+                    fields["media_offset"] = media_f.tell()
+                checkpoint.update("profile", **fields)
 
+    if checkpoint:
+        checkpoint.mark_done("profile", total=total)
     print(f"\nDONE! {total} post IDs ΓåÆ {output_file}")
     return output_file
 
+def prepend_lines(path, lines):
+    """Atomically write lines in front of the existing contents of path"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as out:
+        for line in lines:
+            out.write(line + "\n")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as old:
+                shutil.copyfileobj(old, out)
+    os.replace(tmp, path)
+
+def refresh_profile(username, postid_file, media_ids_file=None):
+    """Incrementally update an existing postid file with posts published since it was written.
+
+    Pages the timeline newest-first and stops at the first page whose last post is
+    already known (pinned posts at the head of the timeline may be old), then merges
+    the new shortcodes at the head of postid_file, and their records at the head of
+    media_ids_file when given. Returns the new shortcodes, or None without a known set.
+    """
+    known = set()
+    if os.path.exists(postid_file):
+        with open(postid_file, "r", encoding="utf-8") as f:
+            known = {line.strip() for line in f if line.strip()}
+    if not known:
+        return None
+
+    print(f"Refreshing @{username} posts ({len(known)} known)...")
+    new_codes, new_records = [], []
+    added = set()
+    cursor = None
+    pages = 0
+    while True:
+        # The head of the timeline is what changed, so skip the response cache
+        conn = timeline_connection(get_posts(username, cursor, fresh=True))
+        pages += 1
+        edges = conn['edges']
+        for edge in edges:
+            shortcode = edge['node']['code']
+            if shortcode in known or shortcode in added:
+                continue
+            added.add(shortcode)
+            new_codes.append(shortcode)
+            if media_ids_file:
+                record = media_record(edge['node'])
+                if record:
+                    new_records.append(record)
+        if not edges or not conn['page_info']['has_next_page']:
+            break
+        if edges[-1]['node']['code'] in known:
+            # The oldest post on this page was already known, so everything after it is too
+            break
+        cursor = conn['page_info']['end_cursor']
+
+    if new_codes:
+        prepend_lines(postid_file, new_codes)
+        if media_ids_file:
+            prepend_lines(media_ids_file, new_records)
+    print(f"↻ @{username}: {len(new_codes)} new posts in {pages} page(s) → {postid_file}")
+    return new_codes
+
 if __name__ == "__main__":
     USERNAME = input("Enter Instagram username: ").strip()
     scrape_profile(USERNAME)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Persistent profile store shared by all runs.
+Keeps the last enriched record per username with its fetch time in SQLite (WAL mode,
+so concurrent backend jobs can read and write it at once). Enrichment consults it
+first and only goes to the network for missing or stale entries.
+
+Configuration:
+  PROFILE_STORE_PATH  database file (default: output/profile_store.db next to this module)
+  PROFILE_TTL_HOURS   how long a stored profile stays fresh (default 24; 0 disables lookups)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output", "profile_store.db")
+DEFAULT_TTL_HOURS = 24.0
+BUSY_TIMEOUT_MS = 10000
+
+
+class ProfileStore:
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL_HOURS * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "writes": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            " username TEXT PRIMARY KEY,"
+            " record TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def get(self, username):
+        """Return the stored record if it is fresher than the TTL, else None"""
+        key = (username or "").strip().lower()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT record, fetched_at FROM profiles WHERE username = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            if time.time() - row[1] > self.ttl:
+                self._stats["stale"] += 1
+                return None
+            self._stats["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, username, record, fetched_at=None):
+        key = (username or "").strip().lower()
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO profiles (username, record, fetched_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(username) DO UPDATE SET record = excluded.record, fetched_at = excluded.fetched_at",
+                (key, json.dumps(record, ensure_ascii=False), fetched_at or time.time()),
+            )
+            self.conn.commit()
+            self._stats["writes"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"] + stats["stale"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+_store = None
+_disabled = False
+_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    """Process-wide store from the environment; None when lookups are disabled"""
+    global _store, _disabled
+    with _store_lock:
+        if _store is None and not _disabled:
+            try:
+                ttl_hours = float(os.environ.get("PROFILE_TTL_HOURS", DEFAULT_TTL_HOURS))
+            except ValueError:
+                ttl_hours = DEFAULT_TTL_HOURS
+            if ttl_hours <= 0:
+                _disabled = True
+                return None
+            path = os.environ.get("PROFILE_STORE_PATH", "").strip() or DEFAULT_PATH
+            try:
+                _store = ProfileStore(path, ttl=ttl_hours * 3600)
+            except sqlite3.Error as e:
+                print(f"⚠️ Profile store unavailable ({path}): {e}")
+                _disabled = True
+                return None
+        return _store
+
+
+def get_store_stats():
+    return _store.stats() if _store is not None else None
+
+
+def reset_store_stats():
+    if _store is not None:
+        _store.reset_stats()
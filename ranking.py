@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Streaming lead ranker.
+Reads enriched profiles incrementally, dedupes them with a compact seen-set, scores
+them in batches and keeps only the top K in a bounded heap. Without K, and for the
+optional complete ranking, rows are spilled to disk and ordered with an external merge sort.
+"""
+
+import os
+import csv
+import json
+import heapq
+import hashlib
+import tempfile
+from records import iter_records, is_ndjson, RecordWriter
+from scoring import clean_lead, score_rows
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RANKED_COLUMNS = ["username", "full_name", "followers", "following", "bio", "lead_score", "category"]
+BATCH_SIZE = 4096  # rows scored per batch
+RUN_SIZE = 100000  # rows per sorted run when spilling a full ranking
+
+
+class SeenSet:
+    """Set of usernames stored as 64-bit hashes (8 bytes each once merged)"""
+
+    MERGE_AT = 65536
+
+    def __init__(self):
+        self._recent = set()
+        self._merged = np.empty(0, dtype=np.uint64) if np is not None else None
+
+    @staticmethod
+    def _key(username):
+        return int.from_bytes(hashlib.blake2b(username.encode("utf-8"), digest_size=8).digest(), "little")
+
+    def add(self, username):
+        """Add a username; returns False if it was already present"""
+        key = self._key(username)
+        if key in self._recent:
+            return False
+        if self._merged is not None and len(self._merged):
+            i = np.searchsorted(self._merged, key)
+            if i < len(self._merged) and self._merged[i] == key:
+                return False
+        self._recent.add(key)
+        if self._merged is not None and len(self._recent) >= self.MERGE_AT:
+            recent = np.fromiter(self._recent, dtype=np.uint64, count=len(self._recent))
+            self._merged = np.union1d(self._merged, recent)
+            self._recent = set()
+        return True
+
+
+def _ranked_record(r):
+    return {
+        "username": r["username"],
+        "full_name": r["full_name"],
+        "followers": r["followers"],
+        "following": r["following"],
+        "bio": r["bio"],
+        "lead_score": round(r["lead_score"], 4),
+        "category": r["category"],
+    }
+
+
+def _csv_row(r):
+    return [r["username"], r["full_name"], r["followers"], r["following"], r["bio"],
+            f"{r['lead_score']:.4f}", r["category"]]
+
+
+def write_ranked_json(rows, path):
+    """Write ranked rows as an indented JSON array (or NDJSON for .ndjson paths); returns the count"""
+    ndjson = is_ndjson(path)
+    with open(path, "w", encoding="utf-8") as f:
+        writer = RecordWriter(f, ndjson, indent=None if ndjson else 2, index=True)
+        for r in rows:
+            writer.write(_ranked_record(r))
+        writer.close()
+    return writer.count
+
+
+def write_ranked_csv(rows, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(RANKED_COLUMNS)
+        for r in rows:
+            writer.writerow(_csv_row(r))
+
+
+def scored_leads(leads_data_out):
+    """Yield (index, row) for every unique, scored lead in an enriched leads file"""
+    if not os.path.exists(leads_data_out):
+        return
+    seen = SeenSet()
+    batch = []
+    index = 0
+    for item in iter_records(leads_data_out):
+        row = clean_lead(item) if isinstance(item, dict) else None
+        if not row or not seen.add(row["username"]):
+            continue
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            for row in score_rows(batch):
+                yield index, row
+                index += 1
+            batch = []
+    for row in score_rows(batch):
+        yield index, row
+        index += 1
+
+
+class _RunWriter:
+    """Sorted runs on disk for the external merge sort"""
+
+    def __init__(self, tmp_dir):
+        self.tmp_dir = tmp_dir
+        self.paths = []
+        self.buffer = []
+
+    def add(self, index, row):
+        self.buffer.append((-row["lead_score"], index, row))
+        if len(self.buffer) >= RUN_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        self.buffer.sort(key=lambda x: (x[0], x[1]))
+        path = os.path.join(self.tmp_dir, f"run{len(self.paths)}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for neg, index, row in self.buffer:
+                f.write(json.dumps([neg, index, row], ensure_ascii=False) + "\n")
+        self.paths.append(path)
+        self.buffer = []
+
+    def merged(self):
+        """Yield rows of all runs in ranked order"""
+        self.flush()
+        files = [open(p, "r", encoding="utf-8") for p in self.paths]
+        try:
+            runs = [(json.loads(line) for line in f) for f in files]
+            for _, _, row in heapq.merge(*runs, key=lambda x: (x[0], x[1])):
+                yield row
+        finally:
+            for f in files:
+                f.close()
+
+
+def rank_stream(leads_data_out, ranked_json, ranked_csv, top_k=None, full_ranking=None):
+    """Rank enriched leads without loading them all into memory.
+
+    Writes the top_k leads to ranked_json/ranked_csv, ordered like a stable descending
+    sort by lead_score. With top_k None every lead is written, streamed from the external
+    merge sort rather than held in memory. With full_ranking, every lead is also written
+    to that CSV path. Returns (ranked, total) counts.
+    """
+    heap = []
+    total = 0
+    with tempfile.TemporaryDirectory(prefix="ranking_") as tmp_dir:
+        runs = _RunWriter(tmp_dir) if full_ranking or top_k is None else None
+        for index, row in scored_leads(leads_data_out):
+            total += 1
+            if runs is not None:
+                runs.add(index, row)
+            if top_k is None:
+                continue
+            # Min-heap on (score, -index): ties keep the earlier lead, as a stable sort does
+            entry = (row["lead_score"], -index, row)
+            if len(heap) < top_k:
+                heapq.heappush(heap, entry)
+            elif heap and entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+
+        if top_k is None:
+            ranked = write_ranked_json(runs.merged(), ranked_json)
+            write_ranked_csv(runs.merged(), ranked_csv)
+        else:
+            rows = [row for _, _, row in sorted(heap, key=lambda x: (x[0], x[1]), reverse=True)]
+            ranked = write_ranked_json(rows, ranked_json)
+            write_ranked_csv(rows, ranked_csv)
+        if full_ranking:
+            write_ranked_csv(runs.merged(), full_ranking)
+    return ranked, total
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Record artifacts written and read by the scrapers.
+Artifacts are either newline-delimited JSON (.ndjson, one record per line) or legacy
+top-level JSON arrays (.json); writers flush in batches and readers yield one record
+at a time without loading the file.
+
+A record index sidecar (<artifact>.idx) holds one little-endian (start, end) uint64
+byte span per record, so the backend can serve any page of records without scanning
+the file. RecordWriter writes it alongside the records (index=True); line-oriented
+artifacts (.txt, .ndjson) can also be indexed afterwards with write_line_index().
+
+Usage: python3 records.py <input.json|input.ndjson> [output]   # convert between formats
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+
+CHUNK_SIZE = 1 << 16
+_WS = " \t\r\n"
+INDEX_SUFFIX = ".idx"
+SPAN = struct.Struct("<QQ")  # record start and end byte offsets
+
+# --- Configuration ---
+# OUTPUT_FORMAT=ndjson (or main.py --ndjson) switches record artifacts to .ndjson
+FORMATS = ("json", "ndjson")
+FLUSH_EVERY = 64        # records per flush
+FLUSH_INTERVAL = 1.0    # seconds; a write after this long flushes regardless of count
+
+DEFAULT_FORMAT = os.environ.get("OUTPUT_FORMAT", "json").strip().lower() or "json"
+
+_output_format = DEFAULT_FORMAT
+
+
+def set_output_format(fmt):
+    global _output_format
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format: {fmt}")
+    _output_format = fmt
+
+
+def output_format():
+    return _output_format if _output_format in FORMATS else "json"
+
+
+def artifact_path(output_dir, name):
+    """Path of a record artifact (e.g. 'user_comments') in the configured format"""
+    return os.path.join(output_dir, f"{name}.{output_format()}")
+
+
+def is_ndjson(path):
+    return str(path).endswith(".ndjson")
+
+
+def index_path(path):
+    return str(path) + INDEX_SUFFIX
+
+
+def is_line_oriented(path):
+    return str(path).endswith((".ndjson", ".txt"))
+
+
+def has_lines(path):
+    """Whether path exists and has at least one non-empty line"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    return True
+    except Exception:
+        return False
+    return False
+
+
+def write_line_index(path):
+    """Write the record index of a line-oriented artifact (one record per non-empty line)"""
+    tmp = index_path(path) + ".tmp"
+    count = 0
+    with open(path, "rb") as f, open(tmp, "wb") as out:
+        pos = 0
+        for line in f:
+            content = line.rstrip(b"\r\n")
+            if content.strip():
+                out.write(SPAN.pack(pos, pos + len(content)))
+                count += 1
+            pos += len(line)
+    os.replace(tmp, index_path(path))
+    return count
+
+
+def _index_fits(path):
+    """Whether path has an index whose last span lies inside the file"""
+    try:
+        size = os.path.getsize(index_path(path))
+        if size % SPAN.size:
+            return False
+        if not size:
+            return True
+        with open(index_path(path), "rb") as f:
+            f.seek(size - SPAN.size)
+            _, end = SPAN.unpack(f.read(SPAN.size))
+        return end <= os.path.getsize(path)
+    except OSError:
+        return False
+
+
+def ensure_index(path):
+    """Index a finished artifact unless its writer already did; returns False if it cannot be indexed"""
+    if _index_fits(path):
+        return True
+    if is_line_oriented(path):
+        write_line_index(path)
+        return True
+    return False
+
+
+class RecordWriter:
+    """Write records to an open text file as NDJSON or as a JSON array.
+
+    Flushes every flush_every records or flush_interval seconds; on_flush(offset) runs
+    after each flush with the offset up to which the file is complete. A resumed file
+    (already holding count records) is continued without writing the array header.
+    With index=True the record index sidecar is written next to the file.
+    """
+
+    def __init__(self, f, ndjson, indent=None, count=0, resumed=False, on_flush=None,
+                 flush_every=FLUSH_EVERY, flush_interval=FLUSH_INTERVAL, index=False):
+        self.f = f
+        self.ndjson = ndjson
+        self.indent = indent
+        self.count = count
+        self.on_flush = on_flush
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+        if not ndjson and not resumed:
+            f.write("[\n")
+        self._pos = 0
+        self._index = self._open_index(resumed) if index else None
+
+    def _open_index(self, resumed):
+        path = index_path(self.f.name)
+        keep = self.count * SPAN.size
+        if resumed and (not os.path.exists(path) or os.path.getsize(path) < keep):
+            # No usable index for the records already written; indexing is skipped for this file
+            if os.path.exists(path):
+                os.remove(path)
+            return None
+        index = open(path, "r+b" if resumed else "wb")
+        index.truncate(keep)
+        index.seek(keep)
+        self._pos = self.f.tell()
+        return index
+
+    def write(self, item):
+        if self.ndjson:
+            text = json.dumps(item, ensure_ascii=False)
+            sep, tail = "", "\n"
+        else:
+            text = json.dumps(item, indent=self.indent, ensure_ascii=False)
+            sep, tail = (",\n" if self.count else ""), ""
+        self.f.write(sep + text + tail)
+        if self._index is not None:
+            start = self._pos + len(sep)
+            end = start + len(text.encode("utf-8"))
+            self._index.write(SPAN.pack(start, end))
+            self._pos = end + len(tail)
+        self.count += 1
+        self._pending += 1
+        if self._pending >= self.flush_every or time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.f.flush()
+        if self._index is not None:
+            # After the data, so an index entry never points past the flushed records
+            self._index.flush()
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+        if self.on_flush:
+            self.on_flush(self.f.tell())
+
+    def close(self):
+        """Flush pending records and terminate a JSON array (the file stays open)"""
+        self.flush()
+        if not self.ndjson:
+            self.f.write("\n]")
+            self.f.flush()
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+
+def iter_ndjson(path):
+    """Yield the records of an NDJSON file; a truncated last line is skipped with a warning"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                if line.endswith("\n"):
+                    raise
+                print(f"⚠️ {path} has a truncated record; using the records read so far")
+                return
+
+
+def iter_records(path):
+    """Yield records from an artifact in either format"""
+    return iter_ndjson(path) if is_ndjson(path) else iter_json_array(path)
+
+
+def convert(src, dst=None):
+    """Convert a record artifact between the JSON array and NDJSON formats; returns (dst, count)"""
+    if dst is None:
+        base, _ = os.path.splitext(src)
+        dst = base + (".json" if is_ndjson(src) else ".ndjson")
+    tmp = dst + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        writer = RecordWriter(f, is_ndjson(dst), indent=None if is_ndjson(dst) else 2, index=True)
+        for item in iter_records(src):
+            writer.write(item)
+        writer.close()
+    os.replace(tmp, dst)
+    os.replace(index_path(tmp), index_path(dst))
+    return dst, writer.count
+
+
+def iter_json_array(path, chunk_size=CHUNK_SIZE):
+    """Yield the items of a JSON array file one at a time.
+
+    Only the current item (plus one read chunk) is held in memory. A truncated tail,
+    e.g. from an interrupted run, ends the stream with a warning instead of failing.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+        started = False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        while True:
+            # Skip whitespace and separators between items
+            while True:
+                while pos < len(buf) and buf[pos] in _WS:
+                    pos += 1
+                if pos < len(buf) or eof:
+                    break
+                fill()
+            if pos >= len(buf):
+                if started:
+                    print(f"⚠️ {path} ends without closing ']'; using the records read so far")
+                return
+            ch = buf[pos]
+            if not started:
+                if ch != "[":
+                    raise ValueError(f"{path} is not a JSON array")
+                started = True
+                pos += 1
+                continue
+            if ch == "]":
+                return
+            if ch == ",":
+                pos += 1
+                continue
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    print(f"⚠️ {path} has a truncated record; using the records read so far")
+                    return
+                fill()
+                continue
+            if end == len(buf) and not eof:
+                # A scalar may continue in the next chunk; decode it again with more data
+                fill()
+                continue
+            pos = end
+            yield item
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 records.py <input.json|input.ndjson> [output]")
+        sys.exit(1)
+    out, n = convert(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"✅ Converted {n} records → {out}")
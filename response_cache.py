@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Read-through cache for paginated read endpoints (timeline, comments, likers, followers).
+Responses are stored zlib-compressed in SQLite, keyed by endpoint, doc_id/query_hash and
+normalized variables, expire after a per-endpoint TTL and are evicted least-recently-used
+once the cache grows past its size cap.
+
+Configuration:
+  HTTP_CACHE           set to 0 to disable the cache (default: enabled)
+  HTTP_CACHE_PATH      database file (default: output/http_cache.db next to this module)
+  HTTP_CACHE_MAX_MB    size cap for stored (compressed) bodies (default 256)
+"""
+
+import os
+import json
+import time
+import zlib
+import hashlib
+import sqlite3
+import threading
+from urllib.parse import urlsplit, parse_qsl
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output", "http_cache.db")
+DEFAULT_MAX_MB = 256
+BUSY_TIMEOUT_MS = 10000
+# Request fields that identify the query; session tokens and counters are ignored
+KEY_FIELDS = ("doc_id", "query_hash", "variables")
+VOLATILE_PARAMS = {"fb_dtsg", "lsd", "jazoest", "__req", "__s", "__hsi", "__rev", "__hs", "__ccg", "__dyn", "__csr"}
+
+
+def _normalize(value):
+    """Parse JSON-encoded variables so key order and spacing do not change the key"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def cache_key(method, url, endpoint, params=None, data=None):
+    parts = urlsplit(url)
+    fields = {}
+    for source in (parse_qsl(parts.query), (params or {}).items(), (data or {}).items()):
+        for k, v in source:
+            if k in VOLATILE_PARAMS:
+                continue
+            fields[k] = _normalize(v) if k in KEY_FIELDS else v
+    raw = json.dumps([endpoint, method.upper(), parts.netloc, parts.path, fields], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " endpoint TEXT,"
+            " url TEXT,"
+            " status INTEGER,"
+            " content_type TEXT,"
+            " body BLOB,"
+            " size INTEGER,"
+            " stored_at REAL,"
+            " accessed_at REAL"
+            ") WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)")
+        self.conn.commit()
+        self._size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key, ttl):
+        """Return a cached requests.Response younger than ttl seconds, else None"""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT url, status, content_type, body, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            if now - row[4] > ttl:
+                self._stats["expired"] += 1
+                return None
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self._stats["hits"] += 1
+        url, status, content_type, body, _ = row
+        resp = requests.models.Response()
+        resp.status_code = status
+        resp.url = url
+        resp.headers = CaseInsensitiveDict({"content-type": content_type or "", "x-cache": "HIT"})
+        resp.encoding = get_encoding_from_headers(resp.headers) or "utf-8"
+        resp._content = zlib.decompress(body)
+        return resp
+
+    def put(self, key, endpoint, resp):
+        body = zlib.compress(resp.content, 6)
+        now = time.time()
+        with self._lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, endpoint, url, status, content_type, body, size, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, resp.url, resp.status_code, resp.headers.get("content-type"),
+                 body, len(body), now, now),
+            )
+            self._size += len(body) - (old[0] if old else 0)
+            self._stats["stores"] += 1
+            if self._size > self.max_bytes:
+                self._evict_locked()
+            self.conn.commit()
+
+    def _evict_locked(self):
+        """Drop least-recently-used responses until the cache is back under 90% of its cap"""
+        target = int(self.max_bytes * 0.9)
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC")
+        doomed = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            doomed.append((key,))
+            self._size -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self._stats["evictions"] += len(doomed)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size_bytes"] = self._size
+        lookups = stats["hits"] + stats["misses"] + stats["expired"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0)
+
+
+_cache = None
+_disabled = False
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache from the environment; None when disabled"""
+    global _cache, _disabled
+    with _cache_lock:
+        if _cache is None and not _disabled:
+            if os.environ.get("HTTP_CACHE", "1").strip().lower() in ("0", "false", "no", "off"):
+                _disabled = True
+                return None
+            path = os.environ.get("HTTP_CACHE_PATH", "").strip() or DEFAULT_PATH
+            try:
+                max_mb = float(os.environ.get("HTTP_CACHE_MAX_MB", DEFAULT_MAX_MB))
+            except ValueError:
+                max_mb = DEFAULT_MAX_MB
+            try:
+                _cache = ResponseCache(path, max_bytes=int(max_mb * 1024 * 1024))
+            except sqlite3.Error as e:
+                print(f"⚠️ Response cache unavailable ({path}): {e}")
+                _disabled = True
+                return None
+        return _cache
+
+
+def get_cache_stats():
+    return _cache.stats() if _cache is not None else None
+
+
+def reset_cache_stats():
+    if _cache is not None:
+        _cache.reset_stats()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Shared retry policy and session circuit breaker for every scraper request.
+http_client (and async_http) retry transient failures with jittered exponential
+backoff, honoring Retry-After, and only retry non-idempotent requests when the server
+provably did not process them. The first response that shows an expired session
+(redirect to login, checkpoint/challenge page) trips a process-wide breaker: every
+later request raises SessionExpired without touching the network.
+
+Configuration:
+  RETRY_ATTEMPTS  total attempts per request (default 4)
+  RETRY_BASE      first backoff ceiling in seconds (default 0.5)
+  RETRY_CAP       maximum backoff in seconds (default 30)
+"""
+
+import os
+import random
+import threading
+from urllib.parse import urlsplit
+from scheduler import parse_retry_after
+import events
+
+# --- Configuration ---
+DEFAULT_ATTEMPTS = int(os.environ.get("RETRY_ATTEMPTS", "4") or 4)
+DEFAULT_BASE = float(os.environ.get("RETRY_BASE", "0.5") or 0.5)
+DEFAULT_CAP = float(os.environ.get("RETRY_CAP", "30") or 30)
+MAX_RETRY_AFTER = 300  # never sleep longer than this on a server's say-so
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+SESSION_PATHS = ("/accounts/login", "/challenge", "/checkpoint")
+SESSION_MESSAGES = ("login_required", "checkpoint_required", "challenge_required")
+
+
+class SessionExpired(RuntimeError):
+    """The Instagram session is no longer usable; retrying cannot help"""
+
+
+class RetryPolicy:
+    def __init__(self, attempts=DEFAULT_ATTEMPTS, base=DEFAULT_BASE, cap=DEFAULT_CAP, statuses=RETRY_STATUSES):
+        self.attempts = max(1, attempts)
+        self.base = base
+        self.cap = cap
+        self.statuses = statuses
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the given (0-based) retry"""
+        return random.uniform(0, min(self.cap, self.base * (2 ** attempt)))
+
+    def retry_delay(self, attempt, method, spec=None, status=None, headers=None, error=None, connect=False):
+        """Seconds to wait before retrying, or None to give up.
+
+        error is a transport exception (connect=True when the request never reached the
+        server); otherwise status/headers describe the response. POSTs are retried only
+        when the endpoint spec marks them idempotent, or when the server refused them.
+        """
+        if attempt + 1 >= self.attempts:
+            return None
+        idempotent = method.upper() in IDEMPOTENT_METHODS or bool((spec or {}).get("idempotent"))
+        if error is not None:
+            return self.backoff(attempt) if idempotent or connect else None
+        if status not in self.statuses:
+            return None
+        retry_after = parse_retry_after((headers or {}).get("Retry-After"))
+        if not idempotent and status != 429 and retry_after is None:
+            return None
+        return min(MAX_RETRY_AFTER, max(retry_after or 0.0, self.backoff(attempt)))
+
+
+def session_problem(status, headers, url, body=b""):
+    """Describe why a response shows an expired session, or return None"""
+    location = urlsplit((headers or {}).get("Location") or "").path
+    if status in (301, 302, 303, 307) and location.startswith(SESSION_PATHS):
+        return f"HTTP {status} redirect to {location}"
+    path = urlsplit(url or "").path
+    if path.startswith(SESSION_PATHS):
+        return f"redirected to {path}"
+    if status in (400, 401, 403) and body and len(body) < 4096:
+        text = body.decode("utf-8", "replace")
+        for message in SESSION_MESSAGES:
+            if message in text:
+                return f"HTTP {status} {message}"
+    return None
+
+
+class CircuitBreaker:
+    """Process-wide switch that fails every request fast once the session is gone"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tripped = threading.Event()
+        self.reason = None
+
+    @property
+    def tripped(self):
+        return self._tripped.is_set()
+
+    def trip(self, reason):
+        with self._lock:
+            if self._tripped.is_set():
+                return
+            self.reason = reason
+            self._tripped.set()
+        print(f"❌ Session expired ({reason}) — cancelling all remaining requests")
+        events.error(f"Session expired: {reason}", code="session_expired")
+
+    def check(self):
+        if self._tripped.is_set():
+            raise SessionExpired(self.reason)
+
+    def reset(self):
+        with self._lock:
+            self.reason = None
+            self._tripped.clear()
+
+
+_policy = RetryPolicy()
+_breaker = CircuitBreaker()
+
+
+def get_policy():
+    return _policy
+
+
+def get_breaker():
+    return _breaker
+
+
+def check_session(resp, spec=None):
+    """Trip the breaker and raise SessionExpired if an authenticated response shows an expired session"""
+    if (spec or {}).get("anonymous"):
+        return
+    reason = session_problem(resp.status_code, resp.headers, resp.url, resp.content if resp.status_code >= 400 else b"")
+    if reason:
+        _breaker.trip(reason)
+        raise SessionExpired(reason)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Process-wide request scheduler.
+A global token bucket plus optional per-endpoint buckets pace every request
+made through http_client, and HTTP 429 / Retry-After responses pause all of them.
+"""
+
+import os
+import math
+import time
+import threading
+from email.utils import parsedate_to_datetime
+
+# --- Configuration ---
+# SCRAPER_RPS=2 and SCRAPER_ENDPOINT_RPS="comments=0.5,likers=0.5" override these
+DEFAULT_RPS = 2.0
+DEFAULT_ENDPOINT_RPS = {
+    "profile_posts": 0.5,
+    "comments": 0.5,
+    "likers": 0.5,
+    "followers": 0.33,
+}
+MAX_BACKOFF = 120  # seconds
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations; callers sleep outside the lock"""
+
+    def __init__(self, rate, burst=None):
+        if not rate > 0:
+            raise ValueError(f"token bucket rate must be positive, got {rate!r}")
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, now):
+        """Take one token and return how long the caller must wait before using it"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        # Negative balance queues callers behind each other
+        return -self.tokens / self.rate
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds, or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class RequestScheduler:
+    def __init__(self, rate=DEFAULT_RPS, endpoint_rates=None, burst=None):
+        self._lock = threading.Lock()
+        self._global = TokenBucket(rate, burst)
+        self._endpoints = {name: TokenBucket(r) for name, r in (endpoint_rates or {}).items() if r and r > 0}
+        self._paused_until = 0.0
+        self._throttled = 0  # consecutive throttled responses
+        self.stats = {"requests": 0, "waited": 0.0, "throttled": 0}
+
+    def reserve(self, endpoint=None):
+        """Reserve a request slot without blocking; returns how long to wait before sending"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._global.reserve(now)
+            bucket = self._endpoints.get(endpoint)
+            if bucket is not None:
+                wait = max(wait, bucket.reserve(now))
+            wait = max(wait, self._paused_until - now)
+            self.stats["requests"] += 1
+            self.stats["waited"] += wait
+        return wait
+
+    def acquire(self, endpoint=None):
+        """Block until a request slot is available for the endpoint; returns seconds waited"""
+        wait = self.reserve(endpoint)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def observe(self, endpoint, status_code, headers=None):
+        """Feed a response back; 429s and Retry-After headers pause every caller"""
+        retry_after = parse_retry_after((headers or {}).get("Retry-After"))
+        with self._lock:
+            if status_code == 429 or retry_after is not None:
+                self._throttled += 1
+                self.stats["throttled"] += 1
+                backoff = retry_after if retry_after is not None else min(MAX_BACKOFF, 2 ** self._throttled)
+                self._paused_until = max(self._paused_until, time.monotonic() + backoff)
+                return backoff
+            self._throttled = 0
+        return 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"requests": 0, "waited": 0.0, "throttled": 0}
+
+    def rates(self):
+        """(global rate, {endpoint: rate}) this scheduler paces requests at"""
+        with self._lock:
+            return self._global.rate, {name: bucket.rate for name, bucket in self._endpoints.items()}
+
+
+def _parse_rate(value):
+    """A positive, finite requests-per-second value, or None"""
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        return None
+    return rate if math.isfinite(rate) and rate > 0 else None
+
+
+def _rate_from_env():
+    value = os.environ.get("SCRAPER_RPS")
+    if value is None:
+        return DEFAULT_RPS
+    rate = _parse_rate(value)
+    if rate is None:
+        print(f"⚠️ SCRAPER_RPS must be a positive number, got {value!r}; using {DEFAULT_RPS}")
+        return DEFAULT_RPS
+    return rate
+
+
+def _endpoint_rates_from_env():
+    rates = dict(DEFAULT_ENDPOINT_RPS)
+    for item in os.environ.get("SCRAPER_ENDPOINT_RPS", "").split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            rate = _parse_rate(value)
+            if rate is None:
+                print(f"⚠️ Ignoring invalid SCRAPER_ENDPOINT_RPS entry (rates must be positive): {item}")
+            else:
+                rates[name.strip()] = rate
+    return rates
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the shared scheduler, configured from the environment on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(_rate_from_env(), _endpoint_rates_from_env())
+        return _scheduler
+
+
+def configure(rate=DEFAULT_RPS, endpoint_rates=None, burst=None):
+    """Replace the shared scheduler with an explicit budget"""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = RequestScheduler(rate, endpoint_rates, burst)
+        return _scheduler
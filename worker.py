@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Resident scrape worker.
+Keeps a bounded pool of worker processes that import the scrapers once and reuse their
+pooled HTTP sessions, response cache and profile store across jobs. Jobs are accepted
+over HTTP on a local Unix socket (or TCP with WORKER_PORT); each job's events stream
+back as NDJSON, ending with {"type": "complete", "code": N}.
+
+  POST /jobs    {"username": "...", "args": ["--pipeline", "--ndjson"]}
+  GET  /health
+
+Configuration:
+  WORKER_SOCKET      Unix socket path (default: output/worker.sock)
+  WORKER_PORT        listen on 127.0.0.1:PORT instead of the socket
+  WORKER_POOL_SIZE   concurrent jobs (default 2); the request budget is split between them
+  WORKER_QUEUE_SIZE  jobs waiting for a free worker before new ones are refused (default 16)
+
+Usage: python3 worker.py
+"""
+
+import os
+import io
+import sys
+import json
+import uuid
+import queue
+import select
+import socket
+import threading
+import multiprocessing
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOCKET = os.path.join(ROOT, "output", "worker.sock")
+POOL_SIZE = int(os.environ.get("WORKER_POOL_SIZE", "2") or 2)
+QUEUE_SIZE = int(os.environ.get("WORKER_QUEUE_SIZE", "16") or 16)
+_COMPLETE = "complete"
+
+
+# --- Worker process ---
+class _EventLog(io.TextIOBase):
+    """stdout/stderr replacement that turns console lines into log (or error) events"""
+
+    def __init__(self, event_type="log"):
+        self.event_type = event_type
+        self._buf = ""
+        self._lock = threading.Lock()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        import events
+        with self._lock:
+            self._buf += text.replace("\r", "\n")
+            *lines, self._buf = self._buf.split("\n")
+        for line in lines:
+            if line.strip():
+                events.emit(self.event_type, message=line.strip())
+        return len(text)
+
+
+def _share_budget(pool_size):
+    """Give each worker process an equal share of the configured request budget"""
+    import scheduler
+    rate, endpoint_rates = scheduler.get_scheduler().rates()
+    scheduler.configure(rate / pool_size, {name: r / pool_size for name, r in endpoint_rates.items()})
+
+
+def _run_job(conn, job):
+    import main as scraper
+    import events
+    from retry import get_breaker
+    from scheduler import get_scheduler
+    from leads_data import reset_enrichment_stats
+    from profile_store import reset_store_stats
+    from response_cache import reset_cache_stats
+
+    send_lock = threading.Lock()
+
+    def sink(event):
+        with send_lock:
+            conn.send(json.dumps(event, ensure_ascii=False, default=str))
+
+    events.set_sink(sink)
+    # Every job reports its own requests and hit counts, not the process's running totals
+    get_breaker().reset()
+    get_scheduler().reset_stats()
+    reset_enrichment_stats()
+    reset_store_stats()
+    reset_cache_stats()
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = _EventLog(), _EventLog("error")
+    try:
+        args = scraper.parse_args(list(job.get("args") or []) + [job["username"]])
+        return scraper.run(job["username"], args)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception as e:
+        events.error(f"Job failed: {e}")
+        return 1
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+        events.set_sink(None)
+
+
+def _worker_main(conn, pool_size):
+    """Process entry point: import once, then run jobs from conn until it closes"""
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import main  # noqa: F401  (warm the scraper modules before the first job)
+    _share_budget(pool_size)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        code = _run_job(conn, job)
+        conn.send(json.dumps({"type": _COMPLETE, "code": code}))
+
+
+# --- Pool ---
+class Job:
+    def __init__(self, username, args):
+        self.id = uuid.uuid4().hex
+        self.username = username
+        self.args = args
+        self.events = queue.Queue()
+        self.cancelled = threading.Event()
+
+
+class WorkerPool:
+    """Fixed set of worker processes, each serving one job at a time from a shared queue"""
+
+    def __init__(self, size=POOL_SIZE, queue_size=QUEUE_SIZE):
+        self.size = max(1, size)
+        self.ctx = multiprocessing.get_context("spawn")
+        self.pending = queue.Queue(maxsize=queue_size)
+        self.busy = 0
+        self._lock = threading.Lock()
+        for slot in range(self.size):
+            threading.Thread(target=self._serve, args=(slot,), daemon=True).start()
+
+    def _start_process(self):
+        parent, child = self.ctx.Pipe()
+        proc = self.ctx.Process(target=_worker_main, args=(child, self.size), daemon=True)
+        proc.start()
+        child.close()
+        return proc, parent
+
+    def _serve(self, slot):
+        proc, conn = self._start_process()
+        while True:
+            job = self.pending.get()
+            if job.cancelled.is_set():
+                continue
+            with self._lock:
+                self.busy += 1
+            try:
+                if not proc.is_alive():
+                    proc, conn = self._start_process()
+                conn.send({"username": job.username, "args": job.args})
+                while True:
+                    # Poll so a cancelled job's process can be replaced promptly
+                    if job.cancelled.is_set():
+                        proc.terminate()
+                        proc.join()
+                        proc, conn = self._start_process()
+                        break
+                    if not conn.poll(0.5):
+                        if not proc.is_alive():
+                            job.events.put({"type": _COMPLETE, "code": proc.exitcode or 1})
+                            proc, conn = self._start_process()
+                            break
+                        continue
+                    event = json.loads(conn.recv())
+                    job.events.put(event)
+                    if event.get("type") == _COMPLETE:
+                        break
+            except (EOFError, OSError) as e:
+                job.events.put({"type": "error", "message": f"Worker process failed: {e}"})
+                job.events.put({"type": _COMPLETE, "code": 1})
+                proc, conn = self._start_process()
+            finally:
+                with self._lock:
+                    self.busy -= 1
+
+    def submit(self, username, args):
+        """Queue a job; returns it, or None when the queue is full"""
+        job = Job(username, args)
+        try:
+            self.pending.put_nowait(job)
+        except queue.Full:
+            return None
+        return job
+
+    def status(self):
+        with self._lock:
+            return {"workers": self.size, "busy": self.busy, "queued": self.pending.qsize()}
+
+
+# --- HTTP front end ---
+class Handler(BaseHTTPRequestHandler):
+    pool = None
+
+    def address_string(self):
+        return str(self.client_address or "unix")
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._json(200, {"ok": True, **self.pool.status()})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            return self._json(404, {"error": "not found"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            username = str(body.get("username") or "").strip()
+            args = [str(a) for a in body.get("args") or []]
+        except (ValueError, AttributeError):
+            return self._json(400, {"error": "invalid JSON body"})
+        if not username or username.startswith("-") or any(not a.startswith("--") for a in args):
+            return self._json(400, {"error": "username and --flag args are required"})
+        job = self.pool.submit(username, args)
+        if job is None:
+            return self._json(503, {"error": "job queue is full"})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("X-Job-Id", job.id)
+        self.end_headers()
+        try:
+            while True:
+                try:
+                    event = job.events.get(timeout=1.0)
+                except queue.Empty:
+                    # A quiet job (queued, or waiting on the network) still notices a disconnect
+                    if self._client_gone():
+                        raise ConnectionResetError("client disconnected")
+                    continue
+                self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+                if event.get("type") == _COMPLETE:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away; stop its job and free the worker
+            job.cancelled.set()
+
+    def _client_gone(self):
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        if not readable:
+            return False
+        try:
+            return self.connection.recv(1, socket.MSG_PEEK) == b""
+        except OSError:
+            return True
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve():
+    Handler.pool = WorkerPool()
+    port = os.environ.get("WORKER_PORT", "").strip()
+    if port:
+        server = ThreadingHTTPServer(("127.0.0.1", int(port)), Handler)
+        where = f"http://127.0.0.1:{port}"
+    else:
+        path = os.environ.get("WORKER_SOCKET", "").strip() or DEFAULT_SOCKET
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        server = UnixHTTPServer(path, Handler)
+        where = f"unix:{path}"
+    print(f"✅ Worker listening on {where} ({Handler.pool.size} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()